@@ -1,5 +1,10 @@
 import streamlit as st
 import base64
+import pandas as pd
+# Os separadores recebem cópias rasas das tabelas partilhadas em cache
+# (data_store.load_dataset); com copy-on-write, alterar colunas numa cópia
+# nunca escreve nos buffers partilhados. Definido só aqui, para toda a app.
+pd.set_option("mode.copy_on_write", True)
 from tab_content import new_dashboard_tab, load_and_display_sfa
 from simulate_costs import show_rf_cost_mitigation_dashboard
 from whatif import what_if_dashboard
@@ -114,7 +119,7 @@ with tab1:
     - **Policy Simulator**  
       This module simulates potential cost savings and supports policy scenario analysis using three approaches:
         - **Benchmarking (Percentiles):**  
-          Estimates how much could be saved if contracts matched the efficiency of the 50th, 75th, or 90th percentiles.
+          Estimates how much could be saved if contracts matched the efficiency of any chosen percentile (1st–99th), with the full savings curve.
         - **Risk Mitigation via Machine Learning:**  
           Uses a Random Forest model to identify high-risk contracts and estimates savings if better management had been applied.
         - **What-if Scenario Analysis:**  
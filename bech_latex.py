@@ -1,59 +1,170 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
+from benchmark_engine import peer_thresholds, group_codes
+
+GAP_VARIABLES = [
+    "bidders",
+    "covid_pandemic",
+    "execution_dummy",  # podes remover se necessário
+    "act_type",
+    "CPV_agrupado",
+    "loc",
+    "contract_year",
+    "ln_base_price",
+    "environmental"
+]
+
+GAP_PERCENTILES = [0.50, 0.75, 0.90]
+
+# Colunas float com mais valores distintos do que isto são agrupadas em quantis
+MAX_DISCRETE_VALUES = 20
+
+
+def category_codes(values: pd.Series, bins: int = 10) -> tuple:
+    """
+    Integer category per row (-1 for missing) and the number of categories.
+
+    Float columns with more than `MAX_DISCRETE_VALUES` distinct values (e.g.
+    ``ln_base_price``) are cut into `bins` quantile bins instead of being
+    grouped by unique value.
+    """
+    if pd.api.types.is_float_dtype(values) and values.nunique() > MAX_DISCRETE_VALUES:
+        binned = pd.qcut(values, q=bins, duplicates="drop")
+        return binned.cat.codes.to_numpy(dtype=np.int64), len(binned.cat.categories)
+    codes, uniques = pd.factorize(values)
+    return codes.astype(np.int64), len(uniques)
+
+
 def compute_efficiency_gap_by_variable(df: pd.DataFrame,
-                                       variables: list,
+                                       variables: list = GAP_VARIABLES,
                                        efficiency_col: str = "efficiency",
-                                       percentiles: list = [0.50, 0.75, 0.90]) -> pd.DataFrame:
-    results = []
+                                       percentiles: list = GAP_PERCENTILES,
+                                       slice_by: list = None,
+                                       bins: int = 10) -> pd.DataFrame:
+    """
+    Average gap between the per-category mean efficiency of each variable and
+    the efficiency benchmark at each percentile.
+
+    The benchmark quantiles of every slice come from one sorted pass
+    (`benchmark_engine.peer_thresholds`) and each variable's category means
+    from one bincount over (slice, category) codes, so the cost does not grow
+    with the number of percentiles and barely with the number of slices.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Contract table.
+    variables : list
+        Grouping variables; columns missing from `df` are skipped.
+    efficiency_col : str
+        Efficiency score column.
+    percentiles : list
+        Benchmark quantiles in (0, 1).
+    slice_by : list, optional
+        Columns that split the table into independent slices (e.g.
+        ``["contract_year"]``); each slice gets its own benchmark and gaps.
+    bins : int
+        Number of quantile bins for continuous variables.
+
+    Returns
+    -------
+    pd.DataFrame
+        The `slice_by` columns, ``Variable`` and one ``Gap at P<k>`` column
+        per percentile, rounded to 3 decimals.
+    """
+    slice_by = list(slice_by or [])
+    # Rótulos com o percentil exato (P97.5, não P98)
+    points = [q * 100 for q in percentiles]
+    labels = [f"{p:g}" for p in points]
+    if len(set(labels)) < len(labels):
+        raise ValueError(f"Percentiles must be distinct: {list(percentiles)}")
+    gap_cols = [f"Gap at P{p}" for p in labels]
+
+    # Benchmark de cada fatia para todos os percentis
+    peers = peer_thresholds(df, slice_by, percentiles=points, efficiency_col=efficiency_col)
+    slices = peers["codes"]
+    benchmarks = peers["table"][[f"p{p}" for p in points]].to_numpy(dtype=np.float64)
+    n_slices = len(benchmarks)
 
+    eff = df[efficiency_col].to_numpy(dtype=np.float64)
+    tables = []
     for var in variables:
         if var not in df.columns:
             continue
 
-        for q in percentiles:
-            benchmark = df[efficiency_col].quantile(q)
+        codes, n_categories = category_codes(df[var], bins=bins)
+        valid = (codes >= 0) & (slices >= 0) & ~np.isnan(eff)
+        cell = slices[valid] * n_categories + codes[valid]
+        size = n_slices * n_categories
 
-            # Cálculo correto: média da eficiência por categoria - benchmark
-            gap_by_category = df.groupby(var)[efficiency_col].mean() - benchmark
+        # Média da eficiência por (fatia, categoria)
+        sums = np.bincount(cell, weights=eff[valid], minlength=size).reshape(n_slices, n_categories)
+        counts = np.bincount(cell, minlength=size).reshape(n_slices, n_categories)
+        observed = counts > 0
+        means = np.where(observed, sums / np.maximum(counts, 1), 0.0)
 
-            # Média dos gaps entre as categorias da variável
-            avg_gap = gap_by_category.mean()
+        # Média das médias por categoria menos o benchmark
+        n_observed = observed.sum(axis=1)
+        with np.errstate(invalid="ignore"):
+            avg_mean = np.where(n_observed > 0, means.sum(axis=1) / n_observed, np.nan)
 
-            results.append({
-                "Variable": var,
-                f"Gap at P{int(q*100)}": round(avg_gap, 3)
-            })
+        table = peers["table"][slice_by].copy()
+        table["Variable"] = var
+        table[gap_cols] = np.round(avg_mean[:, None] - benchmarks, 3)
+        tables.append(table)
 
-    # Constrói tabela
-    result_df = pd.DataFrame(results)
+    if not tables:
+        return pd.DataFrame(columns=slice_by + ["Variable"] + gap_cols)
 
-    # Pivot para ter colunas por percentil
-    result_df = result_df.pivot_table(index="Variable", aggfunc="first")
+    result_df = pd.concat(tables, ignore_index=True)
+    return result_df.sort_values(slice_by + ["Variable"], kind="stable").reset_index(drop=True)
 
-    # Ordena colunas por percentil
-    ordered_cols = [f"Gap at P{int(q*100)}" for q in percentiles if f"Gap at P{int(q*100)}" in result_df.columns]
-    result_df = result_df[ordered_cols].reset_index()
 
-    return result_df
+def export_gap_table(gap_table: pd.DataFrame, output: str = "gap_summary_table",
+                     formats: tuple = ("csv", "tex", "parquet")) -> list:
+    """
+    Write `gap_table` as ``<output>.csv``, ``.tex`` and/or ``.parquet``.
 
-# Carrega os dados
-df = pd.read_csv("Data/dados_completos.csv")
+    :return: Paths written.
+    """
+    output = Path(output)
+    written = []
+    for fmt in formats:
+        path = output.with_suffix(f".{fmt}")
+        if fmt == "csv":
+            gap_table.to_csv(path, index=False)
+        elif fmt == "tex":
+            path.write_text(gap_table.to_latex(index=False, float_format="%.3f"))
+        elif fmt == "parquet":
+            gap_table.to_parquet(path, index=False)
+        else:
+            raise ValueError(f"Unknown export format: {fmt}")
+        written.append(path)
+    return written
 
-variables_to_check = [
-    "bidders",
-    "covid_pandemic",
-    "execution_dummy",  # podes remover se necessário
-    "act_type",
-    "CPV_agrupado",
-    "loc",
-    "contract_year",
-    "ln_base_price",
-    "environmental"
-]
 
-# Calcula a tabela
-gap_table = compute_efficiency_gap_by_variable(df, variables_to_check)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Efficiency gap table by variable and benchmark percentile.")
+    parser.add_argument("--data", default="Data/dados_completos.csv")
+    parser.add_argument("--percentiles", type=float, nargs="+", default=GAP_PERCENTILES)
+    parser.add_argument("--slice-by", nargs="*", default=[])
+    parser.add_argument("--bins", type=int, default=10)
+    parser.add_argument("--output", default="gap_summary_table")
+    parser.add_argument("--formats", nargs="+", default=["csv"])
+    args = parser.parse_args()
+
+    # Carrega os dados
+    df = pd.read_csv(args.data)
+
+    # Calcula a tabela
+    gap_table = compute_efficiency_gap_by_variable(
+        df, GAP_VARIABLES, percentiles=args.percentiles, slice_by=args.slice_by, bins=args.bins
+    )
 
-# Exporta
-gap_table.to_csv("gap_summary_table.csv", index=False)
-print(gap_table.to_latex(index=False, float_format="%.3f"))
\ No newline at end of file
+    # Exporta
+    export_gap_table(gap_table, args.output, formats=tuple(args.formats))
+    print(gap_table.to_latex(index=False, float_format="%.3f"))
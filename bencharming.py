@@ -3,17 +3,30 @@ import numpy as np
 import streamlit as st
 import plotly.express as px
 from plotly import graph_objects as go
+from data_store import load_dataset, dataset_version
+from bitmap_index import load_bitmap_index, select, column_keys, group_aggregate
+from olap_cube import load_cube, query_cube
+from bootstrap import DEFAULT_REPLICATES, DEFAULT_SEED, benchmark_savings_statistic, streamlit_bootstrap, format_ci
+from benchmark_engine import PEER_GROUPS, parse_benchmark, row_thresholds, peer_thresholds, load_peer_thresholds, load_savings_curve
 
 def load_data(filepath: str) -> pd.DataFrame:
-    return pd.read_csv(filepath)
-def apply_benchmark_gap(df, benchmark="p75"):
+    return load_dataset(filepath)
+def apply_benchmark_gap(df, benchmark="p75", peer_by=None, peers=None):
+    """
+    Simulated price and gap of every contract against the `benchmark`
+    efficiency percentile of the whole table or, with `peer_by`, of the
+    contract's peer group. `peers` (from `load_peer_thresholds`) reuses
+    thresholds already computed for the same rows.
+    """
     df = df.copy()
 
-    quantile_map = {"p50": 0.50, "p75": 0.75, "p90": 0.90}
-    if benchmark not in quantile_map:
-        raise ValueError("Benchmark must be one of: 'p50', 'p75', 'p90'")
-
-    threshold = df["efficiency"].quantile(quantile_map[benchmark])
+    # Aceita qualquer percentil entre p1 e p99 (ValueError caso contrário)
+    if peer_by:
+        if peers is None:
+            peers = peer_thresholds(df, peer_by)
+        threshold = row_thresholds(peers, benchmark)
+    else:
+        threshold = df["efficiency"].quantile(parse_benchmark(benchmark))
 
     # 🟡 Cálculo sempre baseado no benchmark — independentemente de ser mais ou menos eficiente
     df["price_sim"] = df["effective_total_price"] * (df["efficiency"] / threshold)
@@ -29,8 +42,8 @@ def apply_benchmark_gap(df, benchmark="p75"):
 
     return df
 
-def run_benchmark_and_store(df, benchmark='p75'):
-    df_bench = apply_benchmark_gap(df, benchmark)
+def run_benchmark_and_store(df, benchmark='p75', peer_by=None, peers=None):
+    df_bench = apply_benchmark_gap(df, benchmark, peer_by, peers)
     st.session_state['bench_df'] = df_bench
 
 def show_benchmark_metrics():
@@ -42,19 +55,25 @@ def show_benchmark_metrics():
 """, unsafe_allow_html=True)
 
     # Benchmark selection
-    col_select, _, _, _ = st.columns(4)
+    col_select, col_peer, _, _ = st.columns(4)
     with col_select:
-        benchmark_label = st.selectbox("Select Benchmark Scenario:", ["p50", "p75", "p90"], format_func=lambda x: x.upper())
+        percentile = st.slider("Select Benchmark Percentile:", min_value=1, max_value=99, value=50, step=1)
+        benchmark_label = f"p{percentile}"
+    with col_peer:
+        peer_group = st.selectbox("Compare Against:", options=list(PEER_GROUPS))
+        peer_by = PEER_GROUPS[peer_group]
 
     # Load and process data
     raw_df = load_data("Data/dados_completos.csv")
+    # Limiares de todos os grupos e percentis, calculados uma vez por snapshot
+    peers = load_peer_thresholds("Data/dados_completos.csv", peer_by)
 
     if (
         'bench_df' not in st.session_state or
-        st.session_state.get('current_benchmark') != benchmark_label
+        st.session_state.get('current_benchmark') != (benchmark_label, peer_group)
     ):
-        run_benchmark_and_store(raw_df, benchmark=benchmark_label)
-        st.session_state['current_benchmark'] = benchmark_label
+        run_benchmark_and_store(raw_df, benchmark=benchmark_label, peer_by=peer_by, peers=peers)
+        st.session_state['current_benchmark'] = (benchmark_label, peer_group)
 
     df = st.session_state['bench_df']
 
@@ -68,28 +87,36 @@ def show_benchmark_metrics():
     with col3:
         st.metric("Contracts Below Benchmark", int((df['gap_sign'] < 0).sum()))
     st.markdown("---")
-    # Summary
-    benchmark_value = df["efficiency"].quantile({"p50": 0.5, "p75": 0.75, "p90": 0.9}[benchmark_label])
-    df["price_sim"] = df.apply(
-        lambda row: row["effective_total_price"] * (row["efficiency"] / benchmark_value)
-        if row["efficiency"] < benchmark_value else row["effective_total_price"],
-        axis=1
-    )
-    real_cost = df["effective_total_price"].sum()
-    sim_cost = df["price_sim"].sum()
-    savings = real_cost - sim_cost
-   
+    # Summary: curva de poupança para todos os percentis (calculada uma vez)
+    curve = load_savings_curve("Data/dados_completos.csv", peer_by)
+    point = curve.loc[curve["percentile"] == percentile].iloc[0]
+    real_cost = point["real_cost"]
+    sim_cost = point["sim_cost"]
+    savings = point["savings"]
+
+    # Intervalo de confiança bootstrap (benchmark re-estimado em cada réplica)
+    ci = None
+    if not peer_by:
+        with st.expander("Bootstrap Settings"):
+            col_reps, col_seed = st.columns(2)
+            n_replicates = col_reps.number_input("Replicates", min_value=100, max_value=20000, value=DEFAULT_REPLICATES, step=100)
+            seed = col_seed.number_input("Seed", min_value=0, value=DEFAULT_SEED, step=1)
+        statistic, n = benchmark_savings_statistic(raw_df["efficiency"], raw_df["effective_total_price"], percentile / 100)
+        ci = streamlit_bootstrap(("benchmark", percentile, dataset_version("Data/dados_completos.csv")), statistic, n, savings,
+                                 n_replicates=int(n_replicates), seed=int(seed))
+
     st.markdown("##### Summary & Estimated Savings")
     col_left, col_right = st.columns(2)
 
     with col_left:
         summary = pd.DataFrame({
-            "Metric": ["Scenario", "Real Cost (€)", "Simulated Cost (€)", "Estimated Savings (€)"],
+            "Metric": ["Scenario", "Real Cost (€)", "Simulated Cost (€)", "Estimated Savings (€)", "Savings Uncertainty"],
             "Value": [
-                benchmark_label.upper(),
+                benchmark_label.upper() if not peer_by else f"{benchmark_label.upper()} within {peer_group}",
                 f"€ {real_cost:,.0f}".replace(",", " "),
                 f"€ {sim_cost:,.0f}".replace(",", " "),
-                f"€ {savings:,.0f}".replace(",", " ")
+                f"€ {savings:,.0f}".replace(",", " "),
+                format_ci(ci) if ci else "Only for the all-contracts benchmark"
             ]
         })
         st.dataframe(summary, use_container_width=True, hide_index=True)
@@ -113,21 +140,58 @@ def show_benchmark_metrics():
             font=dict(color='black')
         )
         st.plotly_chart(fig, use_container_width=True)
+
+    fig_curve = px.line(
+        curve, x="percentile", y="savings",
+        labels={"percentile": "Benchmark Percentile", "savings": "Estimated Savings (€)"},
+        color_discrete_sequence=["#2980B9"]
+    )
+    fig_curve.add_vline(x=percentile, line_dash="dash", line_color="#E74C3C")
+    if ci:
+        fig_curve.add_trace(go.Scatter(
+            x=[percentile], y=[savings], mode="markers", marker=dict(color="#E74C3C"),
+            error_y=dict(type="data", symmetric=False, array=[ci["high"] - savings], arrayminus=[savings - ci["low"]]),
+            name=f"{ci['level']:.0%} CI", showlegend=False
+        ))
+    fig_curve.update_layout(
+        title="Estimated Savings by Benchmark Percentile",
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font=dict(color='black')
+    )
+    st.plotly_chart(fig_curve, use_container_width=True)
+
+    if peer_by:
+        with st.expander(f"{benchmark_label.upper()} Efficiency Benchmark by {peer_group}"):
+            # Médias e totais por grupo lidos do cubo; os quantis vêm de peer_thresholds
+            group_totals = query_cube(load_cube("Data/dados_completos.csv"), peer_by,
+                                      measures=["efficiency", "effective_total_price"])
+            st.dataframe(
+                peers["table"][peer_by + ["n", benchmark_label]]
+                .merge(group_totals[peer_by + ["efficiency_mean", "effective_total_price_sum"]], on=peer_by, how="left")
+                .rename(columns={"n": "Contracts", benchmark_label: "Benchmark Efficiency",
+                                 "efficiency_mean": "Mean Efficiency",
+                                 "effective_total_price_sum": "Total Spend (€)"}),
+                use_container_width=True, hide_index=True
+            )
     st.markdown("---")
-    # Filtros
+    # Filtros (bitmaps pré-calculados sobre a mesma tabela, mesma ordem de linhas)
+    bitmaps = load_bitmap_index("Data/dados_completos.csv")
     st.markdown("##### Contracts Above / Below Benchmark by Variable")
     left_col, right_col = st.columns([1, 3])
     with left_col:
         st.markdown("Filters")
-        selected_locs = st.multiselect("Select Location(s)", df["loc"].dropna().unique().tolist())
-        min_y, max_y = int(df["contract_year"].min()), int(df["contract_year"].max())
+        selected_locs = st.multiselect("Select Location(s)", bitmaps["columns"]["loc"]["values"])
+        years = bitmaps["columns"]["contract_year"]["values"]
+        min_y, max_y = int(min(years)), int(max(years))
         selected_years = st.slider("Select Contract Year Range", min_value=min_y, max_value=max_y, value=(min_y, max_y))
 
-    df_filtered = df[
-        df["loc"].isin(selected_locs) &
-        df["contract_year"].between(*selected_years)
-    ].copy()
-    df_filtered["bench_status"] = df_filtered["gap_sign"].map({1: "Above", -1: "Below", 0: "On Target"})
+    selection = select(bitmaps, {"loc": selected_locs, "contract_year": tuple(selected_years)})
+    gap_sign = df["gap_sign"].to_numpy(dtype=np.float64)
+    status_keys = (
+        np.select([gap_sign > 0, gap_sign < 0, gap_sign == 0], [0, 1, 2], default=-1),
+        ["Above", "Below", "On Target"],
+    )
 
     with right_col:
         pretty_names = {
@@ -146,14 +210,19 @@ def show_benchmark_metrics():
         if selected_var == "base_price":
             bins = [0, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6, float('inf')]
             labels = ["<10K", "10K–50K", "50K–100K", "100K–500K", "500K–1M", "1M–5M", "5M+"]
-            df_filtered["bin"] = pd.cut(df_filtered["base_price"], bins=bins, labels=labels)
             x_var = "bin"
+            x_keys = (pd.cut(df["base_price"], bins=bins, labels=labels).cat.codes.to_numpy(), labels)
         else:
             x_var = selected_var
+            codes, values = column_keys(bitmaps, selected_var)
             if selected_var == "execution_dummy":
-                df_filtered[selected_var] = df_filtered[selected_var].map({0: "Not Met", 1: "Met"})
+                values = [{0: "Not Met", 1: "Met"}[v] for v in values]
+            x_keys = (codes, values)
 
-        grouped = df_filtered.groupby([x_var, "bench_status"]).size().reset_index(name="contracts")
+        grouped = (
+            group_aggregate(bitmaps, selection, {x_var: x_keys, "bench_status": status_keys})
+            .rename(columns={"count": "contracts"})
+        )
         
         fig = px.bar(
             grouped,
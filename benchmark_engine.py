@@ -0,0 +1,197 @@
+import re
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_store import CONTRACTS_CSV, dataset_version, load_dataset
+
+PERCENTILES = np.arange(1, 100)
+
+# Peer groups offered in the UI: label -> grouping columns ([] = whole table)
+PEER_GROUPS = {
+    "All Contracts": [],
+    "CPV Group": ["CPV_agrupado"],
+    "Location NUTSII": ["loc"],
+    "Contract Year": ["contract_year"],
+    "CPV Group × Location": ["CPV_agrupado", "loc"],
+    "CPV Group × Year": ["CPV_agrupado", "contract_year"],
+}
+
+
+def parse_benchmark(benchmark) -> float:
+    """
+    Turn a benchmark label (``"p75"``) or a percentile (``75``) into a
+    quantile in (0, 1).
+    """
+    match = re.fullmatch(r"[pP]?(\d{1,2})", str(benchmark).strip())
+    if not match or not 1 <= int(match.group(1)) <= 99:
+        raise ValueError("Benchmark must be a percentile between 'p1' and 'p99'")
+    return int(match.group(1)) / 100
+
+
+def group_codes(df: pd.DataFrame, by: list) -> tuple:
+    """
+    Integer peer-group code per row (-1 when a key is missing) and the
+    group labels, in code order. An empty `by` puts every row in group 0.
+    """
+    if not by:
+        return np.zeros(len(df), dtype=np.int64), pd.DataFrame(index=[0])
+    grouper = df.groupby(list(by), observed=True, sort=True)
+    codes = grouper.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+    labels = grouper.size().index.to_frame(index=False)
+    return codes, labels
+
+
+def _sort_segments(efficiency, groups, *extra, n_groups: int = None):
+    # Sort rows by (group, efficiency) once; each group becomes a contiguous
+    # segment [starts[g], starts[g] + counts[g]). Every one of the `n_groups`
+    # codes gets a segment, empty when none of its rows has an efficiency.
+    eff = np.asarray(efficiency, dtype=np.float64)
+    groups = np.asarray(groups, dtype=np.int64)
+    if n_groups is None:
+        n_groups = int(groups.max()) + 1 if len(groups) else 0
+    valid = ~np.isnan(eff) & (groups >= 0)
+
+    eff, groups = eff[valid], groups[valid]
+    extra = [np.asarray(x, dtype=np.float64)[valid] for x in extra]
+    order = np.lexsort((eff, groups))
+
+    counts = np.bincount(groups, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+    return eff[order], groups[order], starts, counts, [x[order] for x in extra]
+
+
+def _segment_quantiles(eff_sorted, starts, counts, quantiles):
+    # Linear-interpolation quantiles (pandas' default) for every segment and
+    # every quantile at once: result has shape (n_groups, n_quantiles).
+    h = (np.maximum(counts, 1) - 1)[:, None] * np.asarray(quantiles)[None, :]
+    low = np.floor(h).astype(np.int64)
+    high = np.minimum(low + 1, np.maximum(counts, 1)[:, None] - 1)
+    idx_low = np.minimum(starts[:, None] + low, max(len(eff_sorted) - 1, 0))
+    idx_high = np.minimum(starts[:, None] + high, max(len(eff_sorted) - 1, 0))
+    if not len(eff_sorted):
+        return np.full(h.shape, np.nan)
+    values = eff_sorted[idx_low] + (h - low) * (eff_sorted[idx_high] - eff_sorted[idx_low])
+    return np.where(counts[:, None] > 0, values, np.nan)
+
+
+def peer_thresholds(df: pd.DataFrame, by: list, percentiles=PERCENTILES,
+                    efficiency_col: str = "efficiency") -> dict:
+    """
+    Efficiency benchmark of every peer group at every percentile.
+
+    One sort by (group, efficiency) and a segmented quantile replace a
+    per-group quantile loop.
+
+    Returns
+    -------
+    dict
+        ``table``: one row per group with the `by` columns, ``n`` and one
+        ``p<k>`` column per percentile; ``codes``: the group of each row of
+        `df` (-1 when a key is missing), to join thresholds back.
+    """
+    codes, labels = group_codes(df, by)
+    eff_sorted, _, starts, counts, _ = _sort_segments(df[efficiency_col], codes, n_groups=len(labels))
+    values = _segment_quantiles(eff_sorted, starts, counts, np.asarray(percentiles) / 100)
+
+    table = labels.assign(n=counts)
+    quantile_columns = pd.DataFrame(values, columns=[f"p{p}" for p in percentiles], index=table.index)
+    table = pd.concat([table, quantile_columns], axis=1)
+    return {"table": table, "codes": codes}
+
+
+def row_thresholds(peers: dict, benchmark) -> np.ndarray:
+    """Benchmark threshold of each row's peer group (NaN for rows without a group)."""
+    column = f"p{round(parse_benchmark(benchmark) * 100)}"
+    per_group = peers["table"][column].to_numpy(dtype=np.float64)
+    codes = peers["codes"]
+    return np.where(codes >= 0, per_group[np.maximum(codes, 0)], np.nan)
+
+
+def savings_curve(efficiency, price, percentiles=PERCENTILES, groups=None) -> pd.DataFrame:
+    """
+    Real cost, simulated cost and savings for every benchmark percentile.
+
+    For a threshold ``t`` (the efficiency quantile of the contract's peer
+    group, or of the whole table when `groups` is None), contracts with
+    ``efficiency < t`` are re-priced at ``price * efficiency / t`` and the
+    others keep their price. Efficiency is sorted once and prefix sums of
+    ``price`` and ``price * efficiency`` give each group and percentile with
+    a couple of lookups, so the whole curve costs O(n log n).
+
+    Parameters
+    ----------
+    efficiency, price : array-like
+        Per-contract efficiency score and effective total price.
+    percentiles : array-like
+        Percentiles (1–99) to evaluate.
+    groups : array-like, optional
+        Peer-group code per contract (see `group_codes`); -1 keeps the price.
+
+    Returns
+    -------
+    pd.DataFrame
+        ``percentile``, ``real_cost``, ``sim_cost``, ``savings`` and, for a
+        global benchmark, ``threshold``.
+    """
+    cost = np.nan_to_num(np.asarray(price, dtype=np.float64))
+    if groups is None:
+        groups = np.zeros(len(cost), dtype=np.int64)
+
+    eff_sorted, groups_sorted, starts, counts, (cost_sorted,) = _sort_segments(efficiency, groups, cost)
+    cost_sorted = np.nan_to_num(cost_sorted)
+
+    percentiles = np.asarray(percentiles)
+    thresholds = _segment_quantiles(eff_sorted, starts, counts, percentiles / 100)
+
+    # Rows below each threshold: dense efficiency ranks make (group, rank) an
+    # exact integer key that is sorted like the rows.
+    levels = np.unique(eff_sorted)
+    stride = len(levels) + 1
+    keys = groups_sorted * stride + np.searchsorted(levels, eff_sorted)
+    ranks = np.searchsorted(levels, np.nan_to_num(thresholds, nan=-np.inf), side="left")
+    ends = np.searchsorted(keys, np.arange(len(counts))[:, None] * stride + ranks, side="left")
+
+    cum_cost = np.concatenate(([0.0], np.cumsum(cost_sorted)))
+    cum_cost_eff = np.concatenate(([0.0], np.cumsum(cost_sorted * eff_sorted)))
+    below_cost = cum_cost[ends] - cum_cost[starts][:, None]
+    below_cost_eff = cum_cost_eff[ends] - cum_cost_eff[starts][:, None]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rescaled = np.where(thresholds > 0, below_cost_eff / thresholds, below_cost)
+
+    real_cost = cost.sum()
+    sim_cost = real_cost - below_cost.sum(axis=0) + rescaled.sum(axis=0)
+
+    curve = pd.DataFrame({
+        "percentile": percentiles,
+        "real_cost": real_cost,
+        "sim_cost": sim_cost,
+        "savings": real_cost - sim_cost,
+    })
+    if len(counts) == 1:
+        curve.insert(1, "threshold", thresholds[0])
+    return curve
+
+
+@st.cache_resource(show_spinner=False)
+def _load_peer_thresholds(csv_path: str, version: float, by: tuple) -> dict:
+    return peer_thresholds(load_dataset(csv_path), list(by))
+
+
+def load_peer_thresholds(csv_path=CONTRACTS_CSV, by=()) -> dict:
+    """`peer_thresholds` of the whole table for `by`, cached per snapshot."""
+    return _load_peer_thresholds(str(csv_path), dataset_version(csv_path), tuple(by))
+
+
+@st.cache_resource(show_spinner=False)
+def _load_savings_curve(csv_path: str, version: float, by: tuple) -> pd.DataFrame:
+    df = load_dataset(csv_path)
+    groups = load_peer_thresholds(csv_path, by)["codes"] if by else None
+    return savings_curve(df["efficiency"], df["effective_total_price"], groups=groups)
+
+
+def load_savings_curve(csv_path=CONTRACTS_CSV, by=()) -> pd.DataFrame:
+    """Savings curve of the whole table (peer-relative when `by` is given), cached per snapshot."""
+    return _load_savings_curve(str(csv_path), dataset_version(csv_path), tuple(by))
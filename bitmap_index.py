@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_store import CONTRACTS_CSV, dataset_version, load_dataset
+
+# Columns that get one bitmap per distinct value
+BITMAP_COLUMNS = [
+    "loc",
+    "contract_year",
+    "CPV_agrupado",
+    "act_type",
+    "environmental",
+    "covid_pandemic",
+    "execution_dummy",
+    "bidders",
+]
+
+
+def build_bitmap_index(df: pd.DataFrame, columns: list = BITMAP_COLUMNS) -> dict:
+    """
+    Precompute a packed bitmap (1 bit per row) for every value of `columns`.
+
+    Returns
+    -------
+    dict
+        ``n``: number of rows; ``columns``: per column, the sorted distinct
+        ``values``, their ``lookup`` position, the per-row ``codes`` (-1 for
+        missing) and the list of packed ``bitmaps`` (one per value).
+    """
+    index = {"n": len(df), "columns": {}}
+    for col in columns:
+        codes, uniques = pd.factorize(df[col], sort=True)
+        values = list(uniques)
+        index["columns"][col] = {
+            "values": values,
+            "lookup": {v: k for k, v in enumerate(values)},
+            "codes": codes.astype(np.int32),
+            "bitmaps": [np.packbits(codes == k) for k in range(len(values))],
+        }
+    return index
+
+
+@st.cache_resource(show_spinner=False)
+def _load_bitmap_index(csv_path: str, version: float) -> dict:
+    return build_bitmap_index(load_dataset(csv_path))
+
+
+def load_bitmap_index(csv_path=CONTRACTS_CSV) -> dict:
+    """Bitmap index over `BITMAP_COLUMNS`, built once per snapshot."""
+    return _load_bitmap_index(str(csv_path), dataset_version(csv_path))
+
+
+def all_rows(index: dict) -> np.ndarray:
+    """Bitmap with every row set (padding bits stay clear)."""
+    return np.packbits(np.ones(index["n"], dtype=bool))
+
+
+def select(index: dict, filters: dict) -> np.ndarray:
+    """
+    Bitmap of the rows matching `filters`.
+
+    `filters` maps an indexed column to a list of accepted values (OR of
+    their bitmaps) or to a ``(low, high)`` tuple, inclusive. Conditions on
+    different columns are combined with AND. Work is proportional to the
+    number of selected values times ``n / 8`` bytes.
+    """
+    result = all_rows(index)
+    scratch = np.empty_like(result)
+    for col, cond in filters.items():
+        entry = index["columns"][col]
+        if isinstance(cond, tuple):
+            low, high = cond
+            picked = [k for k, v in enumerate(entry["values"]) if low <= v <= high]
+        else:
+            picked = [entry["lookup"][v] for v in cond if v in entry["lookup"]]
+
+        scratch[:] = 0
+        for k in picked:
+            np.bitwise_or(scratch, entry["bitmaps"][k], out=scratch)
+        np.bitwise_and(result, scratch, out=result)
+    return result
+
+
+def count(bitmap: np.ndarray) -> int:
+    """Number of rows set in `bitmap`."""
+    return int(np.bitwise_count(bitmap).sum(dtype=np.int64))
+
+
+def rows(index: dict, bitmap: np.ndarray) -> np.ndarray:
+    """
+    Positions of the rows set in `bitmap`, in increasing order.
+
+    Only the non-zero bytes are unpacked, so a narrow selection costs a
+    scan of ``n / 8`` bytes rather than an ``n``-byte bit array.
+    """
+    words = np.flatnonzero(bitmap)
+    byte, bit = np.nonzero(np.unpackbits(bitmap[words][:, None], axis=1))
+    return words[byte] * 8 + bit
+
+
+def column_keys(index: dict, col: str) -> tuple:
+    """``(codes, labels)`` of an indexed column, for `group_aggregate`."""
+    entry = index["columns"][col]
+    return entry["codes"], entry["values"]
+
+
+def group_aggregate(index: dict, bitmap: np.ndarray, keys: dict,
+                    values: np.ndarray = None) -> pd.DataFrame:
+    """
+    Count (and optionally sum / average `values`) the selected rows per
+    combination of `keys`, without materialising the filtered frame.
+
+    Parameters
+    ----------
+    index : dict
+        Output of `build_bitmap_index`.
+    bitmap : np.ndarray
+        Row selection, e.g. from `select`.
+    keys : dict
+        ``{name: (codes, labels)}`` with one integer code per row of the
+        table (-1 for missing); see `column_keys`.
+    values : np.ndarray, optional
+        Per-row measure; adds ``sum`` and ``mean`` (NaN-aware) columns.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per observed combination: the key columns and ``count``.
+    """
+    picked = rows(index, bitmap)
+    shape = tuple(len(labels) for _, labels in keys.values())
+
+    combined = np.zeros(len(picked), dtype=np.int64)
+    valid = np.ones(len(picked), dtype=bool)
+    for (codes, labels) in keys.values():
+        c = codes[picked]
+        valid &= c >= 0
+        combined = combined * len(labels) + c
+    combined = combined[valid]
+    size = int(np.prod(shape))
+
+    counts = np.bincount(combined, minlength=size)
+    cells = np.flatnonzero(counts)
+    out = {
+        name: [labels[i] for i in pos]
+        for (name, (_, labels)), pos in zip(keys.items(), np.unravel_index(cells, shape))
+    }
+    out["count"] = counts[cells]
+
+    if values is not None:
+        v = np.asarray(values, dtype=np.float64)[picked][valid]
+        present = ~np.isnan(v)
+        sums = np.bincount(combined[present], weights=v[present], minlength=size)[cells]
+        n = np.bincount(combined[present], minlength=size)[cells]
+        out["sum"] = sums
+        out["mean"] = np.where(n > 0, sums / np.maximum(n, 1), np.nan)
+
+    return pd.DataFrame(out)
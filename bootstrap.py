@@ -0,0 +1,176 @@
+import numpy as np
+import streamlit as st
+
+DEFAULT_REPLICATES = 2000
+DEFAULT_SEED = 42
+CHUNK_BYTES = 64 * 2**20   # memory budget of one chunk of replicates
+# Peak bytes per resampled row while a chunk is evaluated: the int32 index,
+# its sorted copy and the float64/bool (chunk, n) temporaries of the
+# statistics below (about 41 for `benchmark_savings_statistic`, 21 for
+# `rf_savings_statistic`)
+BYTES_PER_DRAW = 48
+
+
+def chunk_size_for(n: int, budget: int = CHUNK_BYTES) -> int:
+    """Replicates per chunk so that evaluating a chunk of `n`-row resamples fits in `budget` bytes."""
+    return max(1, budget // (BYTES_PER_DRAW * max(n, 1)))
+
+
+def iter_bootstrap(statistic, n: int, n_replicates: int = DEFAULT_REPLICATES,
+                   seed: int = DEFAULT_SEED, chunk_size: int = None):
+    """
+    Stream bootstrap replicates of `statistic` in chunks.
+
+    Each chunk draws a ``(chunk, n)`` matrix of row indices (resampling with
+    replacement) and evaluates `statistic` on all of its rows at once.
+
+    Parameters
+    ----------
+    statistic : callable
+        Maps an index matrix ``(k, n)`` to ``k`` replicate values, e.g. from
+        `benchmark_savings_statistic` or `rf_savings_statistic`.
+    n : int
+        Number of rows in the resampled population.
+    n_replicates : int
+        Total number of bootstrap replicates.
+    seed : int
+        Seed of the generator; the same seed gives the same replicates
+        whatever the chunk size.
+    chunk_size : int, optional
+        Replicates per chunk. Evaluating a chunk takes about
+        ``chunk_size * n * BYTES_PER_DRAW`` bytes, so the default
+        (`chunk_size_for`) derives it from `n` and `CHUNK_BYTES`.
+
+    Yields
+    ------
+    tuple
+        ``(done, values)``: replicates produced so far and the values of the
+        current chunk.
+    """
+    chunk_size = chunk_size or chunk_size_for(n)
+    rng = np.random.default_rng(seed)
+    done = 0
+    while done < n_replicates:
+        size = min(chunk_size, n_replicates - done)
+        idx = rng.integers(0, n, size=(size, n), dtype=np.int32)
+        values = statistic(idx)
+        done += size
+        yield done, values
+
+
+def summarize(replicates, estimate: float, level: float = 0.95) -> dict:
+    """Percentile confidence interval and standard error of the replicates."""
+    replicates = np.asarray(replicates, dtype=np.float64)
+    alpha = (1 - level) / 2
+    low, high = np.quantile(replicates, [alpha, 1 - alpha])
+    return {
+        "estimate": float(estimate),
+        "low": float(low),
+        "high": float(high),
+        "std_error": float(replicates.std(ddof=1)) if len(replicates) > 1 else np.nan,
+        "level": level,
+        "replicates": len(replicates),
+    }
+
+
+def bootstrap_ci(statistic, n: int, estimate: float, n_replicates: int = DEFAULT_REPLICATES,
+                 seed: int = DEFAULT_SEED, level: float = 0.95,
+                 chunk_size: int = None) -> dict:
+    """Run `iter_bootstrap` to completion and `summarize` the replicates."""
+    values = [chunk for _, chunk in iter_bootstrap(statistic, n, n_replicates, seed, chunk_size)]
+    return summarize(np.concatenate(values), estimate, level)
+
+
+# --- Statistics ------------------------------------------------------------
+
+def benchmark_savings_statistic(efficiency, price, quantile: float):
+    """
+    Savings of re-pricing contracts below the `quantile` efficiency benchmark
+    (``price * efficiency / t`` for ``efficiency < t``), with the benchmark
+    ``t`` re-estimated in every replicate.
+
+    Rows are pre-sorted by efficiency, so sorting each row of the index matrix
+    sorts the resample and the quantile is read off directly.
+
+    :return: ``(statistic, n)`` for `iter_bootstrap`.
+    """
+    eff = np.asarray(efficiency, dtype=np.float64)
+    cost = np.nan_to_num(np.asarray(price, dtype=np.float64))
+    valid = ~np.isnan(eff)
+    order = np.argsort(eff[valid], kind="stable")
+    eff_sorted, cost_sorted = eff[valid][order], cost[valid][order]
+    n = len(eff_sorted)
+
+    # Posição do quantil (interpolação linear, como no pandas)
+    h = (n - 1) * quantile
+    low = int(np.floor(h))
+    high = min(low + 1, n - 1)
+    frac = h - low
+
+    def statistic(idx):
+        idx = np.sort(idx, axis=1)
+        e = eff_sorted[idx]
+        p = cost_sorted[idx]
+        t = e[:, low] + frac * (e[:, high] - e[:, low])
+        below = e < t[:, None]
+        below_cost = np.where(below, p, 0.0).sum(axis=1)
+        below_cost_eff = np.where(below, p * e, 0.0).sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(t > 0, below_cost - below_cost_eff / t, 0.0)
+
+    return statistic, n
+
+
+def rf_savings_statistic(risk_prob, price, threshold: float):
+    """
+    Savings of replacing contracts with ``risk_prob >= threshold`` by the
+    mean price of the safe contracts, with that mean re-estimated in every
+    replicate.
+
+    :return: ``(statistic, n)`` for `iter_bootstrap`.
+    """
+    cost = np.nan_to_num(np.asarray(price, dtype=np.float64))
+    risky = np.asarray(risk_prob, dtype=np.float64) >= threshold
+    n = len(cost)
+
+    def statistic(idx):
+        p = cost[idx]
+        r = risky[idx]
+        n_risky = r.sum(axis=1)
+        risky_cost = np.where(r, p, 0.0).sum(axis=1)
+        safe_cost = p.sum(axis=1) - risky_cost
+        mean_safe_price = safe_cost / np.maximum(n - n_risky, 1)
+        return risky_cost - n_risky * mean_safe_price
+
+    return statistic, n
+
+
+# --- Streamlit -------------------------------------------------------------
+
+def streamlit_bootstrap(key, statistic, n: int, estimate: float,
+                        n_replicates: int = DEFAULT_REPLICATES,
+                        seed: int = DEFAULT_SEED, level: float = 0.95) -> dict:
+    """
+    `bootstrap_ci` with a progress bar, kept in ``st.session_state`` under
+    `key` (together with the replicate count and seed) so reruns reuse it.
+    """
+    cache = st.session_state.setdefault("bootstrap_cache", {})
+    cache_key = (key, n_replicates, seed, level)
+    if cache_key in cache:
+        return cache[cache_key]
+
+    progress = st.progress(0.0, text="Bootstrapping…")
+    values = []
+    for done, chunk in iter_bootstrap(statistic, n, n_replicates, seed):
+        values.append(chunk)
+        progress.progress(done / n_replicates, text=f"Bootstrapping… {done:,}/{n_replicates:,}")
+    progress.empty()
+
+    cache[cache_key] = summarize(np.concatenate(values), estimate, level)
+    return cache[cache_key]
+
+
+def format_ci(ci: dict) -> str:
+    """``"95% CI: € low – € high"`` with the repo's space thousands separator."""
+    return (f"{ci['level']:.0%} CI: € {ci['low']:,.0f} – € {ci['high']:,.0f}"
+            .replace(",", " "))
@@ -0,0 +1,153 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from benchmark_engine import group_codes
+from forest_compiler import encode, predict_proba
+
+BASELINE = "Baseline"
+MISSING_GROUP = "(missing)"   # rótulo do grupo das linhas sem chave de agrupamento
+CHUNK_ROWS = 100_000
+
+# Intervenções pré-definidas: {coluna: valor | (operação, argumento)}
+PRESET_INTERVENTIONS = {
+    "+1 bidder": {"bidders": ("add", 1)},
+    "+2 bidders": {"bidders": ("add", 2)},
+    "At least 3 bidders": {"bidders": ("at_least", 3)},
+    "Environmental criteria in all contracts": {"environmental": 1},
+}
+
+
+def apply_intervention(compiled: dict, X: np.ndarray, intervention: dict) -> np.ndarray:
+    """
+    Copy of the encoded matrix `X` with `intervention` applied.
+
+    `intervention` maps an input column to a new value (category labels are
+    translated to their code) or to ``("add", n)``, ``("mul", f)`` or
+    ``("at_least", n)``.
+    """
+    X = X.copy()
+    for col, change in intervention.items():
+        j = compiled["columns"].index(col)
+        if isinstance(change, tuple):
+            op, arg = change
+            if op == "add":
+                X[:, j] += arg
+            elif op == "mul":
+                X[:, j] *= arg
+            elif op == "at_least":
+                np.maximum(X[:, j], arg, out=X[:, j])
+            else:
+                raise ValueError(f"Unknown intervention operation: {op}")
+        elif col in compiled["categories"]:
+            X[:, j] = compiled["categories"][col].get(change, compiled["unknown_code"])
+        else:
+            X[:, j] = change
+    return X
+
+
+def _score_chunk(compiled, X, price, groups, n_groups, scenarios, threshold):
+    # Por cenário: somas por grupo de [sinalizados, custo sinalizado, custo seguro, n seguros]
+    out = {}
+    for name, intervention in scenarios.items():
+        risk = predict_proba(compiled, apply_intervention(compiled, X, intervention) if intervention else X)
+        flagged = risk >= threshold
+        sums = np.zeros((n_groups, 4))
+        sums[:, 0] = np.bincount(groups, weights=flagged, minlength=n_groups)
+        sums[:, 1] = np.bincount(groups, weights=np.where(flagged, price, 0.0), minlength=n_groups)
+        sums[:, 2] = np.bincount(groups, weights=np.where(flagged, 0.0, price), minlength=n_groups)
+        sums[:, 3] = np.bincount(groups, weights=~flagged, minlength=n_groups)
+        out[name] = sums
+    return out
+
+
+def score_portfolio(compiled: dict, df: pd.DataFrame, interventions: dict, by: list,
+                    threshold: float, chunk_rows: int = CHUNK_ROWS,
+                    n_jobs: int = None) -> pd.DataFrame:
+    """
+    Rescore every contract under each intervention and compare with the
+    baseline, per group.
+
+    The portfolio is encoded once and split into chunks of `chunk_rows`;
+    chunks are scored on a thread pool (the compiled forest releases the
+    GIL) and only per-group sums are kept, so memory does not grow with the
+    number of interventions. Flagged contracts (``risk >= threshold``) are
+    re-priced at the mean price of the unflagged contracts of the same
+    scenario, as in `rf.run_rf_mitigation`.
+
+    Parameters
+    ----------
+    compiled : dict
+        Output of `forest_compiler.compile_pipeline`.
+    df : pd.DataFrame
+        Contracts with the model inputs and ``effective_total_price``.
+    interventions : dict
+        ``{name: intervention}``; see `apply_intervention`.
+    by : list
+        Grouping columns for the report (empty for portfolio totals).
+        Contracts with a missing key are still scored and reported under
+        one extra group labelled `MISSING_GROUP` in every `by` column, so
+        the groups always add up to the portfolio.
+    threshold : float
+        Risk threshold.
+    chunk_rows : int
+        Rows per chunk.
+    n_jobs : int, optional
+        Worker threads (default: CPU count).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per (scenario, group): `by` columns, ``contracts``,
+        ``flagged_base``, ``flagged``, ``delta_flagged``, ``sim_cost_base``,
+        ``sim_cost`` and ``delta_cost``.
+    """
+    X = encode(compiled, df)
+    price = np.nan_to_num(df["effective_total_price"].to_numpy(dtype=np.float64))
+    groups, labels = group_codes(df, by)
+    if (groups < 0).any():
+        # Linhas sem chave formam um grupo próprio: os totais cobrem a carteira toda
+        groups = np.where(groups < 0, len(labels), groups)
+        missing = pd.DataFrame({col: [MISSING_GROUP] for col in labels.columns})
+        labels = pd.concat([labels.astype(object), missing], ignore_index=True)
+    n_groups = len(labels)
+
+    scenarios = {BASELINE: None, **interventions}
+    bounds = range(0, len(X), chunk_rows)
+    with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count()) as pool:
+        parts = list(pool.map(
+            lambda a: _score_chunk(compiled, X[a:a + chunk_rows], price[a:a + chunk_rows],
+                                   groups[a:a + chunk_rows], n_groups, scenarios, threshold),
+            bounds
+        ))
+
+    totals = {name: sum(part[name] for part in parts) for name in scenarios}
+    contracts = np.bincount(groups, minlength=n_groups)
+
+    def sim_cost(sums):
+        # Preço médio seguro do cenário inteiro, aplicado a todos os sinalizados
+        mean_safe_price = sums[:, 2].sum() / max(sums[:, 3].sum(), 1)
+        return sums[:, 2] + sums[:, 0] * mean_safe_price
+
+    base = totals[BASELINE]
+    base_cost = sim_cost(base)
+    tables = []
+    for name in interventions:
+        sums = totals[name]
+        cost = sim_cost(sums)
+        table = labels.copy() if by else pd.DataFrame(index=[0])
+        table.insert(0, "scenario", name)
+        table["contracts"] = contracts
+        table["flagged_base"] = base[:, 0].astype(np.int64)
+        table["flagged"] = sums[:, 0].astype(np.int64)
+        table["delta_flagged"] = table["flagged"] - table["flagged_base"]
+        table["sim_cost_base"] = base_cost
+        table["sim_cost"] = cost
+        table["delta_cost"] = cost - base_cost
+        tables.append(table)
+
+    if not tables:
+        return pd.DataFrame()
+    return pd.concat(tables, ignore_index=True)
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+
+CONTRACTS_CSV = "Data/dados_completos.csv"   # contract table + SFA efficiency
+SCORED_CSV    = "Data/dados.csv"             # same table + RF risk columns
+SNAPSHOT_DIR  = Path("Data/snapshots")
+
+# Declared storage types for the contract table. Columns not listed keep the
+# type pandas infers from the CSV (free text such as `cpvs` or
+# `competing_entities`).
+CONTRACT_SCHEMA = {
+    # categorical dictionaries
+    "act_type":                 "category",
+    "procedure_type":           "category",
+    "centralized_procedure":    "category",
+    "contractual_modifications": "category",
+    "environmental_criteria":   "category",
+    "Location":                 "category",
+    "loc":                      "category",
+    "cpvPrincipal_2chars":      "category",
+    "cpv_descricao":            "category",
+    "CPV_agrupado":             "category",
+    # flags
+    "execution_dummy":          "int8",
+    "environmental":            "int8",
+    "covid_pandemic":           "int8",
+    "custo_aumentou":           "int8",
+    # small counts / calendar parts
+    "contract_year":            "int16",
+    "contract_month":           "int8",
+    "contract_day":             "int8",
+    "bidders":                  "int16",
+    "Exectution":               "int16",
+    "execution_period":         "int16",
+    "nipcs":                    "int32",
+    # money and scores: float64, so sums and threshold comparisons match the CSV
+    "base_price":               "float64",
+    "contractual_price":        "float64",
+    "effective_total_price":    "float64",
+    "Variation_price":          "float64",
+    "efficiency":               "float64",
+    "risk_prob":                "float64",
+    "price_sim_rf":             "float64",
+    # model inputs and derived measures
+    "ln_effective_total_price": "float32",
+    "ln_base_price":            "float32",
+    "contract_year_centered":   "float32",
+    "contract_year_sq":         "float32",
+    # dates (stored as Arrow date32)
+    "contract_date":            "date",
+    "contract_close_date":      "date",
+}
+
+
+def apply_schema(df: pd.DataFrame, schema: dict = CONTRACT_SCHEMA) -> pd.DataFrame:
+    """
+    Cast the columns of `df` that appear in `schema` to their declared type.
+
+    Dates are parsed with ``errors="coerce"``; every other cast is strict, so
+    a feed that breaks the schema fails at ingest instead of in a tab.
+    """
+    df = df.copy(deep=False)
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        if dtype == "date":
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def _arrow_table(df: pd.DataFrame) -> pa.Table:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    fields = [
+        pa.field(f.name, pa.date32()) if CONTRACT_SCHEMA.get(f.name) == "date" else f
+        for f in table.schema
+    ]
+    return table.cast(pa.schema(fields))
+
+
+# Part of the snapshot file name, so editing the schema invalidates old snapshots.
+_SCHEMA_TAG = hashlib.md5(json.dumps(CONTRACT_SCHEMA, sort_keys=True).encode()).hexdigest()[:8]
+
+
+def snapshot_path(csv_path) -> Path:
+    """Location of the Arrow snapshot that mirrors `csv_path`."""
+    return SNAPSHOT_DIR / f"{Path(csv_path).stem}.{_SCHEMA_TAG}.arrow"
+
+
+def build_snapshot(csv_path, force: bool = False) -> Path:
+    """
+    Convert a CSV into an uncompressed Arrow IPC file, once.
+
+    `CONTRACT_SCHEMA` is applied on the way in, so the snapshot already holds
+    dictionary-encoded categoricals, narrow integers, float64 money and
+    score columns, float32 derived measures and date32 columns.
+
+    The snapshot is rebuilt only when the CSV is newer than it (or `force`).
+    It is written to a temporary file and moved into place, so concurrent
+    workers never memory-map a half-written file.
+
+    :param csv_path: Path to the source CSV.
+    :param force: Rebuild even if the snapshot is up to date.
+    :return: Path to the snapshot.
+    """
+    csv_path = Path(csv_path)
+    target = snapshot_path(csv_path)
+    csv_mtime = csv_path.stat().st_mtime          # FileNotFoundError if missing
+
+    if not force and target.exists() and target.stat().st_mtime >= csv_mtime:
+        return target
+
+    table = _arrow_table(apply_schema(pd.read_csv(csv_path)))
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_suffix(f".{os.getpid()}.tmp")
+    with pa.OSFile(str(tmp), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, target)
+    return target
+
+
+@st.cache_resource(show_spinner=False)
+def _open_snapshot(path: str, mtime: float) -> pd.DataFrame:
+    # `mtime` only takes part in the cache key, so a rebuilt snapshot is reopened.
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return table.to_pandas(split_blocks=True, date_as_object=False)
+
+
+def dataset_version(csv_path=CONTRACTS_CSV) -> float:
+    """
+    Modification time of the snapshot behind `csv_path`.
+
+    Derived structures (indexes, cubes, caches) take it as part of their
+    cache key so they are rebuilt whenever the snapshot is.
+    """
+    return build_snapshot(csv_path).stat().st_mtime
+
+
+def load_dataset(csv_path=CONTRACTS_CSV) -> pd.DataFrame:
+    """
+    Return the shared, memory-mapped frame for `csv_path`.
+
+    Every tab and every session gets a shallow copy of the same cached frame,
+    so the CSV is parsed once per process and numeric columns are read
+    straight from the page cache. Callers may add or replace whole columns
+    on the returned frame without affecting anybody else; partial in-place
+    edits are only isolated under pandas copy-on-write, which the dashboard
+    enables in ``app.py``.
+
+    :param csv_path: Path to the source CSV (``CONTRACTS_CSV`` by default).
+    :return: DataFrame backed by the Arrow snapshot.
+    """
+    path = build_snapshot(csv_path)
+    return _open_snapshot(str(path), path.stat().st_mtime).copy(deep=False)
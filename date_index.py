@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_store import CONTRACTS_CSV, dataset_version, load_dataset
+
+
+@st.cache_resource(show_spinner=False)
+def _build_close_date_index(csv_path: str, version: float) -> dict:
+    df = load_dataset(csv_path)
+
+    # Ordenar uma única vez pela data de FECHO (NaT ficam no fim)
+    order = np.argsort(df["contract_close_date"].to_numpy(), kind="stable")
+    frame = df.iloc[order].reset_index(drop=True)
+
+    # Colunas derivadas que só dependem dos dados
+    frame["Contract_Duration_Days"] = (
+        (frame["contract_close_date"] - frame["contract_date"]).dt.days.astype("Int64")
+    )
+    frame["contract_close_date_str"] = frame["contract_close_date"].dt.strftime("%d-%m-%Y")
+    frame["contract_date_str"] = frame["contract_date"].dt.strftime("%d-%m-%Y")
+
+    close = frame["contract_close_date"]
+    n_dated = int(close.notna().sum())
+
+    def prefix(values):
+        # prefix[i] = sum of the first i rows; prefix[hi] - prefix[lo] is a range sum
+        return np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+
+    eff = frame["efficiency"].to_numpy(dtype=np.float64, na_value=np.nan)
+    exe = frame["execution_dummy"].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    return {
+        "frame": frame,
+        "dates": close.to_numpy()[:n_dated].astype("datetime64[D]"),
+        "eff_sum": prefix(np.nan_to_num(eff)),
+        "eff_n": prefix(~np.isnan(eff)),
+        "exec_sum": prefix(np.nan_to_num(exe)),
+        "exec_n": prefix(~np.isnan(exe)),
+    }
+
+
+def build_close_date_index(csv_path=CONTRACTS_CSV) -> dict:
+    """
+    Contract table sorted by close date, with prefix sums for the KPIs.
+
+    Built once per snapshot and shared by every session.
+
+    Returns
+    -------
+    dict
+        ``frame``: the sorted table, plus ``Contract_Duration_Days`` and the
+        ``*_str`` display columns; ``dates``: sorted close dates (rows with a
+        missing close date are excluded, so it is empty when no row has one);
+        ``eff_sum``/``eff_n`` and ``exec_sum``/``exec_n``: prefix sums
+        (length ``n + 1``) of efficiency and execution and of their
+        non-missing counts.
+    """
+    return _build_close_date_index(str(csv_path), dataset_version(csv_path))
+
+
+def window_bounds(index: dict, start, end) -> tuple:
+    """
+    Row range ``[lo, hi)`` of contracts closed between `start` and `end`.
+
+    Both ends are inclusive dates; the lookup is two binary searches.
+    """
+    dates = index["dates"]
+    start = np.datetime64(pd.Timestamp(start).date(), "D")
+    end = np.datetime64(pd.Timestamp(end).date(), "D")
+    lo = int(np.searchsorted(dates, start, side="left"))
+    hi = int(np.searchsorted(dates, end, side="right"))
+    return lo, max(lo, hi)
+
+
+def window_frame(index: dict, lo: int, hi: int) -> pd.DataFrame:
+    """Contracts in ``[lo, hi)`` as a slice of the sorted frame (no boolean mask)."""
+    return index["frame"].iloc[lo:hi]
+
+
+def window_kpis(index: dict, lo: int, hi: int) -> dict:
+    """
+    Count, average efficiency and execution rate of the rows in ``[lo, hi)``.
+
+    Each figure is a difference of two prefix sums, so the cost does not
+    depend on the size of the window or of the table.
+    """
+    def mean(sums, counts):
+        n = counts[hi] - counts[lo]
+        return (sums[hi] - sums[lo]) / n if n else float("nan")
+
+    return {
+        "count": hi - lo,
+        "avg_efficiency": mean(index["eff_sum"], index["eff_n"]),
+        "execution_rate": mean(index["exec_sum"], index["exec_n"]),
+    }
@@ -0,0 +1,196 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from scipy.optimize import linprog
+
+from data_store import CONTRACTS_CSV, dataset_version, load_dataset
+
+DEFAULT_INPUTS = ["base_price", "bidders"]
+DEFAULT_OUTPUTS = ["effective_total_price", "execution_dummy"]
+MODELS = ("CCR", "BCC")          # retornos constantes / variáveis à escala
+UNITS = {"Contract": None, "Buyer (nipcs)": "nipcs"}
+
+BATCH_SIZE = 2_000
+TOLERANCE = 1e-6
+
+_worker_ref = None
+
+
+def dea_units(df: pd.DataFrame, inputs: list = DEFAULT_INPUTS, outputs: list = DEFAULT_OUTPUTS,
+              by: str = None) -> pd.DataFrame:
+    """
+    Decision units: one per contract, or per value of `by` (e.g. ``nipcs``)
+    with inputs and outputs summed over its contracts. Rows with missing
+    values are dropped.
+    """
+    cols = [*inputs, *outputs]
+    if by is None:
+        units = df[cols].astype(np.float64)
+    else:
+        units = df[[by, *cols]].groupby(by, observed=True)[cols].sum().astype(np.float64)
+    return units.dropna()
+
+
+def _non_dominated(X: np.ndarray, Y: np.ndarray) -> np.ndarray:
+    """
+    Positions of units not dominated by another (no unit uses no more of
+    every input and produces no less of every output, with one strict).
+
+    Units are visited in increasing order of normalized inputs minus
+    outputs, so a dominating unit is always seen before the units it
+    dominates and each unit is only compared with the frontier found so far.
+    """
+    scale_x = np.where(X.max(axis=0) > 0, X.max(axis=0), 1.0)
+    scale_y = np.where(Y.max(axis=0) > 0, Y.max(axis=0), 1.0)
+    order = np.argsort((X / scale_x).sum(axis=1) - (Y / scale_y).sum(axis=1), kind="stable")
+
+    kept = []
+    fx = np.empty((0, X.shape[1]))
+    fy = np.empty((0, Y.shape[1]))
+    for j in order:
+        # Também descarta duplicados exatos de uma unidade já na fronteira
+        if len(kept) and np.any((fx <= X[j]).all(axis=1) & (fy >= Y[j]).all(axis=1)):
+            continue
+        kept.append(j)
+        fx = np.vstack([fx, X[j]])
+        fy = np.vstack([fy, Y[j]])
+    return np.sort(np.asarray(kept, dtype=np.int64))
+
+
+def _solve_unit(x0, y0, RX, RY, model):
+    """
+    Input-oriented envelopment LP for one unit against reference units
+    ``(RX, RY)``: ``min θ`` s.t. ``RXᵀλ <= θ·x0``, ``RYᵀλ >= y0``,
+    ``λ >= 0`` (and ``Σλ = 1`` for BCC).
+
+    :return: ``(theta, lambdas)``.
+    """
+    m = len(RX)
+    c = np.zeros(m + 1)
+    c[0] = 1.0
+    A_ub = np.vstack([
+        np.column_stack([-x0, RX.T]),                      # entradas
+        np.column_stack([np.zeros(RY.shape[1]), -RY.T]),   # saídas
+    ])
+    b_ub = np.concatenate([np.zeros(RX.shape[1]), -y0])
+    A_eq = b_eq = None
+    if model == "BCC":
+        A_eq = np.concatenate([[0.0], np.ones(m)])[None, :]
+        b_eq = [1.0]
+    res = linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq,
+                  bounds=[(0, None)] * (m + 1), method="highs")
+    if res.status != 0:
+        return np.nan, np.zeros(m)
+    return res.x[0], res.x[1:]
+
+
+def _init_worker(RX, RY, model):
+    # Cada processo recebe o conjunto de referência uma única vez
+    global _worker_ref
+    _worker_ref = (RX, RY, model)
+
+
+def _solve_batch(batch):
+    X, Y = batch
+    RX, RY, model = _worker_ref
+    thetas = np.empty(len(X))
+    lambdas = np.empty((len(X), len(RX)))
+    for i in range(len(X)):
+        thetas[i], lambdas[i] = _solve_unit(X[i], Y[i], RX, RY, model)
+    return thetas, lambdas
+
+
+def _solve_all(X, Y, RX, RY, model, batch_size, n_jobs):
+    batches = [(X[a:a + batch_size], Y[a:a + batch_size]) for a in range(0, len(X), batch_size)]
+    n_jobs = min(n_jobs or os.cpu_count(), len(batches))
+    if n_jobs <= 1:
+        _init_worker(RX, RY, model)
+        parts = [_solve_batch(batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, mp_context=get_context("spawn"),
+                                 initializer=_init_worker, initargs=(RX, RY, model)) as pool:
+            parts = list(pool.map(_solve_batch, batches))
+    return np.concatenate([p[0] for p in parts]), np.vstack([p[1] for p in parts])
+
+
+def dea_scores(units: pd.DataFrame, inputs: list = DEFAULT_INPUTS, outputs: list = DEFAULT_OUTPUTS,
+               model: str = "CCR", batch_size: int = BATCH_SIZE, n_jobs: int = None) -> pd.DataFrame:
+    """
+    Input-oriented DEA efficiency of every unit in `units` (see `dea_units`).
+
+    Only efficient units can carry weight in an optimal solution, so the
+    reference set is built first and every other LP is solved against it
+    alone:
+
+    1. units dominated by another unit are dropped (a single sorted pass);
+    2. the remaining candidates are scored against each other, and those
+       with ``θ = 1`` form the reference set;
+    3. all units are scored against the reference set, in batches of
+       `batch_size` on a process pool.
+
+    Parameters
+    ----------
+    units : pd.DataFrame
+        One row per decision unit, with the `inputs` and `outputs` columns.
+    inputs, outputs : list
+        Input and output columns.
+    model : str
+        ``"CCR"`` (constant returns to scale) or ``"BCC"`` (variable).
+    batch_size : int
+        Units per LP batch.
+    n_jobs : int, optional
+        Worker processes (default: CPU count; ``1`` runs in-process).
+
+    Returns
+    -------
+    pd.DataFrame
+        Indexed like `units`: ``dea_score`` (θ in ``(0, 1]``), ``efficient``
+        and ``peers`` (index labels of the reference units with positive
+        weight).
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown DEA model: {model}")
+    X = units[inputs].to_numpy(dtype=np.float64)
+    Y = units[outputs].to_numpy(dtype=np.float64)
+
+    candidates = _non_dominated(X, Y)
+    cand_theta, _ = _solve_all(X[candidates], Y[candidates], X[candidates], Y[candidates],
+                               model, batch_size, n_jobs)
+    reference = candidates[cand_theta >= 1 - TOLERANCE]
+
+    theta, lambdas = _solve_all(X, Y, X[reference], Y[reference], model, batch_size, n_jobs)
+    labels = units.index[reference].astype(str).to_numpy()
+    peers = [", ".join(labels[row > TOLERANCE]) for row in lambdas]
+
+    return pd.DataFrame({
+        "dea_score": np.minimum(theta, 1.0),
+        "efficient": theta >= 1 - TOLERANCE,
+        "peers": peers,
+    }, index=units.index)
+
+
+@st.cache_resource(show_spinner="Solving the DEA programs…")
+def _load_dea_scores(csv_path: str, version: float, model: str, by: str) -> pd.DataFrame:
+    units = dea_units(load_dataset(csv_path), by=by or None)
+    return units.join(dea_scores(units, model=model))
+
+
+def load_dea_scores(csv_path=CONTRACTS_CSV, model: str = "CCR", by: str = None) -> pd.DataFrame:
+    """Default inputs/outputs, scored once per snapshot, model and unit level."""
+    return _load_dea_scores(str(csv_path), dataset_version(csv_path), model, by or "")
+
+
+if __name__ == "__main__":
+    import time
+
+    df = load_dataset(CONTRACTS_CSV)
+    for label, by in UNITS.items():
+        for model in MODELS:
+            started = time.perf_counter()
+            scores = dea_scores(dea_units(df, by=by), model=model)
+            print(f"{label:>14} {model}: {len(scores):5d} units, {int(scores['efficient'].sum()):3d} efficient, "
+                  f"mean {scores['dea_score'].mean():.3f} ({time.perf_counter() - started:.1f} s)")
@@ -0,0 +1,182 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import PackageNotFoundError, version
+from multiprocessing import get_context
+from pathlib import Path
+
+import plotly
+import plotly.io as pio
+
+from data_store import CONTRACTS_CSV
+from date_index import build_close_date_index
+
+EXPORT_DIR = Path("Graficos_tese")
+MANIFEST = "figures.manifest.json"
+FORMATS = ("pdf", "png", "svg")
+
+
+def _renderer_version() -> str:
+    try:
+        kaleido = version("kaleido")
+    except PackageNotFoundError:
+        kaleido = "none"
+    return f"plotly {plotly.__version__}, kaleido {kaleido}"
+
+
+def registry_figures(df, variables=None) -> dict:
+    """
+    Build every figure of `plot_registry` once from `df`.
+
+    A builder registered under several variables is built once; entries
+    without a builder, or whose builder returns ``None``, are skipped.
+
+    :return: ``{name: figure}``, named after the builder (``build_`` dropped).
+    """
+    from plot_registy import plot_registry
+
+    figures = {}
+    for variable, entries in plot_registry.items():
+        if variables and variable not in variables:
+            continue
+        for entry in entries:
+            build = entry.get('build')
+            if build is None:
+                continue
+            name = build.__name__.removeprefix("build_")
+            if name not in figures:
+                fig = build(df)
+                if fig is not None:
+                    figures[name] = fig
+    return figures
+
+
+def figure_hash(spec: str, fmt: str, width: int = None, height: int = None, scale: float = None) -> str:
+    """
+    Content hash of the image a figure renders to: its JSON `spec`
+    (`pio.to_json`), the output options and the renderer versions.
+    """
+    key = json.dumps([spec, fmt, width, height, scale, _renderer_version()])
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _read_manifest(folder: Path) -> dict:
+    path = folder / MANIFEST
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def _write_manifest(folder: Path, manifest: dict):
+    # Escrita atómica: uma exportação interrompida deixa o manifesto anterior intacto
+    tmp = folder / (MANIFEST + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    tmp.replace(folder / MANIFEST)
+
+
+def _render_batch(batch):
+    # Uma única sessão do kaleido (um Chromium) desenha todas as figuras do lote
+    figs, paths, width, height, scale = batch
+    pio.write_images(fig=figs, file=paths, width=width, height=height, scale=scale, validate=False)
+    return paths
+
+
+def export_figures(df, folder: Path = EXPORT_DIR, formats=("pdf",), variables=None, width: int = None,
+                   height: int = None, scale: float = None, force: bool = False, n_jobs: int = None) -> dict:
+    """
+    Render the registry figures of `df` to static files, skipping unchanged ones.
+
+    Each figure is built once (see `registry_figures`) and hashed per
+    format together with the output options and the plotly/kaleido
+    versions; files whose hash matches `folder`/`MANIFEST` and still exist
+    are not rendered again. The rest are split into one batch per worker
+    process, and each worker renders its whole batch with a single
+    `pio.write_images` call, i.e. one kaleido browser session per worker
+    instead of one per image.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Contract table the figures are drawn from.
+    folder : Path
+        Output folder (files are ``<figure>.<format>``).
+    formats : iterable
+        Any of `FORMATS`.
+    variables : iterable, optional
+        Only the registry entries of these variables.
+    width, height, scale : optional
+        Image size (default: the figure layout, or the kaleido defaults).
+    force : bool
+        Render every figure even if unchanged.
+    n_jobs : int, optional
+        Worker processes (default: CPU count; ``1`` renders in-process).
+
+    Returns
+    -------
+    dict
+        ``rendered`` and ``skipped`` (lists of paths) and ``manifest``.
+    """
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError(f"Unknown image format(s): {', '.join(sorted(unknown))}")
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    manifest = _read_manifest(folder)
+
+    pending, skipped, hashes = [], [], {}
+    for name, fig in registry_figures(df, variables).items():
+        spec = pio.to_json(fig, validate=False)
+        for fmt in formats:
+            path = folder / f"{name}.{fmt}"
+            digest = figure_hash(spec, fmt, width, height, scale)
+            if not force and manifest.get(path.name) == digest and path.exists():
+                skipped.append(str(path))
+                continue
+            hashes[path.name] = digest
+            pending.append((json.loads(spec), str(path)))
+
+    rendered = []
+    if pending:
+        n_jobs = min(n_jobs or os.cpu_count(), len(pending))
+        batches = [([spec for spec, _ in pending[w::n_jobs]], [path for _, path in pending[w::n_jobs]],
+                    width, height, scale) for w in range(n_jobs)]
+        if n_jobs <= 1:
+            results = [_render_batch(batch) for batch in batches]
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs, mp_context=get_context("spawn")) as pool:
+                results = list(pool.map(_render_batch, batches))
+        rendered = [path for paths in results for path in paths]
+        manifest.update(hashes)
+        _write_manifest(folder, manifest)
+
+    return {"rendered": rendered, "skipped": skipped, "manifest": manifest}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export every registry figure to static images.")
+    parser.add_argument("--data", default=CONTRACTS_CSV)
+    parser.add_argument("--output", default=str(EXPORT_DIR))
+    parser.add_argument("--format", nargs="+", default=["pdf"], choices=FORMATS)
+    parser.add_argument("--variable", nargs="+", help="Only the figures of these registry variables")
+    parser.add_argument("--width", type=int)
+    parser.add_argument("--height", type=int)
+    parser.add_argument("--scale", type=float)
+    parser.add_argument("--force", action="store_true", help="Render even figures whose content has not changed")
+    parser.add_argument("--jobs", type=int, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    # Mesma tabela que o dashboard usa sem filtro de datas
+    df = build_close_date_index(args.data)['frame']
+    result = export_figures(df, args.output, formats=args.format, variables=args.variable, width=args.width,
+                            height=args.height, scale=args.scale, force=args.force, n_jobs=args.jobs)
+
+    for path in result["rendered"]:
+        print(f"  rendered  {path}")
+    print(f"{len(result['rendered'])} rendered, {len(result['skipped'])} unchanged "
+          f"({time.perf_counter() - started:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
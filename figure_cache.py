@@ -0,0 +1,90 @@
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+import streamlit as st
+
+MAX_CACHE_BYTES = 256 * 1024 ** 2   # tamanho total das especificações em JSON
+MAX_CACHE_ENTRIES = 512
+
+
+@st.cache_resource(show_spinner=False)
+def _figure_cache() -> dict:
+    # Um único cache por processo, partilhado por todas as sessões
+    return {"entries": OrderedDict(), "bytes": 0, "hits": 0, "misses": 0, "lock": threading.Lock()}
+
+
+def _store(cache: dict, key, fig, max_bytes: int, max_entries: int):
+    size = len(pio.to_json(fig, validate=False))
+    entries = cache["entries"]
+    with cache["lock"]:
+        if key in entries:
+            cache["bytes"] -= entries.pop(key)[1]
+        if size > max_bytes:
+            return
+        entries[key] = (fig, size)
+        cache["bytes"] += size
+        # Remove os menos usados recentemente até caber nos limites
+        while cache["bytes"] > max_bytes or len(entries) > max_entries:
+            _, (_, evicted) = entries.popitem(last=False)
+            cache["bytes"] -= evicted
+
+
+def cached_figure(plot_id: str, fingerprint: tuple, build, *args,
+                  max_bytes: int = MAX_CACHE_BYTES, max_entries: int = MAX_CACHE_ENTRIES):
+    """
+    Figure for `plot_id` under the filter `fingerprint`, built once.
+
+    On a miss the figure is built with ``build(*args)`` and stored; on a hit
+    the stored figure is returned without touching the data. Entries are
+    evicted least recently used first whenever the cache holds more than
+    `max_entries` figures or more than `max_bytes` of JSON spec (measured
+    once per figure, as sent to the browser by `st.plotly_chart`).
+
+    Parameters
+    ----------
+    plot_id : str
+        Identifies the plot (e.g. registry variable and position).
+    fingerprint : tuple
+        Identifies the data the plot is drawn from, e.g. the dataset version
+        and the row range of the active filter. It must change whenever the
+        data does.
+    build : callable
+        Returns a Plotly figure, or ``None`` when there is nothing to draw
+        (not cached).
+
+    Returns
+    -------
+    plotly.graph_objects.Figure or None
+        Shared between sessions: callers must not modify it.
+    """
+    cache = _figure_cache()
+    key = (plot_id, fingerprint)
+    with cache["lock"]:
+        entry = cache["entries"].get(key)
+        if entry is not None:
+            cache["entries"].move_to_end(key)
+            cache["hits"] += 1
+            return entry[0]
+        cache["misses"] += 1
+
+    # Construída fora do lock: as outras sessões não ficam à espera
+    fig = build(*args)
+    if fig is not None:
+        _store(cache, key, fig, max_bytes, max_entries)
+    return fig
+
+
+def figure_cache_stats() -> dict:
+    """``entries``, ``bytes``, ``hits`` and ``misses`` of the shared cache."""
+    cache = _figure_cache()
+    with cache["lock"]:
+        return {"entries": len(cache["entries"]), "bytes": cache["bytes"],
+                "hits": cache["hits"], "misses": cache["misses"]}
+
+
+def clear_figure_cache():
+    cache = _figure_cache()
+    with cache["lock"]:
+        cache["entries"].clear()
+        cache["bytes"] = 0
@@ -0,0 +1,225 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_store import CONTRACTS_CSV, SCORED_CSV, dataset_version, load_dataset
+from model_registry import load_model
+
+try:                                   # numba is optional: NumPy traversal otherwise
+    import numba
+except ImportError:
+    numba = None
+
+# Até este número de linhas os dicionários batem pd.Categorical
+SMALL_BATCH = 256
+
+
+def compile_forest(forest) -> dict:
+    """
+    Flatten a fitted binary `RandomForestClassifier` into shared node arrays.
+
+    Node ids of every tree are offset so the whole forest lives in one set of
+    arrays: ``feature`` (int32), ``threshold`` (float64), ``left`` / ``right``
+    (absolute child ids, -1 on leaves), ``missing_left`` (where a NaN goes,
+    as sklearn routes missing values) and ``value`` (probability of class 1
+    at the node). ``roots`` holds the first node of each tree.
+    """
+    features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+    offset = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        left = tree.children_left.astype(np.int64)
+        right = tree.children_right.astype(np.int64)
+        counts = tree.value[:, 0, :]
+
+        roots.append(offset)
+        features.append(np.maximum(tree.feature, 0).astype(np.int32))
+        thresholds.append(tree.threshold.astype(np.float64))
+        lefts.append(np.where(left >= 0, left + offset, -1))
+        rights.append(np.where(right >= 0, right + offset, -1))
+        # Sem NaN no treino, o sklearn manda-os para o filho com mais amostras
+        missing.append(np.asarray(tree.missing_go_to_left, dtype=np.bool_))
+        # Mesma normalização que DecisionTreeClassifier.predict_proba
+        values.append(counts[:, 1] / counts.sum(axis=1))
+        offset += tree.node_count
+
+    return {
+        "feature": np.concatenate(features),
+        "threshold": np.concatenate(thresholds),
+        "left": np.concatenate(lefts),
+        "right": np.concatenate(rights),
+        "missing_left": np.concatenate(missing),
+        "value": np.concatenate(values),
+        "roots": np.asarray(roots, dtype=np.int64),
+    }
+
+
+def compile_pipeline(pipeline) -> dict:
+    """
+    Compile a registry pipeline (ordinal encoder + forest).
+
+    Besides the flat forest, keeps the input column order and a value -> code
+    dictionary per categorical column, so rows can be encoded without
+    calling the ColumnTransformer, and the encoder's codes for unknown and
+    missing values.
+    """
+    compiled = compile_forest(pipeline.named_steps["rf"])
+    preprocess = pipeline.named_steps["preprocess"]
+
+    columns, categories, missing = [], {}, {}
+    unknown = -1.0
+    for name, transformer, cols in preprocess.transformers_:
+        if name == "remainder":
+            continue
+        if name == "cat":
+            unknown = float(transformer.unknown_value)
+            for col, cats in zip(cols, transformer.categories_):
+                known = [v for v in cats if not pd.isna(v)]
+                categories[col] = {v: float(k) for k, v in enumerate(known)}
+                # NaN visto no treino tem código próprio; senão conta como desconhecido
+                missing[col] = float(transformer.encoded_missing_value) if len(known) < len(cats) else unknown
+        columns.extend(cols)
+
+    compiled["columns"] = columns
+    compiled["categories"] = categories
+    compiled["unknown_code"] = unknown
+    compiled["missing_codes"] = missing
+    return compiled
+
+
+def encode(compiled: dict, df: pd.DataFrame) -> np.ndarray:
+    """
+    Feature matrix for `df` in the pipeline's column order, as float32 like
+    sklearn's trees. Categories are coded as the fitted encoder codes them:
+    unknown values get its ``unknown_value`` and missing ones its missing
+    code (``unknown_value`` too when no NaN was seen in training); missing
+    numeric values stay NaN.
+    """
+    X = np.empty((len(df), len(compiled["columns"])), dtype=np.float32)
+    unknown = compiled["unknown_code"]
+    for j, col in enumerate(compiled["columns"]):
+        lookup = compiled["categories"].get(col)
+        if lookup is None:
+            X[:, j] = df[col].to_numpy(dtype=np.float32, na_value=np.nan)
+            continue
+        if len(df) <= SMALL_BATCH:
+            codes = np.fromiter((lookup.get(v, unknown) for v in df[col]), dtype=np.float32, count=len(df))
+        else:
+            codes = pd.Categorical(df[col], categories=list(lookup)).codes.astype(np.float32)
+            codes[codes < 0] = unknown
+        codes[df[col].isna().to_numpy()] = compiled["missing_codes"][col]
+        X[:, j] = codes
+    return X
+
+
+def _predict_numpy(X, feature, threshold, left, right, missing_left, value, roots):
+    # Todos os pares (linha, árvore) descem um nível por iteração; os que
+    # chegam a uma folha saem do conjunto ativo
+    n_rows, n_trees = len(X), len(roots)
+    nodes = np.tile(roots, n_rows)
+    row_of = np.repeat(np.arange(n_rows), n_trees)
+    active = np.flatnonzero(left[nodes] >= 0)
+    while len(active):
+        current = nodes[active]
+        x = X[row_of[active], feature[current]]
+        go_left = np.where(np.isnan(x), missing_left[current], x <= threshold[current])
+        nodes[active] = np.where(go_left, left[current], right[current])
+        active = active[left[nodes[active]] >= 0]
+
+    # Soma árvore a árvore, pela mesma ordem do sklearn
+    leaf_values = value[nodes].reshape(n_rows, n_trees)
+    out = np.zeros(len(X), dtype=np.float64)
+    for t in range(len(roots)):
+        out += leaf_values[:, t]
+    return out / len(roots)
+
+
+if numba is not None:
+    @numba.njit(cache=True, nogil=True)
+    def _predict_numba(X, feature, threshold, left, right, missing_left, value, roots):
+        n_rows, n_trees = X.shape[0], roots.shape[0]
+        out = np.zeros(n_rows, dtype=np.float64)
+        for i in range(n_rows):
+            acc = 0.0
+            for t in range(n_trees):
+                node = roots[t]
+                while left[node] >= 0:
+                    x = X[i, feature[node]]
+                    if np.isnan(x):
+                        node = left[node] if missing_left[node] else right[node]
+                    elif x <= threshold[node]:
+                        node = left[node]
+                    else:
+                        node = right[node]
+                acc += value[node]
+            out[i] = acc / n_trees
+        return out
+else:
+    _predict_numba = None
+
+
+def predict_proba(compiled: dict, X: np.ndarray, engine: str = "auto") -> np.ndarray:
+    """
+    Probability of class 1 for an encoded matrix `X` (see `encode`).
+
+    :param engine: ``"numba"``, ``"numpy"`` or ``"auto"`` (numba when installed).
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    args = (X, compiled["feature"], compiled["threshold"], compiled["left"], compiled["right"],
+            compiled["missing_left"], compiled["value"], compiled["roots"])
+    if engine == "numba" or (engine == "auto" and _predict_numba is not None):
+        if _predict_numba is None:
+            raise ImportError("numba is not installed")
+        return _predict_numba(*args)
+    return _predict_numpy(*args)
+
+
+def predict_frame(compiled: dict, df: pd.DataFrame, engine: str = "auto") -> np.ndarray:
+    """`encode` + `predict_proba` for a frame with the model's input columns."""
+    return predict_proba(compiled, encode(compiled, df), engine=engine)
+
+
+@st.cache_resource(show_spinner=False)
+def _load_compiled_model(key: str, csv_path: str) -> dict:
+    return compile_pipeline(load_model(csv_path)["pipeline"])
+
+
+def load_compiled_model(csv_path=CONTRACTS_CSV) -> dict:
+    """Compiled form of the shared registry model, built once per model key."""
+    return _load_compiled_model(load_model(csv_path)["key"], str(csv_path))
+
+
+@st.cache_resource(show_spinner="Scoring contracts…")
+def _score_contracts(key: str, csv_path: str, version: float) -> np.ndarray:
+    return predict_frame(load_compiled_model(), load_dataset(csv_path))
+
+
+def score_contracts(csv_path=SCORED_CSV) -> np.ndarray:
+    """
+    Risk of every contract of `csv_path` (in row order, i.e. by
+    ``contract_id``) under the shared registry model: the score its SHAP
+    store explains. Computed once per model key and snapshot.
+    """
+    return _score_contracts(load_model()["key"], str(csv_path), dataset_version(csv_path))
+
+
+if __name__ == "__main__":
+    # Paridade com o pipeline do sklearn, incluindo linhas com valores em falta
+    # e categorias desconhecidas
+    entry = load_model(CONTRACTS_CSV)
+    compiled = compile_pipeline(entry["pipeline"])
+    df = load_dataset(CONTRACTS_CSV)[entry["features"]]
+    df = df.astype({c: object for c in compiled["categories"]}).astype({"bidders": np.float64})
+    rng = np.random.default_rng(0)
+    for col in entry["features"]:
+        rows = rng.choice(len(df), size=len(df) // 10, replace=False)
+        df.iloc[rows, df.columns.get_loc(col)] = np.nan
+    df.iloc[:5, df.columns.get_loc("loc")] = "PT99"
+
+    expected = entry["pipeline"].predict_proba(df)[:, 1]
+    for batch in (df.head(SMALL_BATCH), df):
+        engines = ("numpy", "numba") if numba is not None else ("numpy",)
+        for engine in engines:
+            diff = np.abs(predict_frame(compiled, batch, engine=engine) - expected[:len(batch)]).max()
+            print(f"{len(batch):5d} rows ({df.isna().any(axis=1).mean():.0%} with a NaN), {engine}: "
+                  f"max difference from sklearn {diff:.2e}")
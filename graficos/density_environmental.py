@@ -44,8 +44,10 @@ def plot_density_ln_effective_price_by_environmental(df: pd.DataFrame, output_pd
     pio.write_image(fig, output_pdf_path, format='pdf')
 
 # ----------- Execução do script -----------
-# Lê os dados do CSV
-df = pd.read_csv("Data/dados_completos.csv")
+# (só quando corrido diretamente; as figuras do dashboard exportam-se em lote com export_figures.py)
+if __name__ == "__main__":
+    # Lê os dados do CSV
+    df = pd.read_csv("Data/dados_completos.csv")
 
-# Gera e guarda o gráfico como PDF
-plot_density_ln_effective_price_by_environmental(df, "Graficos_tese/grafico_criterio_ambiental.pdf")
\ No newline at end of file
+    # Gera e guarda o gráfico como PDF
+    plot_density_ln_effective_price_by_environmental(df, "Graficos_tese/grafico_criterio_ambiental.pdf")
@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+HISTNORMS = (None, "percent", "probability", "density")
+KDE_GRID = 512          # pontos da grelha da densidade (FFT)
+KDE_MAX_GRID = 4096     # máximo de pontos quando a grelha cresce para dx <= bw / 3
+KDE_CUT = 3.0           # a grelha estende-se `KDE_CUT` larguras de banda além dos dados
+
+
+def _finite(values) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    return values[np.isfinite(values)]
+
+
+def bin_edges(values, nbins: int = 30, range: tuple = None) -> np.ndarray:
+    """`nbins` equal-width bin edges over `range` (default: min to max of the finite values)."""
+    values = _finite(values)
+    lo, hi = range if range is not None else (values.min(), values.max()) if len(values) else (0.0, 1.0)
+    if lo == hi:
+        lo, hi = lo - 0.5, hi + 0.5
+    return np.linspace(lo, hi, nbins + 1)
+
+
+def histogram(values, edges: np.ndarray, histnorm: str = None) -> dict:
+    """
+    Bin counts of the finite `values` over `edges`, normalized like Plotly's
+    ``histnorm``.
+
+    :return: ``edges``, ``counts`` and ``heights`` (the normalized counts)
+        and ``n``, the number of finite values.
+    """
+    if histnorm not in HISTNORMS:
+        raise ValueError(f"Unknown histnorm: {histnorm}")
+    values = _finite(values)
+    counts, _ = np.histogram(values, bins=edges)
+    n = max(len(values), 1)
+    if histnorm == "percent":
+        heights = 100.0 * counts / n
+    elif histnorm == "probability":
+        heights = counts / n
+    elif histnorm == "density":
+        heights = counts / (n * np.diff(edges))
+    else:
+        heights = counts.astype(np.float64)
+    return {"edges": edges, "counts": counts, "heights": heights, "n": len(values)}
+
+
+def silverman_bandwidth(values) -> float:
+    values = _finite(values)
+    if len(values) < 2:
+        return 1.0
+    iqr = np.subtract(*np.percentile(values, [75, 25]))
+    spread = min(values.std(ddof=1), iqr / 1.34) or values.std(ddof=1) or 1.0
+    return 0.9 * spread * len(values) ** -0.2
+
+
+def fft_kde(values, bandwidth: float = None, grid_size: int = KDE_GRID, cut: float = KDE_CUT) -> tuple:
+    """
+    Gaussian kernel density of `values` on a regular grid, in
+    ``O(n + g log g)``.
+
+    The values are linearly binned onto the grid and the binned counts are
+    convolved with the kernel by FFT, so the cost does not grow with
+    ``n x grid_size`` as a direct evaluation would. The error against the
+    exact estimate is of order ``(dx / bandwidth)²``, so the grid grows
+    beyond `grid_size` (up to `KDE_MAX_GRID` points) until
+    ``dx <= bandwidth / 3``. The discrete kernel is normalized to sum to
+    ``1 / dx``, so the density integrates to one even when a very wide
+    range keeps ``dx`` above that.
+
+    Parameters
+    ----------
+    values : array-like
+        Sample (non-finite values are ignored).
+    bandwidth : float, optional
+        Kernel standard deviation (default: Silverman's rule).
+    grid_size : int
+        Smallest number of grid points.
+    cut : float
+        The grid extends `cut` bandwidths beyond the data on each side.
+
+    Returns
+    -------
+    tuple
+        ``(grid, density)``; ``density.sum() * dx`` is one.
+    """
+    values = _finite(values)
+    bw = bandwidth or silverman_bandwidth(values)
+    if len(values) == 0:
+        return np.array([]), np.array([])
+    lo, hi = values.min() - cut * bw, values.max() + cut * bw
+    grid_size = int(min(max(grid_size, np.ceil(3 * (hi - lo) / bw) + 1), KDE_MAX_GRID))
+    grid = np.linspace(lo, hi, grid_size)
+    dx = grid[1] - grid[0]
+
+    # Binning linear: cada valor divide o seu peso entre os dois pontos vizinhos
+    pos = (values - lo) / dx
+    left = np.clip(np.floor(pos).astype(np.int64), 0, grid_size - 2)
+    frac = pos - left
+    weights = (np.bincount(left, 1 - frac, minlength=grid_size)
+               + np.bincount(left + 1, frac, minlength=grid_size))
+
+    # Núcleo gaussiano truncado em `cut` larguras de banda, convolução por FFT
+    half = min(grid_size - 1, int(np.ceil(cut * bw / dx)))
+    offsets = np.arange(-half, half + 1) * dx
+    kernel = np.exp(-0.5 * (offsets / bw) ** 2)
+    kernel /= kernel.sum() * dx         # massa um na grelha, mesmo com dx > bw
+    size = 1 << int(np.ceil(np.log2(grid_size + len(kernel))))
+    conv = np.fft.irfft(np.fft.rfft(weights, size) * np.fft.rfft(kernel, size), size)
+    density = np.clip(conv[half:half + grid_size], 0, None) / len(values)
+    return grid, density
+
+
+def histogram_traces(values, groups=None, nbins: int = 30, range: tuple = None, histnorm: str = None,
+                     kde: bool = False, colors: dict = None, names: dict = None,
+                     opacity: float = None, **kwargs) -> list:
+    """
+    Histogram bars (and optionally a KDE curve) per group, binned on the
+    server.
+
+    Every group shares the same `nbins` edges and is normalized on its own,
+    as ``px.histogram(color=..., histnorm=...)`` does; only bin centres,
+    widths and heights are sent to the browser, so the size of the figure
+    does not depend on the number of rows.
+
+    Parameters
+    ----------
+    values : array-like
+        Values to bin.
+    groups : array-like, optional
+        Group label of each value; one bar trace per group, in order of
+        appearance.
+    nbins, range
+        Bins (see `bin_edges`).
+    histnorm : str
+        One of `HISTNORMS`.
+    kde : bool
+        Add the `fft_kde` density of each group, scaled to `histnorm`.
+    colors, names : dict, optional
+        Colour and legend name per group (the label itself by default).
+    opacity : float, optional
+        Bar opacity.
+    **kwargs
+        Extra `go.Bar` arguments.
+
+    Returns
+    -------
+    list
+        Traces; draw them with ``barmode="overlay"`` and ``bargap=0``.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    edges = bin_edges(values, nbins, range)
+    centres, widths = (edges[:-1] + edges[1:]) / 2, np.diff(edges)
+    if groups is None:
+        labels, masks = [None], [np.ones(len(values), dtype=bool)]
+    else:
+        codes, labels = pd.factorize(np.asarray(groups), sort=False)
+        masks = [codes == k for k in np.arange(len(labels))]
+    colors, names = colors or {}, names or {}
+
+    traces = []
+    for label, mask in zip(labels, masks):
+        hist = histogram(values[mask], edges, histnorm)
+        name = names.get(label, None if label is None else str(label))
+        color = colors.get(label)
+        traces.append(go.Bar(
+            x=centres, y=hist["heights"], width=widths, name=name, opacity=opacity,
+            marker=dict(color=color, line=dict(width=0)), customdata=hist["counts"],
+            hovertemplate="%{x:.3g}<br>%{y:.3g} (%{customdata} contracts)<extra>" + (name or "") + "</extra>",
+            **kwargs,
+        ))
+        if kde and hist["n"] > 1:
+            grid, density = fft_kde(values[mask])
+            scale = {"density": 1.0, "percent": 100.0 * widths[0], "probability": widths[0]}.get(
+                histnorm, hist["n"] * widths[0])
+            traces.append(go.Scatter(
+                x=grid, y=density * scale, mode="lines", name=f"{name} (KDE)" if name else "KDE",
+                line=dict(color=color, width=2), hoverinfo="skip",
+            ))
+    return traces
+
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import streamlit as st
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OrdinalEncoder
+
+from data_store import CONTRACTS_CSV, dataset_version, load_dataset
+from threshold_sweep import threshold_sweep, youden_threshold, save_threshold_sweep
+
+REGISTRY_DIR = Path("models/registry")
+
+# Features do modelo de risco (as mesmas que o what-if pede ao utilizador)
+FEATURES = [
+    "loc", "bidders", "contract_year", "ln_base_price",
+    "act_type", "environmental", "execution_dummy",
+    "covid_pandemic", "CPV_agrupado"
+]
+CATEGORICAL = ["loc", "act_type", "CPV_agrupado"]
+TARGET = "custo_aumentou"        # 1 if effective_total_price > base_price
+
+PARAMS = {
+    "n_estimators": 100,
+    "max_depth": None,
+    "random_state": 42,
+    "test_size": 0.3,
+}
+
+
+def model_target(df: pd.DataFrame) -> pd.Series:
+    """Cost-increase flag, derived from prices when the column is absent."""
+    if TARGET in df.columns:
+        return df[TARGET].astype(int)
+    return (df["effective_total_price"] > df["base_price"]).astype(int)
+
+
+def build_pipeline(features: list = FEATURES, params: dict = PARAMS) -> Pipeline:
+    """
+    Encoder + forest in one estimator: categoricals are ordinal-encoded
+    (unseen values -> -1), everything else is passed through.
+    """
+    categorical = [f for f in features if f in CATEGORICAL]
+    numeric = [f for f in features if f not in CATEGORICAL]
+    preprocessor = ColumnTransformer([
+        ("cat", OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=-1), categorical),
+        ("num", "passthrough", numeric),
+    ])
+    forest = RandomForestClassifier(
+        n_estimators=params["n_estimators"],
+        max_depth=params["max_depth"],
+        random_state=params["random_state"],
+        n_jobs=-1,
+    )
+    return Pipeline(steps=[("preprocess", preprocessor), ("rf", forest)])
+
+
+def model_key(df: pd.DataFrame, features: list = FEATURES, params: dict = PARAMS) -> str:
+    """Content hash of the training rows, the feature list and the hyper-parameters."""
+    data = df[features].assign(**{TARGET: model_target(df)})
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(data.astype(str), index=False).to_numpy().tobytes())
+    digest.update(json.dumps({"features": list(features), "params": params}, sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+def train_model(df: pd.DataFrame, features: list = FEATURES, params: dict = PARAMS) -> dict:
+    """
+    Fit the pipeline on a stratified split and evaluate it on the held-out part.
+
+    The stored threshold is the Youden-J optimum on the held-out rows.
+
+    :return: ``{"pipeline", "threshold", "metrics", "sweep"}``.
+    """
+    data = df[features].assign(**{TARGET: model_target(df)}).dropna()
+    X, y = data[features], data[TARGET]
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, stratify=y, test_size=params["test_size"], random_state=params["random_state"]
+    )
+
+    pipeline = build_pipeline(features, params)
+    pipeline.fit(X_train, y_train)
+
+    y_prob = pipeline.predict_proba(X_test)[:, 1]
+    sweep = threshold_sweep(y_prob, y_test, np.zeros(len(y_test)))
+    threshold = youden_threshold(sweep)
+    metrics = {
+        "auc_roc": float(roc_auc_score(y_test, y_prob)),
+        "youden_j": float(sweep["youden_j"].max()),
+        "n_train": int(len(X_train)),
+        "n_test": int(len(X_test)),
+        "positives": int(y.sum()),
+    }
+    return {"pipeline": pipeline, "threshold": threshold, "metrics": metrics, "sweep": sweep}
+
+
+def save_model(key: str, trained: dict, features: list = FEATURES, params: dict = PARAMS) -> Path:
+    """
+    Write ``model.joblib``, ``meta.json``, the held-out sweep and, for the
+    default features, the what-if surface under the registry.
+    """
+    folder = REGISTRY_DIR / key
+    folder.mkdir(parents=True, exist_ok=True)
+    model_path = folder / "model.joblib"
+
+    # Ficheiro temporário único por processo: nenhum leitor vê um modelo a meio
+    # e dois processos a treinar a mesma chave não escrevem no mesmo ficheiro
+    with tempfile.NamedTemporaryFile(dir=folder, prefix="model.", suffix=".tmp", delete=False) as tmp:
+        joblib.dump(trained["pipeline"], tmp)
+    Path(tmp.name).replace(model_path)
+    save_threshold_sweep(trained["sweep"], model_path)
+    if set(features) == set(FEATURES):
+        # Grelha do what-if desta versão do modelo: a página só a lê
+        from whatif_surface import register_surface
+        register_surface(key, trained["pipeline"])
+
+    meta = {
+        "key": key,
+        "features": list(features),
+        "params": params,
+        "threshold": trained["threshold"],
+        "metrics": trained["metrics"],
+        "trained_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    # meta.json marca a entrada como completa, por isso também é escrito de forma atómica
+    with tempfile.NamedTemporaryFile("w", dir=folder, prefix="meta.", suffix=".tmp", delete=False) as tmp:
+        tmp.write(json.dumps(meta, indent=2))
+    Path(tmp.name).replace(folder / "meta.json")
+    return folder
+
+
+def get_model(df: pd.DataFrame, features: list = FEATURES, params: dict = PARAMS,
+              force: bool = False) -> dict:
+    """
+    Return the registry entry for (`df`, `features`, `params`), training and
+    saving it only if that exact combination has never been trained.
+
+    :return: ``{"key", "path", "pipeline", "threshold", "metrics", "features"}``.
+    """
+    key = model_key(df, features, params)
+    folder = REGISTRY_DIR / key
+    if force or not (folder / "meta.json").exists():
+        trained = train_model(df, features, params)
+        save_model(key, trained, features, params)
+        pipeline = trained["pipeline"]
+    else:
+        pipeline = joblib.load(folder / "model.joblib")
+        if set(features) == set(FEATURES):
+            # Entradas registadas antes da grelha (ou com a grelha antiga em float32)
+            from whatif_surface import register_surface, surface_is_current
+            if not surface_is_current(key):
+                register_surface(key, pipeline)
+
+    meta = json.loads((folder / "meta.json").read_text())
+    return {
+        "key": key,
+        "path": folder / "model.joblib",
+        "pipeline": pipeline,
+        "threshold": meta["threshold"],
+        "metrics": meta["metrics"],
+        "features": meta["features"],
+    }
+
+
+@st.cache_resource(show_spinner="Loading risk model…")
+def _load_model(csv_path: str, version: float) -> dict:
+    return get_model(load_dataset(csv_path))
+
+
+def load_model(csv_path=CONTRACTS_CSV) -> dict:
+    """Shared registry entry for the default features and parameters, loaded once per process."""
+    return _load_model(str(csv_path), dataset_version(csv_path))
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_store import CONTRACTS_CSV, dataset_version, load_dataset
+
+# Dimensions crossed by the dashboard, SFA and benchmarking group views
+CUBE_DIMENSIONS = [
+    "loc",
+    "contract_year",
+    "CPV_agrupado",
+    "act_type",
+    "environmental",
+    "covid_pandemic",
+    "execution_dummy",
+]
+
+# Additive summaries are kept for each of these measures
+CUBE_MEASURES = ["effective_total_price", "base_price", "efficiency", "bidders"]
+
+
+def build_cube(df: pd.DataFrame,
+               dimensions: list = CUBE_DIMENSIONS,
+               measures: list = CUBE_MEASURES) -> pd.DataFrame:
+    """
+    Materialise one row per observed combination of `dimensions`.
+
+    Each cell holds ``count`` (rows) and, per measure, ``<m>_n`` (non-missing
+    rows), ``<m>_sum``, ``<m>_sumsq``, ``<m>_min`` and ``<m>_max``. Sums are
+    accumulated in float64 whatever the storage type of the measure.
+    """
+    work = df[dimensions].copy()
+    for m in measures:
+        values = df[m].astype(np.float64)
+        work[f"{m}_n"] = values.notna().astype(np.int64)
+        work[f"{m}_sum"] = values
+        work[f"{m}_sumsq"] = values ** 2
+        work[f"{m}_min"] = values
+        work[f"{m}_max"] = values
+    work["count"] = 1
+
+    agg = {"count": "sum"}
+    for m in measures:
+        agg.update({f"{m}_n": "sum", f"{m}_sum": "sum", f"{m}_sumsq": "sum",
+                    f"{m}_min": "min", f"{m}_max": "max"})
+
+    return work.groupby(dimensions, observed=True, dropna=False).agg(agg).reset_index()
+
+
+@st.cache_resource(show_spinner=False)
+def _load_cube(csv_path: str, version: float) -> pd.DataFrame:
+    return build_cube(load_dataset(csv_path))
+
+
+def load_cube(csv_path=CONTRACTS_CSV) -> pd.DataFrame:
+    """Cube over the default dimensions and measures, built once per snapshot."""
+    return _load_cube(str(csv_path), dataset_version(csv_path))
+
+
+def filter_mask(frame: pd.DataFrame, filters: dict = None) -> np.ndarray:
+    """
+    Boolean mask for `filters` over the rows (or cells) of `frame`.
+
+    `filters` maps a column to either a list of accepted values or a
+    ``(low, high)`` tuple, inclusive on both ends.
+    """
+    mask = np.ones(len(frame), dtype=bool)
+    for col, cond in (filters or {}).items():
+        if isinstance(cond, tuple):
+            mask &= frame[col].between(*cond).to_numpy()
+        else:
+            mask &= frame[col].isin(cond).to_numpy()
+    return mask
+
+
+def query_cube(cube: pd.DataFrame, by: list, filters: dict = None,
+               measures: list = None) -> pd.DataFrame:
+    """
+    Answer a filtered group-by from the cube cells instead of raw rows.
+
+    Parameters
+    ----------
+    cube : pd.DataFrame
+        Output of `build_cube`.
+    by : list
+        Dimensions to group on (may be empty for a grand total).
+    filters : dict, optional
+        Conditions on dimensions, as in `filter_mask`.
+    measures : list, optional
+        Measures to report; defaults to every measure in the cube.
+
+    Returns
+    -------
+    pd.DataFrame
+        ``by`` columns, ``count`` and, per measure, ``<m>_sum``,
+        ``<m>_mean``, ``<m>_std`` (sample), ``<m>_min`` and ``<m>_max``.
+    """
+    if measures is None:
+        measures = [c[:-4] for c in cube.columns if c.endswith("_sum")]
+
+    cells = cube[filter_mask(cube, filters)]
+    agg = {"count": "sum"}
+    for m in measures:
+        agg.update({f"{m}_n": "sum", f"{m}_sum": "sum", f"{m}_sumsq": "sum",
+                    f"{m}_min": "min", f"{m}_max": "max"})
+
+    if by:
+        out = cells.groupby(by, observed=True).agg(agg).reset_index()
+    else:
+        out = cells.agg(agg).to_frame().T.astype(np.float64)
+
+    for m in measures:
+        n = out[f"{m}_n"].astype(np.float64)
+        s = out[f"{m}_sum"]
+        out[f"{m}_mean"] = s / n.where(n > 0)
+        var = (out[f"{m}_sumsq"] - s ** 2 / n.where(n > 0)) / (n - 1).where(n > 1)
+        out[f"{m}_std"] = np.sqrt(var.clip(lower=0))
+        out = out.drop(columns=[f"{m}_n", f"{m}_sumsq"])
+    return out
+
+
+def group_stat(df: pd.DataFrame, by: list, measure: str, stat: str = "median",
+               filters: dict = None) -> pd.DataFrame:
+    """
+    Raw-row fallback for statistics the cube cannot answer (median, quantiles,
+    grouping on a column that is not a cube dimension).
+    """
+    rows = df[filter_mask(df, filters)]
+    return rows.groupby(by, observed=True)[measure].agg(stat).reset_index()
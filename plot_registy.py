@@ -1,26 +1,26 @@
-from plots.plot_avg_bidders_by_act_type import plot_avg_bidders_by_act_type
-from plots.plot_avg_effective_price_by_act_type import plot_avg_effective_price_by_act_type
-from plots.plot_avg_log_price_pandemic import plot_avg_log_price_pandemic
-from plots.plot_avg_price_by_environmental import plot_avg_price_by_environmental
-from plots.plot_avg_price_with_quadratic import plot_avg_price_with_quadratic
-from plots.plot_bidders_vs_ln_price import plot_bidders_vs_ln_price
-from plots.plot_bidders_vs_log_price_pandemic import plot_bidders_vs_log_price_pandemic
-from plots.plot_contracts_by_cpv_group import plot_contracts_by_cpv_group
-from plots.plot_contracts_by_environmental import plot_contracts_by_environmental
-from plots.plot_contracts_by_location import plot_contracts_by_location
-from plots.plot_contracts_during_pandemic import plot_contracts_during_pandemic
-from plots.plot_contracts_per_year import plot_contracts_per_year
-from plots.plot_density_ln_effective_price_by_environmental import plot_density_ln_effective_price_by_environmental
-from plots.plot_effective_price_trend import plot_effective_price_trend
-from plots.plot_execution_by_act_type import plot_execution_by_act_type
-from plots.plot_execution_compliance_rate import plot_execution_compliance_rate
-from plots.plot_execution_pandemic_comparison import plot_execution_pandemic_comparison
-from plots.plot_ln_base_vs_ln_effective import plot_ln_base_vs_ln_effective
-from plots.plot_log_log_by_region import plot_log_log_by_region
-from plots.plot_mean_bidders_per_cpv import plot_mean_bidders_per_cpv
-from plots.plot_total_spending_by_cpv import plot_total_spending_by_cpv
-from plots.plot_total_spending_by_location import plot_total_spending_by_location
-from plots.plot_waffle import plot_waffle
+from plots.plot_avg_bidders_by_act_type import build_avg_bidders_by_act_type, plot_avg_bidders_by_act_type
+from plots.plot_avg_effective_price_by_act_type import build_avg_effective_price_by_act_type, plot_avg_effective_price_by_act_type
+from plots.plot_avg_log_price_pandemic import build_avg_log_price_pandemic, plot_avg_log_price_pandemic
+from plots.plot_avg_price_by_environmental import build_avg_price_by_environmental, plot_avg_price_by_environmental
+from plots.plot_avg_price_with_quadratic import build_avg_price_with_quadratic, plot_avg_price_with_quadratic
+from plots.plot_bidders_vs_ln_price import build_bidders_vs_ln_price, plot_bidders_vs_ln_price
+from plots.plot_bidders_vs_log_price_pandemic import build_bidders_vs_log_price_pandemic, plot_bidders_vs_log_price_pandemic
+from plots.plot_contracts_by_cpv_group import build_contracts_by_cpv_group, plot_contracts_by_cpv_group
+from plots.plot_contracts_by_environmental import build_contracts_by_environmental, plot_contracts_by_environmental
+from plots.plot_contracts_by_location import build_contracts_by_location, plot_contracts_by_location
+from plots.plot_contracts_during_pandemic import build_contracts_during_pandemic, plot_contracts_during_pandemic
+from plots.plot_contracts_per_year import build_contracts_per_year, plot_contracts_per_year
+from plots.plot_density_ln_effective_price_by_environmental import build_density_ln_effective_price_by_environmental, plot_density_ln_effective_price_by_environmental
+from plots.plot_effective_price_trend import build_effective_price_trend, plot_effective_price_trend
+from plots.plot_execution_by_act_type import build_execution_by_act_type, plot_execution_by_act_type, show_act_type_legend
+from plots.plot_execution_compliance_rate import build_execution_compliance_rate, plot_execution_compliance_rate
+from plots.plot_execution_pandemic_comparison import build_execution_pandemic_comparison, plot_execution_pandemic_comparison
+from plots.plot_ln_base_vs_ln_effective import build_ln_base_vs_ln_effective, plot_ln_base_vs_ln_effective
+from plots.plot_log_log_by_region import build_log_log_by_region, plot_log_log_by_region, show_regional_elasticities
+from plots.plot_mean_bidders_per_cpv import build_mean_bidders_per_cpv, plot_mean_bidders_per_cpv
+from plots.plot_total_spending_by_cpv import build_total_spending_by_cpv, plot_total_spending_by_cpv
+from plots.plot_total_spending_by_location import build_total_spending_by_location, plot_total_spending_by_location
+from plots.plot_waffle import build_waffle, plot_waffle
 
 plot_registry = {
     'effective_total_price': [
@@ -32,6 +32,7 @@ plot_registry = {
 - Years with **higher contract volumes** (post-2018) tend to show **lower average prices**.
 - Indicates potential **efficiency gains** or **economies of scale** in procurement.
 """,
+            'build': build_effective_price_trend,
             'func': plot_effective_price_trend
         },
     ],
@@ -44,6 +45,7 @@ plot_registry = {
 - Contracts **without environmental criteria** exhibit **greater price variability** and a **broader range** of values.
 - The presence of environmental requirements may indicate **higher compliance demands** or the use of **specialized suppliers**.
 """,
+            'build': build_density_ln_effective_price_by_environmental,
             'func': plot_density_ln_effective_price_by_environmental
         },
          {
@@ -53,6 +55,7 @@ plot_registry = {
 - **Contracts with environmental criteria** remained **rare and sporadic**, never exceeding a few per year.
 - The trend highlights a **systemic underutilization** of **green public procurement** practices in the healthcare sector.
 """,
+            'build': build_contracts_by_environmental,
             'func': plot_contracts_by_environmental
         },
         {
@@ -62,6 +65,7 @@ plot_registry = {
 - **Contracts with environmental criteria** show **substantially higher average prices**, especially in **recent years**.
 - This suggests that **green public procurement** may involve **higher compliance costs** or the use of **specialized suppliers**.
 """,
+            'build': build_avg_price_by_environmental,
             'func': plot_avg_price_by_environmental
         },
     ],
@@ -74,6 +78,7 @@ plot_registry = {
 - There is a **widening spread** at higher base prices, suggesting **heteroskedasticity**.
 - Supports the **log-transformation** to stabilize variance and validate base price as a **key explanatory variable**.
 """,
+            'build': build_ln_base_vs_ln_effective,
             'func': plot_ln_base_vs_ln_effective
         },
     ],
@@ -86,7 +91,9 @@ plot_registry = {
 - **Urgent Tender Notices** (5.7%) and **Deadline Extension Notices** (5.6%) occur infrequently, suggesting that **exceptions or disruptions are rare**.
 - **Notice Correction Statements** are minimal (**2.2%**), reinforcing the view that **most procedures proceed as initially planned**.
 """,
-            'func': plot_waffle
+            'build': build_waffle,
+            'func': plot_waffle,
+            'use_container_width': False
         },
         {
             'title': "Execution Rate by Procurement Notice Type",
@@ -96,7 +103,9 @@ plot_registry = {
 - **Standard** and **Urgent Tender Notices** fall in between, with **moderate execution rates**.
 - The pattern indicates that **procedural deviations**, such as corrections, may compromise execution outcomes.
 """,
-            'func': plot_execution_by_act_type
+            'build': build_execution_by_act_type,
+            'func': plot_execution_by_act_type,
+            'footer': show_act_type_legend
         },
          {
             'title': "Average Number of Bidders by Procurement Notice Type",
@@ -106,6 +115,7 @@ plot_registry = {
 - **Deadline Extension Notices** register the **lowest average bidder count** (14.7), possibly due to **planning uncertainty**.
 - Differences in bidder numbers highlight how **announcement type impacts competition and efficiency**.
 """,
+            'build': build_avg_bidders_by_act_type,
             'func': plot_avg_bidders_by_act_type
         },
         {
@@ -116,6 +126,7 @@ plot_registry = {
 - **Deadline Extension Notices** (€28,955) and **Notice Correction Statements** (€25,903) show **much lower average prices**, likely associated with **simpler or revised contracts**.
 - This pattern suggests a **clear link between announcement type and contract size**.
 """,
+            'build': build_avg_effective_price_by_act_type,
             'func': plot_avg_effective_price_by_act_type
         },
     ],
@@ -130,6 +141,7 @@ plot_registry = {
 - The upward trend continued in **2022** and **2023**, with **636 and 668 contracts**, respectively.
 - The data suggests a **structural shift** in procurement volume, possibly due to policy changes or digital transformation.
 """,
+            'build': build_contracts_per_year,
             'func': plot_contracts_per_year
         },
          {
@@ -140,6 +152,7 @@ plot_registry = {
 - The **quadratic trendline** confirms a **non-linear pattern** over time, with the **minimum** around **2019**.
 - This supports the use of **year-squared terms** in econometric modeling to account for **curvature in the time-price relationship**.
 """,
+            'build': build_avg_price_with_quadratic,
             'func': plot_avg_price_with_quadratic
         },
         
@@ -156,6 +169,7 @@ plot_registry = {
 - **Industrial Products** remained consistently **low in volume**, suggesting limited relevance to the health crisis.
 - Overall, **Medical Equipment dominated** procurement priorities, highlighting a **significant shift in public spending** during the health emergency.
 """,
+            'build': build_contracts_by_cpv_group,
             'func': plot_contracts_by_cpv_group
         },
          
@@ -167,6 +181,7 @@ plot_registry = {
 - In contrast, **Industrial Products** and **Group Not Specified** accounted for a **negligible share of total spending**.
 - The distribution reflects **strategic investment priorities** in healthcare delivery and infrastructure.
 """,
+            'build': build_total_spending_by_cpv,
             'func': plot_total_spending_by_cpv
         },
         {
@@ -179,6 +194,7 @@ plot_registry = {
 - The **“Equipment and Materials”** group lies in between, averaging around 12 bidders.
 - These differences **highlight potential areas for policy intervention** to improve market access and **enhance procurement efficiency**.
 """,
+            'build': build_mean_bidders_per_cpv,
             'func': plot_mean_bidders_per_cpv
         },
     ],
@@ -193,6 +209,7 @@ plot_registry = {
 - **Low-participation procedures** show greater price dispersion, suggesting **uncertainty and inefficiency**.
 - When participation is broader, prices are **more concentrated and predictable**, indicating **higher procurement efficiency**.
 """,
+            'build': build_bidders_vs_ln_price,
             'func': plot_bidders_vs_ln_price
         },
     ],
@@ -210,6 +227,7 @@ plot_registry = {
 - In **2022**, the volume peaked at around **640 contracts**, indicating **consolidated operational response** to the pandemic.
 - In **2023**, contracts dropped to about **410**, aligning with the **official end of the pandemic** and suggesting a return to **standard procurement practices**.
 """, 
+            'build': build_contracts_during_pandemic,
             'func': plot_contracts_during_pandemic
         },
          {
@@ -219,6 +237,7 @@ plot_registry = {
 - This supports the theory that **higher competition leads to lower prices**, reinforcing efficiency in procurement.
 - Although the general pattern is consistent, **some differences** are observed between periods, suggesting that the **pandemic context may have influenced market dynamics** and supplier behavior.
 """, 
+            'build': build_bidders_vs_log_price_pandemic,
             'func': plot_bidders_vs_log_price_pandemic  
         },
           {
@@ -229,6 +248,7 @@ plot_registry = {
 - In **non-pandemic periods**, prices are more **concentrated**, with **fewer extreme values**, reflecting greater predictability.
 - When there are **more than 20 bidders**, **price levels converge** across periods, reinforcing the notion that **greater competition smooths disparities even under adverse conditions**.
 """,
+            'build': build_avg_log_price_pandemic,
             'func': plot_avg_log_price_pandemic
         },
     ],
@@ -245,6 +265,7 @@ plot_registry = {
 - The **PT20 (Autonomous Region of the Azores)** recorded **almost no contracting activity** in the analysed dataset.
 - These figures point to **significant regional disparities** in public healthcare procurement volume.
 """,
+            'build': build_contracts_by_location,
             'func': plot_contracts_by_location
         },
         {
@@ -256,6 +277,7 @@ plot_registry = {
 - Both **PT15 (Algarve)** and **PT20 (Autonomous Region of the Azores)** maintain **minimal expenditure levels**, respectively **€2.3M** and **€0.25M**.
 - This pattern highlights **regional inequalities** not only in contract volume but also in the **average and total value of public procurement**.
 """,
+            'build': build_total_spending_by_location,
             'func': plot_total_spending_by_location
         },
         {
@@ -266,7 +288,9 @@ plot_registry = {
 - The **PT20 region (Autonomous Region of the Azores)** shows a **slightly negative trend**, possibly due to a **statistical artifact** caused by the **limited number of observations** or **distinct procurement dynamics** in the autonomous region.
 - The consistency of the positive relationship in the other regions reflects a **nationwide trend of proportionality between estimated and actual contract prices**, which may serve as an indicator of predictability or alignment in public procurement practices.
 """,
-            'func': plot_log_log_by_region
+            'build': build_log_log_by_region,
+            'func': plot_log_log_by_region,
+            'footer': show_regional_elasticities
         },
     ],
     'execution_dummy': [
@@ -279,6 +303,7 @@ plot_registry = {
 - These variations may be driven by **contract complexity**, **administrative inefficiencies**, or **external shocks** such as the **COVID-19 pandemic (2020–2022)**.
 - The analysis suggests that **execution performance is not stable over time**, requiring further investigation into root causes for delays in specific years.
 """,
+            'build': build_execution_compliance_rate,
             'func': plot_execution_compliance_rate  
         },
         
@@ -290,6 +315,7 @@ plot_registry = {
 - This suggests that the **COVID-19 pandemic did not substantially impact** execution performance.
 - Reinforces the notion that contract execution was **robust** to the crisis conditions.
 """,
+        'build': build_execution_pandemic_comparison,
         'func': plot_execution_pandemic_comparison  # <- garante que tens esta função definida
     }
 
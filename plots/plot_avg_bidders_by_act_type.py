@@ -1,14 +1,15 @@
 import plotly.graph_objects as go
 import streamlit as st
 
-def plot_avg_bidders_by_act_type(df):
+def build_avg_bidders_by_act_type(df):
     if 'act_type' not in df.columns or 'bidders' not in df.columns:
-        st.warning("As colunas 'act_type' ou 'bidders' não existem no DataFrame.")
-        return
+        return None
     
     # Cálculo da média de concorrentes por tipo de anúncio
-    avg_bidders = df.groupby('act_type')['bidders'].mean().round(1)
+    avg_bidders = df.groupby('act_type', observed=True)['bidders'].mean().round(1)
     avg_bidders = avg_bidders.sort_index()
+    if avg_bidders.empty:
+        return None
 
     fig = go.Figure()
 
@@ -30,4 +31,16 @@ def plot_avg_bidders_by_act_type(df):
         yaxis=dict(range=[0, max(avg_bidders.values)*1.2])
     )
 
-    st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    return fig
+
+
+def plot_avg_bidders_by_act_type(df):
+    if 'act_type' not in df.columns or 'bidders' not in df.columns:
+        st.warning("As colunas 'act_type' ou 'bidders' não existem no DataFrame.")
+        return
+
+    fig = build_avg_bidders_by_act_type(df)
+    if fig is None:
+        st.info("Não há dados disponíveis para este intervalo de datas.")
+        return
+    st.plotly_chart(fig, use_container_width=True)
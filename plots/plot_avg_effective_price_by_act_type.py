@@ -1,13 +1,12 @@
 import plotly.graph_objects as go
 import streamlit as st
 
-def plot_avg_effective_price_by_act_type(df):
+def build_avg_effective_price_by_act_type(df):
     if 'act_type' not in df.columns or 'effective_total_price' not in df.columns:
-        st.warning("As colunas 'act_type' ou 'effective_total_price' não existem no DataFrame.")
-        return
+        return None
    
     # Média do preço efetivo por tipo de anúncio
-    avg_price = df.groupby('act_type')['effective_total_price'].mean().round(0)
+    avg_price = df.groupby('act_type', observed=True)['effective_total_price'].mean().round(0)
     avg_price = avg_price.sort_index()
 
     # Formatar com espaço como separador de milhar
@@ -34,4 +33,12 @@ def plot_avg_effective_price_by_act_type(df):
         yaxis=dict(range=[0, avg_price.max() * 1.2])
     )
 
-    st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    return fig
+
+
+def plot_avg_effective_price_by_act_type(df):
+    fig = build_avg_effective_price_by_act_type(df)
+    if fig is None:
+        st.warning("As colunas 'act_type' ou 'effective_total_price' não existem no DataFrame.")
+        return
+    st.plotly_chart(fig, use_container_width=True)
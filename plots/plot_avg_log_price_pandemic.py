@@ -8,13 +8,12 @@ import numpy as np
 import statsmodels.api as sm
 
 
-def plot_avg_log_price_pandemic(df: pd.DataFrame):
+def build_avg_log_price_pandemic(df: pd.DataFrame):
     """
     Figure 4.17: Average log effective price during and outside the pandemic period.
     """
     if 'effective_total_price' not in df.columns or 'covid_pandemic' not in df.columns:
-        st.warning("Colunas necessárias: 'effective_total_price' e 'covid_pandemic'.")
-        return
+        return None
 
     df_plot = df.copy()
     df_plot = df_plot[df_plot['effective_total_price'] > 0]  # evitar log(0)
@@ -41,4 +40,12 @@ def plot_avg_log_price_pandemic(df: pd.DataFrame):
         template="simple_white"
     )
 
+    return fig
+
+
+def plot_avg_log_price_pandemic(df: pd.DataFrame):
+    fig = build_avg_log_price_pandemic(df)
+    if fig is None:
+        st.warning("Colunas necessárias: 'effective_total_price' e 'covid_pandemic'.")
+        return
     st.plotly_chart(fig, use_container_width=True)
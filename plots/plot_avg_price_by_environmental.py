@@ -8,10 +8,9 @@ import numpy as np
 
 
 
-def plot_avg_price_by_environmental(df):
+def build_avg_price_by_environmental(df):
     if 'contract_year' not in df.columns or 'environmental' not in df.columns or 'effective_total_price' not in df.columns:
-        st.warning("O DataFrame não contém as colunas necessárias.")
-        return
+        return None
 
     # Agrupar por ano e critério ambiental
     grouped = df.groupby(['contract_year', 'environmental'])['effective_total_price'].mean().reset_index()
@@ -44,4 +43,12 @@ def plot_avg_price_by_environmental(df):
         legend_title_text='Environmental Criteria'
     )
 
+    return fig
+
+
+def plot_avg_price_by_environmental(df):
+    fig = build_avg_price_by_environmental(df)
+    if fig is None:
+        st.warning("O DataFrame não contém as colunas necessárias.")
+        return
     st.plotly_chart(fig, use_container_width=True)
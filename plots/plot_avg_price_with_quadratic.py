@@ -3,11 +3,12 @@ import numpy as np
 import streamlit as st
 import pandas as pd
 
+from trend import polynomial_trend
 
-def plot_avg_price_with_quadratic(df):
+
+def build_avg_price_with_quadratic(df):
     if 'contract_date' not in df.columns or 'effective_total_price' not in df.columns:
-        st.warning("O DataFrame não contém as colunas necessárias.")
-        return
+        return None
 
     # Criar ou atualizar a coluna 'contract_year' com base no df filtrado
     df = df.copy()  # evitar alterações no df original
@@ -17,17 +18,15 @@ def plot_avg_price_with_quadratic(df):
     avg_price_by_year = df.groupby('contract_year')['effective_total_price'].mean().dropna().sort_index()
 
     if avg_price_by_year.empty:
-        st.info("Não há dados disponíveis para este intervalo de datas.")
-        return
+        return None
 
     x = avg_price_by_year.index.values
     y = avg_price_by_year.values
 
-    # Ajuste polinomial quadrático (grau 2)
-    coefs = np.polyfit(x, y, deg=2)
-    poly_func = np.poly1d(coefs)
-    x_smooth = np.linspace(x.min(), x.max(), 100)
-    y_smooth = poly_func(x_smooth)
+    # Ajuste polinomial quadrático (grau 2), em cache por série anual
+    quadratic = polynomial_trend(x.astype(np.float64), y.astype(np.float64), deg=2)
+    x_smooth = quadratic['x']
+    y_smooth = quadratic['fitted']
 
     # Gráfico base
     fig = go.Figure()
@@ -60,4 +59,16 @@ def plot_avg_price_with_quadratic(df):
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5)
     )
 
-    st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    return fig
+
+
+def plot_avg_price_with_quadratic(df):
+    if 'contract_date' not in df.columns or 'effective_total_price' not in df.columns:
+        st.warning("O DataFrame não contém as colunas necessárias.")
+        return
+
+    fig = build_avg_price_with_quadratic(df)
+    if fig is None:
+        st.info("Não há dados disponíveis para este intervalo de datas.")
+        return
+    st.plotly_chart(fig, use_container_width=True)
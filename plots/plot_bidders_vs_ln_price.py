@@ -7,7 +7,9 @@ import streamlit as st
 import numpy as np 
 import statsmodels.api as sm
 
-def plot_bidders_vs_ln_price(df: pd.DataFrame):
+from scatter_binning import POINT_BUDGET, SCATTER_MODE, TILE_BINS, scatter_traces
+
+def build_bidders_vs_ln_price(df: pd.DataFrame, mode=SCATTER_MODE, budget=POINT_BUDGET):
     """
     Figure 4.12: Relação entre número de concorrentes e log do preço efetivo.
     Inclui regressão linear com banda de confiança.
@@ -15,53 +17,55 @@ def plot_bidders_vs_ln_price(df: pd.DataFrame):
 
     # 1. Filtrar valores válidos
     df_plot = df[["bidders", "ln_effective_total_price"]].dropna()
+    if df_plot.empty:
+        return None
 
-    # 2. Modelo de regressão linear
-    X = sm.add_constant(df_plot["bidders"])
-    y = df_plot["ln_effective_total_price"]
-    model = sm.OLS(y, X).fit()
-
-    # 3. Prever valores e intervalo de confiança
-    x_pred = np.linspace(df_plot["bidders"].min(), df_plot["bidders"].max(), 100)
-    X_pred = sm.add_constant(x_pred)
-    y_pred = model.predict(X_pred)
-
-    # Intervalo de confiança 95%
-    pred_summary = model.get_prediction(X_pred).summary_frame(alpha=0.05)
-    y_lower = pred_summary["obs_ci_lower"]
-    y_upper = pred_summary["obs_ci_upper"]
-
-    # 4. Gráfico
+    # 2-4. Gráfico
     fig = go.Figure()
 
-    # Scatterplot
-    fig.add_trace(go.Scatter(
-        x=df_plot["bidders"],
-        y=df_plot["ln_effective_total_price"],
-        mode="markers",
+    # Scatterplot – no máximo `budget` pontos, em WebGL
+    bidders = df_plot["bidders"].to_numpy(dtype=np.float64)
+    fig.add_traces(scatter_traces(
+        bidders,
+        df_plot["ln_effective_total_price"],
+        mode=mode,
+        budget=budget,
+        bins=(np.arange(bidders.min() - 0.5, bidders.max() + 1.5), TILE_BINS),  # um mosaico por nº de concorrentes
         name="Data Points",
         marker=dict(color="black", opacity=0.4)
     ))
 
-    # Linha de regressão
-    fig.add_trace(go.Scatter(
-        x=x_pred,
-        y=y_pred,
-        mode="lines",
-        name="Linear Regression",
-        line=dict(color="darkred", width=2)
-    ))
+    # Regressão linear e intervalo de 95%, só com pelo menos dois valores de x distintos
+    if df_plot["bidders"].nunique() >= 2:
+        X = sm.add_constant(df_plot["bidders"], has_constant="add")
+        model = sm.OLS(df_plot["ln_effective_total_price"], X).fit()
 
-    # Banda de confiança
-    fig.add_trace(go.Scatter(
-        x=np.concatenate([x_pred, x_pred[::-1]]),
-        y=np.concatenate([y_lower, y_upper[::-1]]),
-        fill='toself',
-        fillcolor='rgba(200,0,0,0.1)',
-        line=dict(color='rgba(255,255,255,0)'),
-        hoverinfo="skip",
-        name="95% Confidence Interval"
-    ))
+        x_pred = np.linspace(df_plot["bidders"].min(), df_plot["bidders"].max(), 100)
+        X_pred = sm.add_constant(x_pred, has_constant="add")
+        y_pred = model.predict(X_pred)
+        pred_summary = model.get_prediction(X_pred).summary_frame(alpha=0.05)
+        y_lower = pred_summary["obs_ci_lower"]
+        y_upper = pred_summary["obs_ci_upper"]
+
+        # Linha de regressão
+        fig.add_trace(go.Scatter(
+            x=x_pred,
+            y=y_pred,
+            mode="lines",
+            name="Linear Regression",
+            line=dict(color="darkred", width=2)
+        ))
+
+        # Banda de confiança
+        fig.add_trace(go.Scatter(
+            x=np.concatenate([x_pred, x_pred[::-1]]),
+            y=np.concatenate([y_lower, y_upper[::-1]]),
+            fill='toself',
+            fillcolor='rgba(200,0,0,0.1)',
+            line=dict(color='rgba(255,255,255,0)'),
+            hoverinfo="skip",
+            name="95% Confidence Interval"
+        ))
 
     fig.update_layout(
         title="Relationship between Number of Bidders and Log of Effective Contract Price",
@@ -71,4 +75,12 @@ def plot_bidders_vs_ln_price(df: pd.DataFrame):
         showlegend=False
     )
 
+    return fig
+
+
+def plot_bidders_vs_ln_price(df: pd.DataFrame):
+    fig = build_bidders_vs_ln_price(df)
+    if fig is None:
+        st.info("Não há dados disponíveis para este intervalo de datas.")
+        return
     st.plotly_chart(fig, use_container_width=True)
@@ -8,14 +8,13 @@ import numpy as np
 import statsmodels.api as sm
 
 
-def plot_bidders_vs_log_price_pandemic(df: pd.DataFrame):
+def build_bidders_vs_log_price_pandemic(df: pd.DataFrame):
     """
     Figure 4.18: Relationship between number of bidders and log effective price,
     colored by pandemic period.
     """
     if 'bidders' not in df.columns or 'effective_total_price' not in df.columns or 'covid_pandemic' not in df.columns:
-        st.warning("Colunas necessárias: 'bidders', 'effective_total_price', 'covid_pandemic'.")
-        return
+        return None
 
     df_plot = df.copy()
     df_plot = df_plot[df_plot['effective_total_price'] > 0]
@@ -43,4 +42,12 @@ def plot_bidders_vs_log_price_pandemic(df: pd.DataFrame):
         template="simple_white"
     )
 
+    return fig
+
+
+def plot_bidders_vs_log_price_pandemic(df: pd.DataFrame):
+    fig = build_bidders_vs_log_price_pandemic(df)
+    if fig is None:
+        st.warning("Colunas necessárias: 'bidders', 'effective_total_price', 'covid_pandemic'.")
+        return
     st.plotly_chart(fig, use_container_width=True)
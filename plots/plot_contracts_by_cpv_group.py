@@ -7,13 +7,12 @@ import streamlit as st
 import time
 
 
-def plot_contracts_by_cpv_group(df):
+def build_contracts_by_cpv_group(df):
     if 'contract_year' not in df.columns or 'CPV_agrupado' not in df.columns:
-        st.warning("O DataFrame não contém as colunas necessárias.")
-        return
+        return None
 
     # Contar número de contratos por ano e grupo CPV
-    grouped = df.groupby(['contract_year', 'CPV_agrupado']).size().reset_index(name='num_contracts')
+    grouped = df.groupby(['contract_year', 'CPV_agrupado'], observed=True).size().reset_index(name='num_contracts')
 
     fig = px.line(
         grouped,
@@ -59,6 +58,15 @@ def plot_contracts_by_cpv_group(df):
         annotations=variation_annotations
     )
 
+    return fig
+
+
+def plot_contracts_by_cpv_group(df):
+    fig = build_contracts_by_cpv_group(df)
+    if fig is None:
+        st.warning("O DataFrame não contém as colunas necessárias.")
+        return
+
     # Criar key única com timestamp
     unique_key = f"plot_contracts_{int(time.time() * 1000)}"
-    st.plotly_chart(fig, use_container_width=True, key=unique_key)
\ No newline at end of file
+    st.plotly_chart(fig, use_container_width=True, key=unique_key)
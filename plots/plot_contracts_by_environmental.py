@@ -7,10 +7,9 @@ import streamlit as st
 import numpy as np 
 
 
-def plot_contracts_by_environmental(df):
+def build_contracts_by_environmental(df):
     if 'contract_year' not in df.columns or 'environmental' not in df.columns:
-        st.warning("O DataFrame não contém as colunas necessárias.")
-        return
+        return None
 
     # Agrupar por ano e critério ambiental
     grouped = df.groupby(['contract_year', 'environmental']).size().reset_index(name='count')
@@ -43,4 +42,12 @@ def plot_contracts_by_environmental(df):
         legend_title_text='Environmental Criteria'
     )
 
+    return fig
+
+
+def plot_contracts_by_environmental(df):
+    fig = build_contracts_by_environmental(df)
+    if fig is None:
+        st.warning("O DataFrame não contém as colunas necessárias.")
+        return
     st.plotly_chart(fig, use_container_width=True)
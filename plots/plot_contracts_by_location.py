@@ -8,17 +8,16 @@ import numpy as np
 import statsmodels.api as sm
 
 
-def plot_contracts_by_location(df: pd.DataFrame):
+def build_contracts_by_location(df: pd.DataFrame):
     """
     Figure 4.19: Number of contracts by location (NUTS II).
     """
     if 'loc' not in df.columns:
-        st.warning("Coluna 'location' não encontrada na base de dados.")
-        return
+        return None
 
     df_plot = df.copy()
     df_plot = df_plot[df_plot['loc'].notna()]
-    df_counts = df_plot['loc'].value_counts().reset_index()
+    df_counts = df_plot['loc'].value_counts().loc[lambda s: s > 0].reset_index()
     df_counts.columns = ['Location (NUTS II)', 'Number of Contracts']
 
     fig = px.bar(
@@ -41,5 +40,12 @@ def plot_contracts_by_location(df: pd.DataFrame):
         yaxis_title="Number of Contracts"
     )
 
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
+
 
+def plot_contracts_by_location(df: pd.DataFrame):
+    fig = build_contracts_by_location(df)
+    if fig is None:
+        st.warning("Coluna 'location' não encontrada na base de dados.")
+        return
+    st.plotly_chart(fig, use_container_width=True)
@@ -8,13 +8,12 @@ import numpy as np
 import statsmodels.api as sm
 
 
-def plot_contracts_during_pandemic(df: pd.DataFrame):
+def build_contracts_during_pandemic(df: pd.DataFrame):
     """
     Figure 4.16: Number of contracts per year during the COVID-19 pandemic period.
     """
     if 'contract_year' not in df.columns or 'covid_pandemic' not in df.columns:
-        st.warning("Colunas necessárias: 'contract_year' e 'covid_pandemic'.")
-        return
+        return None
 
     # Filtrar apenas anos de pandemia
     pandemic_years = df[df['covid_pandemic'] == 1]
@@ -46,4 +45,12 @@ def plot_contracts_during_pandemic(df: pd.DataFrame):
         margin=dict(l=40, r=30, t=60, b=40)
     )
 
+    return fig
+
+
+def plot_contracts_during_pandemic(df: pd.DataFrame):
+    fig = build_contracts_during_pandemic(df)
+    if fig is None:
+        st.warning("Colunas necessárias: 'contract_year' e 'covid_pandemic'.")
+        return
     st.plotly_chart(fig, use_container_width=True)
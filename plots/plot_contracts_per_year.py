@@ -4,10 +4,9 @@ import pandas as pd
 import streamlit as st
 
 
-def plot_contracts_per_year(df):
+def build_contracts_per_year(df):
     if 'contract_year' not in df.columns:
-        st.warning("A coluna 'contract_year' não existe no DataFrame.")
-        return
+        return None
 
     # Contagem de contratos por ano
     year_counts = df['contract_year'].value_counts().sort_index()
@@ -56,4 +55,12 @@ def plot_contracts_per_year(df):
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5)
     )
 
-    st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    return fig
+
+
+def plot_contracts_per_year(df):
+    fig = build_contracts_per_year(df)
+    if fig is None:
+        st.warning("A coluna 'contract_year' não existe no DataFrame.")
+        return
+    st.plotly_chart(fig, use_container_width=True)
@@ -1,38 +1,37 @@
-import plotly.express as px
+import plotly.graph_objects as go
 import pandas as pd
 import streamlit as st
 
-def plot_density_ln_effective_price_by_environmental(df: pd.DataFrame):
-    df = df.copy()
+from histogram_service import histogram_traces
 
+def build_density_ln_effective_price_by_environmental(df: pd.DataFrame):
     # Garantir colunas válidas e sem NaN
     df = df.dropna(subset=['ln_effective_total_price', 'environmental'])
 
     # Mapeamento mais amigável
-    df['Environmental Criteria'] = df['environmental'].map({
+    labels = df['environmental'].map({
         0: 'No Criteria',
         1: 'Criteria'
     })
 
-    fig = px.histogram(
-        df,
-        x='ln_effective_total_price',
-        color='Environmental Criteria',
+    # Densidades calculadas aqui (histograma + KDE por FFT): só as curvas seguem para o browser
+    fig = go.Figure(histogram_traces(
+        df['ln_effective_total_price'],
+        groups=labels,
+        nbins=40,
         histnorm='density',
-        barmode='overlay',
+        kde=True,
         opacity=0.5,
-        color_discrete_map={
+        colors={
             'No Criteria': '#bcbcbc',
             'Criteria': '#1f3c88'
-        },
-        labels={
-            'ln_effective_total_price': 'Logₑ(Effective Price)',
-            'Environmental Criteria': 'Environmental'
-        },
-        title="Density of Log(Effective Price) by Environmental Criteria"
-    )
+        }
+    ))
 
     fig.update_layout(
+        title="Density of Log(Effective Price) by Environmental Criteria",
+        barmode='overlay',
+        bargap=0,
         xaxis_title='Logₑ(Effective Price)',
         yaxis_title='Density',
         legend_title='Environmental Criteria',
@@ -40,4 +39,8 @@ def plot_density_ln_effective_price_by_environmental(df: pd.DataFrame):
         margin=dict(l=40, r=30, t=60, b=40)
     )
 
-    st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    return fig
+
+
+def plot_density_ln_effective_price_by_environmental(df: pd.DataFrame):
+    st.plotly_chart(build_density_ln_effective_price_by_environmental(df), use_container_width=True)
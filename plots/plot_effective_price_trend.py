@@ -1,37 +1,38 @@
-import plotly.express as px
 import plotly.graph_objects as go
-import statsmodels.api as sm
 import pandas as pd
 import numpy as np
 import streamlit as st
 
+from scatter_binning import POINT_BUDGET, SCATTER_MODE, TILE_BINS, scatter_traces
+from trend import lowess_trend
+
 BLUE = "#0B2C54"
 
-def plot_effective_price_trend(df):
-    df = df.copy()
+def build_effective_price_trend(df, mode=SCATTER_MODE, budget=POINT_BUDGET):
     df = df.dropna(subset=['ln_effective_total_price', 'contract_year'])
+    if df.empty:
+        return None
 
-    # LOWESS smoothing
-    smoothed = sm.nonparametric.lowess(
-        df['ln_effective_total_price'],
-        df['contract_year'],
+    # LOWESS smoothing (por posições agrupadas, em cache por janela de dados)
+    smoothed = lowess_trend(
+        df['contract_year'].to_numpy(dtype=np.float64),
+        df['ln_effective_total_price'].to_numpy(dtype=np.float64),
         frac=0.3
     )
-    smooth_x = [x[0] for x in smoothed]
-    smooth_y = [x[1] for x in smoothed]
+    smooth_x = smoothed['x']
+    smooth_y = smoothed['fitted']
 
-    # Scatter plot (sem título aqui!)
-    fig = px.scatter(
-        df,
-        x='contract_year',
-        y='ln_effective_total_price',
-        opacity=0.5,
-        color_discrete_sequence=[BLUE],
-        labels={
-            'contract_year': 'Contract Year',
-            'ln_effective_total_price': 'Logₑ(Total Effective Price)'
-        }
-    )
+    # Scatter plot (sem título aqui!) – no máximo `budget` pontos, em WebGL
+    years = df['contract_year'].to_numpy(dtype=np.float64)
+    fig = go.Figure(scatter_traces(
+        years,
+        df['ln_effective_total_price'],
+        mode=mode,
+        budget=budget,
+        bins=(np.arange(years.min() - 0.5, years.max() + 1.5), TILE_BINS),  # um mosaico por ano
+        marker=dict(color=BLUE, opacity=0.5),
+        hovertemplate='Contract Year=%{x}<br>Logₑ(Total Effective Price)=%{y}<extra></extra>'
+    ))
 
     # LOWESS line
     fig.add_trace(go.Scatter(
@@ -63,4 +64,12 @@ def plot_effective_price_trend(df):
         showlegend=False
     )
 
-    st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    return fig
+
+
+def plot_effective_price_trend(df):
+    fig = build_effective_price_trend(df)
+    if fig is None:
+        st.info("Não há dados disponíveis para este intervalo de datas.")
+        return
+    st.plotly_chart(fig, use_container_width=True)
@@ -2,10 +2,17 @@ import plotly.graph_objects as go
 import pandas as pd
 import streamlit as st
 
-def plot_execution_by_act_type(df):
+LABEL_LEGEND = {
+    "1": "Deadline Extension Notice",
+    "2": "Notice Correction Statement",
+    "3": "Standard Procedure Notice",
+    "4": "Urgent Tender Notice"
+}
+
+
+def build_execution_by_act_type(df):
     if {'act_type', 'execution_dummy'} - set(df.columns):
-        st.warning("Columns 'act_type' and/or 'execution_dummy' missing.")
-        return
+        return None
 
     # Mapping original labels to numeric codes
     label_map = {
@@ -14,13 +21,7 @@ def plot_execution_by_act_type(df):
         "Standard Procedure Notice": "3",
         "Urgent Tender Notice": "4"
     }
-    label_legend = {
-        "1": "Deadline Extension Notice",
-        "2": "Notice Correction Statement",
-        "3": "Standard Procedure Notice",
-        "4": "Urgent Tender Notice"
-    }
-    df['label_code'] = df['act_type'].map(label_map).fillna("Other")
+    df['label_code'] = df['act_type'].astype(str).map(label_map).fillna("Other")
 
     exec_counts = (
         df.groupby(['label_code', 'execution_dummy'])
@@ -68,9 +69,20 @@ def plot_execution_by_act_type(df):
         automargin=True
     )
 
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
-    # Legenda explicativa abaixo
+
+def show_act_type_legend(df=None):
+    # Legenda explicativa abaixo (os rodapés do registo recebem os dados filtrados; aqui não são usados)
     st.markdown("**Legend for Notice Type Codes:**")
-    for code, desc in label_legend.items():
-        st.markdown(f"**{code}** – {desc}")
\ No newline at end of file
+    for code, desc in LABEL_LEGEND.items():
+        st.markdown(f"**{code}** – {desc}")
+
+
+def plot_execution_by_act_type(df):
+    fig = build_execution_by_act_type(df)
+    if fig is None:
+        st.warning("Columns 'act_type' and/or 'execution_dummy' missing.")
+        return
+    st.plotly_chart(fig, use_container_width=True)
+    show_act_type_legend(df)
@@ -2,13 +2,12 @@ import plotly.express as px
 import pandas as pd
 import streamlit as st
 
-def plot_execution_compliance_rate(df: pd.DataFrame):
+def build_execution_compliance_rate(df: pd.DataFrame):
     """
     Figure 4.14: Stacked bar chart showing the annual execution compliance rate.
     """
     if 'contract_year' not in df.columns or 'execution_dummy' not in df.columns:
-        st.warning("Missing columns: 'contract_year' and 'execution_dummy'.")
-        return
+        return None
 
     # Preparar dados
     df_filtered = df[['contract_year', 'execution_dummy']].dropna()
@@ -47,4 +46,12 @@ def plot_execution_compliance_rate(df: pd.DataFrame):
         margin=dict(l=40, r=30, t=60, b=40)
     )
 
-    st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    return fig
+
+
+def plot_execution_compliance_rate(df: pd.DataFrame):
+    fig = build_execution_compliance_rate(df)
+    if fig is None:
+        st.warning("Missing columns: 'contract_year' and 'execution_dummy'.")
+        return
+    st.plotly_chart(fig, use_container_width=True)
@@ -2,13 +2,12 @@ import plotly.express as px
 import pandas as pd
 import streamlit as st
 
-def plot_execution_pandemic_comparison(df: pd.DataFrame):
+def build_execution_pandemic_comparison(df: pd.DataFrame):
     """
     Figure 4.15: Execution rate during pandemic and non-pandemic periods.
     """
     if 'covid_pandemic' not in df.columns or 'execution_dummy' not in df.columns:
-        st.warning("Required columns: 'covid_pandemic' and 'execution_dummy'.")
-        return
+        return None
 
     # Mapeamento para nomes legíveis
     df_filtered = df[['covid_pandemic', 'execution_dummy']].dropna()
@@ -52,4 +51,12 @@ def plot_execution_pandemic_comparison(df: pd.DataFrame):
         margin=dict(l=40, r=30, t=60, b=40)
     )
 
-    st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    return fig
+
+
+def plot_execution_pandemic_comparison(df: pd.DataFrame):
+    fig = build_execution_pandemic_comparison(df)
+    if fig is None:
+        st.warning("Required columns: 'covid_pandemic' and 'execution_dummy'.")
+        return
+    st.plotly_chart(fig, use_container_width=True)
@@ -1,47 +1,48 @@
-import plotly.express as px
 import plotly.graph_objects as go
 import statsmodels.api as sm
+import numpy as np
 import pandas as pd
 import streamlit as st
 
+from scatter_binning import POINT_BUDGET, SCATTER_MODE, scatter_traces
+
 # cor “corporate blue” usada nos outros plots
 BLUE = "#0B2C54"
 
-def plot_ln_base_vs_ln_effective(df):
-
-    df = df.dropna(subset=['ln_base_price', 'ln_effective_total_price']).copy()
+def build_ln_base_vs_ln_effective(df, mode=SCATTER_MODE, budget=POINT_BUDGET):
 
-    # Regressão linear
-    X = sm.add_constant(df['ln_base_price'])
+    df = df.dropna(subset=['ln_base_price', 'ln_effective_total_price'])
+    if df.empty:
+        return None
     y = df['ln_effective_total_price']
-    model = sm.OLS(y, X).fit()
-    df['predicted_ln_effective'] = model.predict(X)
-
-    # Scatter com a paleta azul definida
-    fig = px.scatter(
-        df,
-        x='ln_base_price',
-        y='ln_effective_total_price',
-        opacity=0.55,                     # leve transparência
-        color_discrete_sequence=[BLUE],   # pontos azuis
-        labels={
-            'ln_base_price': 'Logₑ(Base Price)',
-            'ln_effective_total_price': 'Logₑ(Effective Price)'
-        },
-        title="Relationship between Log(Base Price) and Log(Effective Price)"
-    )
 
-    # Linha de regressão (mesmo tom azul, mas ligeiramente mais clara)
-    fig.add_scatter(
-        x=df['ln_base_price'],
-        y=df['predicted_ln_effective'],
-        mode='lines',
-        name='OLS Trend',
-        line=dict(color=BLUE, width=3)
-    )
+    # Scatter com a paleta azul definida – no máximo `budget` pontos, em WebGL
+    fig = go.Figure(scatter_traces(
+        df['ln_base_price'],
+        y,
+        mode=mode,
+        budget=budget,
+        marker=dict(color=BLUE, opacity=0.55),   # pontos azuis, leve transparência
+        hovertemplate='Logₑ(Base Price)=%{x}<br>Logₑ(Effective Price)=%{y}<extra></extra>'
+    ))
+
+    # Regressão linear (mesmo tom azul), só com pelo menos dois valores de x
+    # distintos; a reta só precisa dos extremos
+    if df['ln_base_price'].nunique() >= 2:
+        X = sm.add_constant(df['ln_base_price'], has_constant="add")
+        model = sm.OLS(y, X).fit()
+        x_line = np.array([df['ln_base_price'].min(), df['ln_base_price'].max()])
+        fig.add_scatter(
+            x=x_line,
+            y=model.params.iloc[0] + model.params.iloc[1] * x_line,
+            mode='lines',
+            name='OLS Trend',
+            line=dict(color=BLUE, width=3)
+        )
 
     # Layout
     fig.update_layout(
+        title="Relationship between Log(Base Price) and Log(Effective Price)",
         font=dict(color='white'),
         xaxis_title='Logₑ(Base Price)',
         yaxis_title='Logₑ(Effective Price)',
@@ -50,4 +51,12 @@ def plot_ln_base_vs_ln_effective(df):
         showlegend=False
     )
 
-    st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    return fig
+
+
+def plot_ln_base_vs_ln_effective(df):
+    fig = build_ln_base_vs_ln_effective(df)
+    if fig is None:
+        st.info("Não há dados disponíveis para este intervalo de datas.")
+        return
+    st.plotly_chart(fig, use_container_width=True)
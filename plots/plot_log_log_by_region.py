@@ -1,44 +1,90 @@
-import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
 import streamlit as st
 
+from grouped_ols import grouped_ols
+from scatter_binning import POINT_BUDGET, SCATTER_MODE, scatter_traces
 
-def plot_log_log_by_region(df: pd.DataFrame):
+FACET_COLS = 4  # Máximo de 4 colunas por linha
+
+
+def _log_prices(df: pd.DataFrame, by=('loc',)) -> pd.DataFrame:
+    df_plot = df[[*dict.fromkeys(by), 'base_price', 'effective_total_price']].dropna()
+
+    # Adiciona colunas log-transformadas
+    return df_plot.assign(
+        log_base_price=np.log(df_plot['base_price']),
+        log_effective_price=np.log(df_plot['effective_total_price']),
+    )
+
+
+def regional_elasticities(df: pd.DataFrame, by='loc') -> pd.DataFrame:
+    """
+    Elasticity of the effective total price to the base price (slope of the
+    log-log OLS) per region, or per any other grouping `by` (e.g.
+    ``['loc', 'CPV_agrupado']``); see `grouped_ols.grouped_ols`.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    return grouped_ols(_log_prices(df, by), 'log_base_price', 'log_effective_price', by)
+
+
+def build_log_log_by_region(df: pd.DataFrame, mode=SCATTER_MODE, budget=POINT_BUDGET):
     """
     Figure 4.21: Log-log relationship between base_price and effective_total_price, by location (NUTS II).
+
+    The panels share a budget of `budget` points sent to the browser (see
+    `scatter_binning.scatter_traces`); the OLS trendlines of every region
+    come from a single `grouped_ols` pass over all contracts.
     """
     if not all(col in df.columns for col in ['loc', 'base_price', 'effective_total_price']):
-        st.warning("Colunas necessárias ('loc', 'base_price', 'effective_total_price') não encontradas.")
-        return
+        return None
 
-    df_plot = df.copy()
-    df_plot = df_plot.dropna(subset=['loc', 'base_price', 'effective_total_price'])
-    
-    # Adiciona colunas log-transformadas
-    df_plot['log_base_price'] = np.log(df_plot['base_price'])
-    df_plot['log_effective_price'] = np.log(df_plot['effective_total_price'])
-
-    # Gráfico com facetas por região (NUTS II), trendline e compactação
-    fig = px.scatter(
-        df_plot,
-        x='log_base_price',
-        y='log_effective_price',
-        facet_col='loc',
-        facet_col_wrap=4,  # Máximo de 4 colunas por linha
-        trendline='ols',
-        opacity=0.6,
-        color_discrete_sequence=['#1f3c88'],
-        labels={
-            'log_base_price': 'ln(Base Price)',
-            'log_effective_price': 'ln(Effective Total Price)',
-            'loc': 'NUTS II'
-        }
+    df_plot = _log_prices(df)
+    fits = grouped_ols(df_plot, 'log_base_price', 'log_effective_price', 'loc')
+
+    # Painéis por região (NUTS II), pela ordem em que aparecem nos dados
+    regions = list(fits.index)
+    n_rows = max(1, -(-len(regions) // FACET_COLS))
+    fig = make_subplots(
+        rows=n_rows, cols=FACET_COLS,
+        shared_xaxes=True, shared_yaxes=True,
+        horizontal_spacing=0.02, vertical_spacing=0.08,
+        subplot_titles=[f"NUTS II={region}" for region in regions],
     )
 
-    # Estilo e tamanho do gráfico
-    fig.update_traces(marker=dict(size=4))  # Pontos menores
+    panel_budget = max(1, budget // max(1, len(regions)))
+    positions = df_plot.groupby('loc', sort=False, observed=True).indices
+    log_base = df_plot['log_base_price'].to_numpy()
+    log_effective = df_plot['log_effective_price'].to_numpy()
+    for k, region in enumerate(regions):
+        row, col = k // FACET_COLS + 1, k % FACET_COLS + 1
+        x = log_base[positions[region]]
+        y = log_effective[positions[region]]
+
+        for trace in scatter_traces(x, y, mode=mode, budget=panel_budget,
+                                    marker=dict(color='#1f3c88', opacity=0.6, size=4),  # Pontos menores
+                                    name=str(region), showlegend=False,
+                                    hovertemplate='ln(Base Price)=%{x}<br>ln(Effective Total Price)=%{y}<extra></extra>'):
+            fig.add_trace(trace, row=row, col=col)
+
+        # Trendline OLS com todos os contratos da região: bastam os extremos
+        fit = fits.loc[region]
+        if np.isfinite(fit['slope']):
+            x_line = np.array([fit['x_min'], fit['x_max']])
+            fig.add_trace(go.Scatter(
+                x=x_line, y=fit['intercept'] + fit['slope'] * x_line, mode='lines',
+                line=dict(color='#1f3c88'), showlegend=False,
+                name=f"OLS trendline ({region})",
+                hovertemplate=(f"OLS trendline<br>ln(Effective Total Price) = {fit['slope']:.4f} * ln(Base Price)"
+                               f" + {fit['intercept']:.4f}<br>R²={fit['r2']:.4f}<extra></extra>")
+            ), row=row, col=col)
 
+    fig.update_xaxes(title_text='ln(Base Price)', row=n_rows)
+    fig.update_yaxes(title_text='ln(Effective Total Price)', col=1)
+
+    # Estilo e tamanho do gráfico
     fig.update_layout(
         title='Log-log relationship between base price and effective total price, segmented by region (NUTS II)',
         template='simple_white',
@@ -47,4 +93,31 @@ def plot_log_log_by_region(df: pd.DataFrame):
         font=dict(size=11),
     )
 
-    st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    return fig
+
+
+def show_regional_elasticities(df: pd.DataFrame):
+    if not all(col in df.columns for col in ['loc', 'base_price', 'effective_total_price']):
+        return
+
+    fits = regional_elasticities(df)
+    table = pd.DataFrame({
+        'Contracts': fits['n'],
+        'Elasticity': fits['slope'],
+        'Std. Error': fits['se_slope'],
+        '95% CI': [f"[{lo:.3f}, {hi:.3f}]" if np.isfinite(lo) else "–"
+                   for lo, hi in zip(fits['slope'] - 1.96 * fits['se_slope'], fits['slope'] + 1.96 * fits['se_slope'])],
+        'R²': fits['r2'],
+    }).rename_axis('NUTS II')
+    st.markdown("**Price elasticity by region** (slope of ln(Effective Total Price) on ln(Base Price))")
+    st.dataframe(table.style.format({'Elasticity': '{:.3f}', 'Std. Error': '{:.3f}', 'R²': '{:.3f}'}),
+                 use_container_width=True)
+
+
+def plot_log_log_by_region(df: pd.DataFrame):
+    fig = build_log_log_by_region(df)
+    if fig is None:
+        st.warning("Colunas necessárias ('loc', 'base_price', 'effective_total_price') não encontradas.")
+        return
+    st.plotly_chart(fig, use_container_width=True)
+    show_regional_elasticities(df)
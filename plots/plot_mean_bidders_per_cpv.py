@@ -2,14 +2,13 @@ import plotly.express as px
 import pandas as pd
 import streamlit as st
 
-def plot_mean_bidders_per_cpv(df):
+def build_mean_bidders_per_cpv(df):
     if 'CPV_agrupado' not in df.columns or 'bidders' not in df.columns:
-        st.warning("O DataFrame não contém as colunas necessárias.")
-        return
+        return None
 
     # Agrupamento e ordenação decrescente
     grouped = (
-        df.groupby('CPV_agrupado')['bidders']
+        df.groupby('CPV_agrupado', observed=True)['bidders']
         .mean()
         .reset_index(name='avg_bidders')
         .sort_values(by='avg_bidders', ascending=False)
@@ -42,4 +41,12 @@ def plot_mean_bidders_per_cpv(df):
         font=dict(color="black")
     )
 
-    st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    return fig
+
+
+def plot_mean_bidders_per_cpv(df):
+    fig = build_mean_bidders_per_cpv(df)
+    if fig is None:
+        st.warning("O DataFrame não contém as colunas necessárias.")
+        return
+    st.plotly_chart(fig, use_container_width=True)
@@ -2,14 +2,13 @@ import plotly.express as px
 import pandas as pd
 import streamlit as st
 
-def plot_total_spending_by_cpv(df):
+def build_total_spending_by_cpv(df):
     if 'CPV_agrupado' not in df.columns or 'effective_total_price' not in df.columns:
-        st.warning("O DataFrame não contém as colunas necessárias.")
-        return
+        return None
 
     # Soma da despesa por grupo CPV
     spending = (
-        df.groupby('CPV_agrupado')['effective_total_price']
+        df.groupby('CPV_agrupado', observed=True)['effective_total_price']
         .sum()
         .reset_index(name='total_spending')
         .sort_values('total_spending', ascending=False)
@@ -48,4 +47,12 @@ def plot_total_spending_by_cpv(df):
         font=dict(color="black")
     )
 
-    st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    return fig
+
+
+def plot_total_spending_by_cpv(df):
+    fig = build_total_spending_by_cpv(df)
+    if fig is None:
+        st.warning("O DataFrame não contém as colunas necessárias.")
+        return
+    st.plotly_chart(fig, use_container_width=True)
@@ -7,19 +7,18 @@ import streamlit as st
 import numpy as np 
 import statsmodels.api as sm
 
-def plot_total_spending_by_location(df: pd.DataFrame):
+def build_total_spending_by_location(df: pd.DataFrame):
     """
     Figure 4.20: Total spending by location (NUTS II), based on the effective total price.
     """
     if 'loc' not in df.columns or 'effective_total_price' not in df.columns:
-        st.warning("Colunas necessárias ('location' ou 'effective_total_price') não encontradas na base de dados.")
-        return
+        return None
 
     df_plot = df.copy()
     df_plot = df_plot[df_plot['loc'].notna()]
     df_plot = df_plot[df_plot['effective_total_price'].notna()]
 
-    df_grouped = df_plot.groupby('loc', as_index=False)['effective_total_price'].sum()
+    df_grouped = df_plot.groupby('loc', as_index=False, observed=True)['effective_total_price'].sum()
     df_grouped = df_grouped.rename(columns={
         'loc': 'Location (NUTS II)',
         'effective_total_price': 'Total Spending'
@@ -42,4 +41,12 @@ def plot_total_spending_by_location(df: pd.DataFrame):
         yaxis_title="Total Spending (€)",
     )
 
+    return fig
+
+
+def plot_total_spending_by_location(df: pd.DataFrame):
+    fig = build_total_spending_by_location(df)
+    if fig is None:
+        st.warning("Colunas necessárias ('location' ou 'effective_total_price') não encontradas na base de dados.")
+        return
     st.plotly_chart(fig, use_container_width=True)
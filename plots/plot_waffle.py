@@ -1,7 +1,7 @@
 import plotly.graph_objects as go
 import streamlit as st
 
-def plot_waffle(df):
+def build_waffle(df):
     # Dados e cores
     categories = {
         'Standard Procedure Notice': 86.5,
@@ -71,4 +71,8 @@ def plot_waffle(df):
         paper_bgcolor='rgba(0,0,0,0)',
     )
 
-    st.plotly_chart(fig)
\ No newline at end of file
+    return fig
+
+
+def plot_waffle(df):
+    st.plotly_chart(build_waffle(df))
@@ -1,73 +1,42 @@
 # rf.py  ────────────────────────────────────────────────────────────────
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import OrdinalEncoder
-import joblib
 from pathlib import Path
+from data_store import CONTRACTS_CSV, load_dataset
+from model_registry import FEATURES, get_model
+from forest_compiler import compile_pipeline, predict_frame
+from threshold_sweep import threshold_sweep, save_threshold_sweep
 
 def run_rf_mitigation(
-        csv_in="Data/dados_completos.csv",
+        csv_in=CONTRACTS_CSV,
         csv_out="Data/randomforest_results.csv",
-        model_out="models/random_forest_model.pkl",
-        threshold_rf=0.065,
-        random_state=123
+        threshold_rf=None,
 ):
     """
-    Train RF, compute risk probabilities, apply cost-mitigation rule and save results.
-    Mirrors the original R workflow.
+    Score contracts with the registry RF, apply cost-mitigation rule and save results.
+    Mirrors the original R workflow; the forest is trained only if the
+    registry does not hold one for this data yet. `threshold_rf` defaults to
+    the threshold stored with the model (held-out Youden J).
     """
     # ── 1) Load & prepare -------------------------------------------------------
-    df = pd.read_csv(csv_in)
+    df = load_dataset(csv_in)
 
     # Target: 1 if effective_total_price > base_price
     df["cost_increase"] = (df["effective_total_price"] > df["base_price"]).astype(int)
 
-    # Feature set (≃ R script)
-    features = [
-        "ln_base_price",    # already in € log-scale
-        "act_type",
-        "bidders",
-        "execution_dummy",
-        "effective_total_price",  # used for price simulation
-        "contract_year",
-        "CPV_agrupado",
-        "loc",
-        "covid_pandemic",
-        "environmental",
-    ]
-    # Keep only rows with no NA in selected columns + cost_increase
-    df_model = df[features + ["cost_increase"]].dropna().copy()
-
-    # ── 2) Encode categoricals --------------------------------------------------
-    cat_mask   = df_model[features].dtypes == "object"
-    cat_cols   = cat_mask[cat_mask].index.tolist()
-
-    if cat_cols:
-        enc = OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=-1)
-        df_model[cat_cols] = enc.fit_transform(df_model[cat_cols])
-
-    X = df_model[features]
-    y = df_model["cost_increase"]
-
-    # ── 3) Train RF -------------------------------------------------------------
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.20, stratify=y, random_state=random_state
-    )
+    # Keep only rows with no NA in the model features + price
+    df_model = df[FEATURES + ["effective_total_price", "cost_increase"]].dropna().copy()
 
-    rf = RandomForestClassifier(
-        n_estimators=100,      # as in R (ntree = 100)
-        max_depth=None,
-        random_state=random_state,
-        n_jobs=-1,
-    )
-    rf.fit(X_train, y_train)
+    # ── 2) Model (registry: encoder + RF in one pipeline) -----------------------
+    entry = get_model(df)
+    if threshold_rf is None:
+        threshold_rf = entry["threshold"]
 
     # Probabilities for **ALL** usable rows (train+test)
-    risk_prob = rf.predict_proba(X)[:, 1]
+    # (árvores compiladas em arrays planos: mesmas probabilidades, sem overhead do sklearn)
+    risk_prob = predict_frame(compile_pipeline(entry["pipeline"]), df_model)
 
-    # ── 4) Mitigation rule ------------------------------------------------------
+    # ── 3) Mitigation rule ------------------------------------------------------
     df_model["risk_prob"] = risk_prob
 
     # Average price for *safe* contracts
@@ -80,33 +49,38 @@ def run_rf_mitigation(
         df_model["effective_total_price"]
     )
 
-    # ── 5) Aggregate costs ------------------------------------------------------
+    # Sweep de todos os limiares sobre estas previsões, guardado ao lado dos resultados
+    # (o sweep do conjunto de teste já está junto ao modelo no registo)
+    save_threshold_sweep(
+        threshold_sweep(df_model["risk_prob"], df_model["cost_increase"], df_model["effective_total_price"]),
+        csv_out
+    )
+
+    # ── 4) Aggregate costs ------------------------------------------------------
     real_cost_rf = df_model["effective_total_price"].sum()
     sim_cost_rf  = df_model["price_sim_rf"].sum()
     savings_rf   = real_cost_rf - sim_cost_rf
 
-    # ── 6) Persist / report -----------------------------------------------------
-    out_cols = list(df.columns) + ["risk_prob", "price_sim_rf"]
+    # ── 5) Persist / report -----------------------------------------------------
     # align indices to original df for a clean merge
     df_full = df.join(df_model[["risk_prob", "price_sim_rf"]])
 
     Path(csv_out).parent.mkdir(parents=True, exist_ok=True)
     df_full.to_csv(csv_out, index=False)
 
-    Path(model_out).parent.mkdir(parents=True, exist_ok=True)
-    joblib.dump(rf, model_out)
-
     def euro(x):  # simple € formatter
         return f"€ {x:,.0f}".replace(",", " ")
 
     print("Random-Forest Mitigation Scenario")
+    print(" • Model:          ", entry["key"])
+    print(" • Threshold:      ", f"{threshold_rf:.3f}")
     print(" • Real Cost:      ", euro(real_cost_rf))
     print(" • Simulated Cost: ", euro(sim_cost_rf))
     print(" • Savings:        ", euro(savings_rf))
 
     return {
-        "model": rf,
-        "encoder": enc if cat_cols else None,
+        "model": entry["pipeline"],
+        "encoder": entry["pipeline"].named_steps["preprocess"],
         "results_df": df_full,
         "real_cost": real_cost_rf,
         "sim_cost": sim_cost_rf,
@@ -115,4 +89,4 @@ def run_rf_mitigation(
 
 # Quick run (comment-out when importing from elsewhere)
 if __name__ == "__main__":
-    run_rf_mitigation()
\ No newline at end of file
+    run_rf_mitigation()
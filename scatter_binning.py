@@ -0,0 +1,141 @@
+import numpy as np
+import plotly.graph_objects as go
+
+# Acima deste número de pontos os gráficos de dispersão deixam de enviar
+# todos os contratos para o browser
+POINT_BUDGET = 5_000
+SCATTER_MODE = "sample"
+MODES = ("points", "sample", "tiles")
+
+TILE_BINS = 80          # mosaicos por eixo no modo "tiles"
+SPARSE_TILE = 3         # contratos por mosaico até os quais os pontos contam como atípicos
+SAMPLE_SEED = 0
+
+
+def _edges(values: np.ndarray, bins) -> np.ndarray:
+    if not np.isscalar(bins):
+        return np.asarray(bins, dtype=np.float64)
+    lo, hi = float(values.min()), float(values.max())
+    if lo == hi:
+        lo, hi = lo - 0.5, hi + 0.5
+    return np.linspace(lo, hi, bins + 1)
+
+
+def _tile_of(x: np.ndarray, y: np.ndarray, bins):
+    """Tile edges on each axis and the flat tile number of every point."""
+    bx, by = (bins, bins) if np.isscalar(bins) else bins
+    ex, ey = _edges(x, bx), _edges(y, by)
+    nx, ny = len(ex) - 1, len(ey) - 1
+    ix = np.clip(np.searchsorted(ex, x, side="right") - 1, 0, nx - 1)
+    iy = np.clip(np.searchsorted(ey, y, side="right") - 1, 0, ny - 1)
+    return ex, ey, ix * ny + iy
+
+
+def thin_points(x, y, budget: int = POINT_BUDGET, bins=TILE_BINS, seed: int = SAMPLE_SEED) -> np.ndarray:
+    """
+    Positions of at most `budget` points that keep the picture of the cloud.
+
+    Points in sparse tiles (at most `SPARSE_TILE` points on a `bins` grid)
+    are the outliers of the cloud and are kept first, sparsest tiles first,
+    up to half the budget; the rest of the budget is a uniform random sample
+    of the remaining points, so dense regions stay dense. The sample is
+    fixed by `seed`.
+
+    :return: sorted positions into `x`/`y` (all of them if they fit).
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n <= budget:
+        return np.arange(n)
+
+    _, _, tile = _tile_of(x, y, bins)
+    density = np.bincount(tile)[tile]
+    rng = np.random.default_rng(seed)
+
+    sparse = np.flatnonzero(density <= SPARSE_TILE)
+    if len(sparse) > budget // 2:
+        order = np.lexsort((rng.random(len(sparse)), density[sparse]))
+        sparse = sparse[order[:budget // 2]]
+    rest = np.setdiff1d(np.arange(n), sparse, assume_unique=True)
+    sample = rng.choice(rest, size=min(budget - len(sparse), len(rest)), replace=False)
+    return np.sort(np.concatenate([sparse, sample]))
+
+
+def density_tiles(x, y, bins=TILE_BINS, colorscale="Blues", **kwargs) -> go.Heatmap:
+    """
+    Heatmap of point counts on a `bins` grid; empty tiles are transparent.
+
+    `bins` is a number of tiles per axis, or a pair holding, for each axis,
+    a number of tiles or an array of edges (e.g. one tile per year). The
+    size of the trace depends on the grid only, never on the number of
+    points.
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    ex, ey, tile = _tile_of(x, y, bins)
+    counts = np.bincount(tile, minlength=(len(ex) - 1) * (len(ey) - 1)).reshape(len(ex) - 1, len(ey) - 1)
+    z = np.where(counts > 0, counts, np.nan).T.astype(np.float32)
+    return go.Heatmap(
+        x=(ex[:-1] + ex[1:]) / 2,
+        y=(ey[:-1] + ey[1:]) / 2,
+        z=z,
+        colorscale=colorscale,
+        showscale=False,
+        hovertemplate="%{z} contracts<extra></extra>",
+        **kwargs,
+    )
+
+
+def scatter_traces(x, y, mode: str = SCATTER_MODE, budget: int = POINT_BUDGET, bins=TILE_BINS,
+                   marker: dict = None, name: str = None, axes: dict = None, **kwargs) -> list:
+    """
+    Traces drawing the point cloud ``(x, y)`` within a point budget.
+
+    Up to `budget` points, or with ``mode="points"``, every point is drawn.
+    Above it, ``"sample"`` draws the `thin_points` selection and ``"tiles"``
+    draws `density_tiles` with the outliers of sparse tiles on top. Points
+    are always WebGL markers (`go.Scattergl`).
+
+    Parameters
+    ----------
+    x, y : array-like
+        Coordinates, without missing values.
+    mode : str
+        One of `MODES`.
+    budget : int
+        Largest number of markers sent to the browser.
+    bins : int or tuple
+        Tile grid (see `density_tiles`), for the outlier test and for
+        ``"tiles"``.
+    marker : dict
+        Marker style of the points.
+    name : str
+        Trace name of the points.
+    axes : dict, optional
+        ``xaxis``/``yaxis`` of a subplot, applied to every trace.
+    **kwargs
+        Extra `go.Scattergl` arguments.
+
+    Returns
+    -------
+    list
+        Traces to add to a figure.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown scatter mode: {mode}")
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    axes = axes or {}
+
+    traces = []
+    if len(x) <= budget or mode == "points":
+        keep = slice(None)
+    elif mode == "sample":
+        keep = thin_points(x, y, budget, bins)
+    else:
+        traces.append(density_tiles(x, y, bins, **axes))
+        _, _, tile = _tile_of(x, y, bins)
+        sparse = np.flatnonzero(np.bincount(tile)[tile] <= SPARSE_TILE)
+        keep = sparse[thin_points(x[sparse], y[sparse], budget, bins)]
+
+    traces.append(go.Scattergl(x=x[keep], y=y[keep], mode="markers", marker=marker or {},
+                               name=name, **axes, **kwargs))
+    return traces
@@ -1,6 +1,16 @@
 import streamlit as st
 import plotly.express as px
+import plotly.graph_objects as go
 import pandas as pd
+import numpy as np
+from olap_cube import CUBE_DIMENSIONS, query_cube
+from bitmap_index import build_bitmap_index, select, rows, column_keys, group_aggregate
+from sfa_estimator import DISTRIBUTIONS, load_sfa_fit
+from sfa_bootstrap import METHODS, DEFAULT_SFA_REPLICATES, resample_sfa
+from bootstrap import DEFAULT_SEED
+from data_store import dataset_version
+from histogram_service import histogram_traces
+from dea import MODELS as DEA_MODELS, UNITS as DEA_UNITS, DEFAULT_INPUTS, DEFAULT_OUTPUTS, load_dea_scores
 
 pretty_variable_names = {
     'act_type': "Type of Act",
@@ -23,39 +33,54 @@ binary_mappings = {
 def format_group_val(val, col):
     if col in binary_mappings:
         return binary_mappings[col].get(val, str(val))
-    if isinstance(val, (int, float)):
+    if isinstance(val, (int, float, np.integer, np.floating)):
         if val == int(val):
             return str(int(val))
         else:
             return f"{val:.2f}"
     return str(val)
 
-def show_efficiency_dashboard(df):
+def show_efficiency_dashboard(df, cube=None, bitmaps=None, csv_path=None):
+    """
+    SFA efficiency tab.
 
+    :param df: Contract table with the `efficiency` column.
+    :param cube: Optional `olap_cube.build_cube` output for `df`; when given,
+        group averages over cube dimensions are read from it instead of `df`.
+    :param bitmaps: Optional `bitmap_index.build_bitmap_index` output for `df`
+        (built on the fly when omitted); filters are bitmap operations on it.
+    :param csv_path: Source of `df`; when given, DEA scores for it are
+        compared with the SFA scores.
+    """
+    if bitmaps is None:
+        bitmaps = build_bitmap_index(df)
 
     # Filtros
     left_col, right_col = st.columns([1, 3])
     with left_col:
         st.markdown("#### Filters")
-        loc_options = df['loc'].dropna().unique().tolist()
+        loc_options = bitmaps['columns']['loc']['values']
         selected_locs = st.multiselect("Select Location(s)", options=loc_options, default=loc_options)
-        min_year, max_year = int(df['contract_year'].min()), int(df['contract_year'].max())
+        years = bitmaps['columns']['contract_year']['values']
+        min_year, max_year = int(min(years)), int(max(years))
         selected_years = st.slider("Select Contract Year Range", min_value=min_year, max_value=max_year,
                                    value=(min_year, max_year), step=1)
 
-    df_filtered = df[df['loc'].isin(selected_locs) & df['contract_year'].between(*selected_years)]
+    filters = {'loc': selected_locs, 'contract_year': tuple(selected_years)}
+    selection = select(bitmaps, filters)
+    selected_rows = rows(bitmaps, selection)
+    efficiency = df['efficiency'].to_numpy(dtype=np.float64, na_value=np.nan)
 
     with right_col:
         st.markdown("#### Efficiency Distribution")
-        fig_dist = px.histogram(
-            df_filtered,
-            x='efficiency',
+        # Contagens calculadas aqui: só as barras seguem para o browser
+        fig_dist = go.Figure(histogram_traces(
+            efficiency[selected_rows],
             nbins=20,
-            title="Distribution of Efficiency Scores",
-            labels={'efficiency': 'Efficiency Score'},
-            color_discrete_sequence=['#0B2C54']
-        )
-       
+            colors={None: '#0B2C54'}
+        ))
+        fig_dist.update_layout(title="Distribution of Efficiency Scores", xaxis_title='Efficiency Score',
+                               yaxis_title='count', bargap=0)
         fig_dist.update_layout(plot_bgcolor='white', paper_bgcolor='white', font=dict(color='black'))
         st.plotly_chart(fig_dist, use_container_width=True)
 
@@ -66,23 +91,30 @@ def show_efficiency_dashboard(df):
     group_col = st.selectbox("Group By Variable", dropdown_vars, format_func=lambda x: pretty_variable_names.get(x, x))
 
     # Eficiência média por grupo
-    mean_eff = (
-        df_filtered.groupby(group_col)['efficiency']
-        .mean()
-        .reset_index()
-        .sort_values(by='efficiency', ascending=False)
-    )
-
-    # Discretizar base_price se selecionado
     if group_col == "base_price":
         bins = [0, 10000, 50000, 100000, 500000, 1_000_000, 5_000_000, 10_000_000, df['base_price'].max()]
         labels = ['<10K', '10K–50K', '50K–100K', '100K–500K', '500K–1M', '1M–5M', '5M–10M', '>10M']
-        df_filtered['base_price_bin'] = pd.cut(df_filtered['base_price'], bins=bins, labels=labels)
+        bin_codes = pd.cut(df['base_price'], bins=bins, labels=labels).cat.codes.to_numpy()
         group_col = 'base_price_bin'
         mean_eff = (
-            df_filtered.groupby(group_col)['efficiency']
-            .mean()
-            .reset_index()
+            group_aggregate(bitmaps, selection, {group_col: (bin_codes, labels)}, values=efficiency)
+            [[group_col, 'mean']]
+            .rename(columns={'mean': 'efficiency'})
+            .sort_values(by='efficiency', ascending=False)
+        )
+    elif cube is not None and group_col in CUBE_DIMENSIONS:
+        # Lido do cubo pré-agregado: custo proporcional ao nº de células
+        mean_eff = (
+            query_cube(cube, [group_col], filters, measures=['efficiency'])
+            [[group_col, 'efficiency_mean']]
+            .rename(columns={'efficiency_mean': 'efficiency'})
+            .sort_values(by='efficiency', ascending=False)
+        )
+    else:
+        mean_eff = (
+            group_aggregate(bitmaps, selection, {group_col: column_keys(bitmaps, group_col)}, values=efficiency)
+            [[group_col, 'mean']]
+            .rename(columns={'mean': 'efficiency'})
             .sort_values(by='efficiency', ascending=False)
         )
 
@@ -115,4 +147,117 @@ def show_efficiency_dashboard(df):
          ** Efficiency Alert**  
         The lowest average efficiency was observed in **{min_val}**, with a score of **{min_row['efficiency']:.2f}**.  
         In contrast, the highest was **{max_row['efficiency']:.2f}** in **{max_val}**.
-        """)
\ No newline at end of file
+        """)
+
+    if csv_path is not None:
+        show_dea_comparison(df, csv_path, selected_rows)
+
+
+def show_dea_comparison(df, csv_path, selected_rows):
+    """DEA score against the SFA `efficiency`, per contract (filtered rows) or per buyer."""
+    st.markdown("#### DEA vs SFA Efficiency")
+    col_model, col_unit = st.columns(2)
+    model = col_model.radio("DEA Model", DEA_MODELS, horizontal=True,
+                            help="CCR: constant returns to scale; BCC: variable returns to scale.")
+    unit_label = col_unit.selectbox("Decision Unit", list(DEA_UNITS))
+    by = DEA_UNITS[unit_label]
+
+    scores = load_dea_scores(csv_path, model, by)
+    if by is None:
+        positions = np.intersect1d(selected_rows, np.flatnonzero(df.index.isin(scores.index)))
+        compare = scores.loc[df.index[positions]].assign(efficiency=df['efficiency'].to_numpy()[positions])
+    else:
+        sfa_mean = df.groupby(by, observed=True)['efficiency'].mean()
+        compare = scores.join(sfa_mean)
+    compare = compare.dropna(subset=['efficiency', 'dea_score'])
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Units", f"{len(compare):,}")
+    c2.metric("DEA-Efficient Units", f"{int(compare['efficient'].sum()):,}")
+    rank_corr = compare['dea_score'].corr(compare['efficiency'], method='spearman') if len(compare) > 1 else np.nan
+    c3.metric("Rank Correlation with SFA", f"{rank_corr:.3f}")
+
+    fig = px.scatter(
+        compare.reset_index(),
+        x='efficiency', y='dea_score',
+        color='efficient',
+        hover_data=[compare.index.name or 'index', 'peers'],
+        color_discrete_map={True: '#d62728', False: '#0B2C54'},
+        labels={'efficiency': 'SFA Efficiency', 'dea_score': f'DEA Score ({model})', 'efficient': 'DEA-Efficient'},
+        opacity=0.6
+    )
+    fig.update_layout(plot_bgcolor='white', paper_bgcolor='white', font=dict(color='black'))
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(
+        f"Input-oriented DEA with inputs {', '.join(DEFAULT_INPUTS)} and outputs {', '.join(DEFAULT_OUTPUTS)}"
+        + ("" if by is None else f", summed per {by}; SFA efficiency is the mean over the buyer's contracts") + "."
+    )
+
+
+def show_frontier_estimation(csv_path, df):
+    """
+    Expander with the in-project frontier estimate for `csv_path`, compared
+    with the precomputed `efficiency` column of `df`, and on-demand
+    bootstrap / jackknife intervals for its coefficients.
+    """
+    with st.expander("Frontier Estimation"):
+        distribution = st.radio("Inefficiency Distribution", DISTRIBUTIONS, index=1, horizontal=True)
+        fit = load_sfa_fit(csv_path, distribution)
+
+        scores = fit['scores']
+        stored = df['efficiency'].to_numpy(dtype=np.float64, na_value=np.nan)[fit['rows']]
+        valid = ~np.isnan(stored)
+        corr = np.corrcoef(scores['bc'].to_numpy()[valid], stored[valid])[0, 1] if valid.sum() > 1 else np.nan
+
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Log-likelihood", f"{fit['loglik']:,.1f}")
+        c2.metric("Contracts", f"{fit['n']:,}")
+        c3.metric("Mean Efficiency (BC)", f"{scores['bc'].mean():.3f}")
+        c4.metric("Correlation with Stored Scores", f"{corr:.3f}")
+
+        if not fit['converged']:
+            st.warning(f"The optimizer stopped after {fit['iterations']} iterations without converging.")
+
+        st.dataframe(
+            fit['params'].assign(variable=fit['params']['variable'].map(lambda v: pretty_variable_names.get(v, v))),
+            use_container_width=True, hide_index=True
+        )
+        st.caption(
+            "Dependent variable: log effective price. `mu` holds the determinants of the mean "
+            "inefficiency (truncated-normal) and `ln_sigma_u2` those of its variance (half-normal); "
+            "positive coefficients mean lower efficiency."
+        )
+
+        # Intervalos por reamostragem (guardados na sessão, como no bootstrap das poupanças)
+        st.markdown("##### Resampling Intervals")
+        col_method, col_reps, col_seed = st.columns(3)
+        method = col_method.selectbox("Method", METHODS)
+        n_replicates = col_reps.number_input("Replicates", min_value=20, max_value=2000,
+                                             value=DEFAULT_SFA_REPLICATES, step=20,
+                                             disabled=method == "jackknife")
+        seed = col_seed.number_input("Seed", min_value=0, value=DEFAULT_SEED, step=1, key="sfa_seed")
+
+        cache = st.session_state.setdefault("sfa_resampling_cache", {})
+        cache_key = (str(csv_path), dataset_version(csv_path), distribution, method, int(n_replicates), int(seed))
+        if cache_key not in cache and st.button("Compute Intervals"):
+            progress = st.progress(0.0, text="Refitting the frontier…")
+            cache[cache_key] = resample_sfa(
+                df, fit, method=method, n_replicates=int(n_replicates), seed=int(seed),
+                progress=lambda done, total: progress.progress(done / total, text=f"Refitting the frontier… {done}/{total}")
+            )
+            progress.empty()
+
+        if cache_key in cache:
+            result = cache[cache_key]
+            table = result['params'][['block', 'variable', 'coef', 'se', 'rep_se', 'low', 'high']]
+            st.dataframe(
+                table.assign(variable=table['variable'].map(lambda v: pretty_variable_names.get(v, v))),
+                use_container_width=True, hide_index=True
+            )
+            width = (result['scores']['high'] - result['scores']['low']).mean()
+            st.caption(
+                f"{result['level']:.0%} {result['method']} intervals; `se` is asymptotic, `rep_se` from "
+                f"{len(result['replicates'])} replicate fits ({result['failed']} discarded). "
+                f"Mean width of the efficiency-score intervals: {width:.3f}."
+            )
+
@@ -0,0 +1,484 @@
+import math
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from scipy.optimize import minimize
+from scipy.special import log_ndtr, ndtr
+
+from data_store import CONTRACTS_CSV, dataset_version, load_dataset
+
+try:                                   # numba is optional: NumPy likelihood otherwise
+    import numba
+except ImportError:
+    numba = None
+
+# Especificação por omissão: a mesma forma do modelo externo que gerou a
+# coluna `efficiency` (fronteira com u a reduzir y, determinantes em μ)
+DEPENDENT = "ln_effective_total_price"
+FRONTIER = ["ln_base_price", "contract_year_centered", "contract_year_sq"]
+DETERMINANTS = ["bidders", "covid_pandemic", "environmental", "execution_dummy"]
+DISTRIBUTIONS = ("half-normal", "truncated-normal")
+
+# Acima de PILOT_ROWS a estimação arranca de um ajuste numa amostra; o
+# Hessiano dos erros-padrão usa no máximo HESSIAN_ROWS linhas
+PILOT_ROWS = 50_000
+HESSIAN_ROWS = 200_000
+
+_LN_SQRT_2PI = 0.5 * np.log(2 * np.pi)
+
+
+def design_matrix(df: pd.DataFrame, columns: list) -> tuple:
+    """
+    Float64 matrix with a leading constant and one column per entry of
+    `columns`; categorical columns are expanded to dummies (first level
+    dropped).
+
+    :return: ``(matrix, names)``.
+    """
+    parts, names = [np.ones(len(df))], ["const"]
+    for col in columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype) or df[col].dtype == object:
+            dummies = pd.get_dummies(df[col], prefix=col, drop_first=True, dtype=np.float64)
+            parts.extend(dummies.to_numpy().T)
+            names.extend(dummies.columns)
+        else:
+            parts.append(df[col].to_numpy(dtype=np.float64))
+            names.append(col)
+    return np.column_stack(parts), names
+
+
+def _mills(x):
+    # φ(x)/Φ(x) sem underflow para x muito negativo
+    return np.exp(-0.5 * x * x - _LN_SQRT_2PI - log_ndtr(x))
+
+
+def _components(theta, y, X, Z, s, truncated):
+    """Per-observation pieces shared by the likelihood, gradient and scores."""
+    k, m = X.shape[1], Z.shape[1]
+    beta = theta[:k]
+    if truncated:
+        # μ_i = Z δ, ln σu² constante
+        mu = Z @ theta[k:k + m]
+        su2 = np.full(len(y), np.exp(theta[k + m]))
+    else:
+        # μ = 0, ln σu²_i = Z γ (heterocedasticidade na ineficiência)
+        mu = np.zeros(len(y))
+        su2 = np.exp(Z @ theta[k:k + m])
+    sv2 = np.exp(theta[-1])
+
+    eps = y - X @ beta
+    s2 = su2 + sv2
+    sig = np.sqrt(s2)
+    su, sv = np.sqrt(su2), np.sqrt(sv2)
+    a = (eps + s * mu) / sig
+    D = sig * su * sv
+    b = (sv2 * mu - s * su2 * eps) / D          # μ*/σ*
+    c = mu / su
+    return dict(eps=eps, mu=mu, su2=su2, sv2=sv2, s2=s2, sig=sig, su=su, sv=sv, a=a, b=b, c=c, D=D)
+
+
+def _loglik_obs(p, truncated):
+    ll = -_LN_SQRT_2PI - 0.5 * np.log(p["s2"]) - 0.5 * p["a"] ** 2 + log_ndtr(p["b"])
+    if truncated:
+        ll -= log_ndtr(p["c"])
+    else:
+        ll += np.log(2.0)
+    return ll
+
+
+def _neg_loglik_and_grad_numpy(theta, y, X, Z, s, truncated):
+    p = _components(theta, y, X, Z, s, truncated)
+    ll = _loglik_obs(p, truncated)
+
+    a, b, c, eps, mu = p["a"], p["b"], p["c"], p["eps"], p["mu"]
+    su2, sv2, s2, sig, su, sv, D = p["su2"], p["sv2"], p["s2"], p["sig"], p["su"], p["sv"], p["D"]
+    mb = _mills(b)
+    mc = _mills(c) if truncated else 0.0
+
+    # Derivadas por observação em ordem a ε, μ, ln σu² e ln σv²
+    d_eps = -a / sig - mb * s * su / (sig * sv)
+    common = -0.5 / s2 + 0.5 * a * a / s2
+    d_rho = su2 * (common + mb * (-s * eps / D - 0.5 * b * (1 / s2 + 1 / su2)) + 0.5 * mc * c / su2)
+    d_tau = sv2 * (common + mb * (mu / D - 0.5 * b * (1 / s2 + 1 / sv2)))
+
+    if truncated:
+        d_mu = -a * s / sig + mb * sv / (sig * su) - mc / su
+        grad_u = [Z.T @ d_mu, [d_rho.sum()]]
+    else:
+        grad_u = [Z.T @ d_rho]
+    grad = np.concatenate([-(X.T @ d_eps), *grad_u, [d_tau.sum()]])
+    return -ll.sum(), -grad
+
+
+if numba is not None:
+    @numba.njit(cache=True, nogil=True)
+    def _log_ndtr(x):
+        # ln Φ(x); série assimptótica na cauda esquerda, onde erfc dá 0
+        if x > 0.0:
+            return np.log1p(-0.5 * math.erfc(x / np.sqrt(2.0)))
+        if x > -20.0:
+            return np.log(0.5 * math.erfc(-x / np.sqrt(2.0)))
+        x2 = 1.0 / (x * x)
+        return -0.5 * x * x - np.log(-x) - _LN_SQRT_2PI + np.log1p(-x2 + 3.0 * x2 * x2)
+
+    @numba.njit(cache=True, nogil=True)
+    def _neg_loglik_and_grad_numba(theta, y, X, Z, s, truncated):
+        # Mesmas fórmulas que a versão NumPy, numa só passagem por linha
+        n, k = X.shape
+        m = Z.shape[1]
+        grad = np.zeros(theta.shape[0])
+        ll = 0.0
+        sv2 = np.exp(theta[-1])
+        sv = np.sqrt(sv2)
+        ln2 = np.log(2.0)
+        for i in range(n):
+            xb = 0.0
+            for j in range(k):
+                xb += X[i, j] * theta[j]
+            zt = 0.0
+            for j in range(m):
+                zt += Z[i, j] * theta[k + j]
+            if truncated:
+                mu = zt
+                su2 = np.exp(theta[k + m])
+            else:
+                mu = 0.0
+                su2 = np.exp(zt)
+
+            eps = y[i] - xb
+            s2 = su2 + sv2
+            sig = np.sqrt(s2)
+            su = np.sqrt(su2)
+            a = (eps + s * mu) / sig
+            D = sig * su * sv
+            b = (sv2 * mu - s * su2 * eps) / D
+            lb = _log_ndtr(b)
+            mb = np.exp(-0.5 * b * b - _LN_SQRT_2PI - lb)
+
+            ll += -_LN_SQRT_2PI - 0.5 * np.log(s2) - 0.5 * a * a + lb
+            if truncated:
+                c = mu / su
+                lc = _log_ndtr(c)
+                mc = np.exp(-0.5 * c * c - _LN_SQRT_2PI - lc)
+                ll -= lc
+            else:
+                c = 0.0
+                mc = 0.0
+                ll += ln2
+
+            d_eps = -a / sig - mb * s * su / (sig * sv)
+            common = -0.5 / s2 + 0.5 * a * a / s2
+            d_rho = su2 * (common + mb * (-s * eps / D - 0.5 * b * (1 / s2 + 1 / su2)) + 0.5 * mc * c / su2)
+            d_tau = sv2 * (common + mb * (mu / D - 0.5 * b * (1 / s2 + 1 / sv2)))
+
+            for j in range(k):
+                grad[j] += X[i, j] * d_eps
+            if truncated:
+                d_mu = -a * s / sig + mb * sv / (sig * su) - mc / su
+                for j in range(m):
+                    grad[k + j] -= Z[i, j] * d_mu
+                grad[k + m] -= d_rho
+            else:
+                for j in range(m):
+                    grad[k + j] -= Z[i, j] * d_rho
+            grad[-1] -= d_tau
+        return -ll, grad
+else:
+    _neg_loglik_and_grad_numba = None
+
+
+def _objective(engine):
+    """Negative log-likelihood and gradient: ``"numba"``, ``"numpy"`` or ``"auto"``."""
+    if engine == "numba" or (engine == "auto" and _neg_loglik_and_grad_numba is not None):
+        if _neg_loglik_and_grad_numba is None:
+            raise ImportError("numba is not installed")
+        return _neg_loglik_and_grad_numba
+    return _neg_loglik_and_grad_numpy
+
+
+def _start_values(y, X, Z, s, truncated):
+    # OLS + momentos (assimetria dos resíduos) para σu e σv
+    beta, *_ = np.linalg.lstsq(X, y, rcond=None)
+    resid = y - X @ beta
+    m2, m3 = np.mean(resid ** 2), np.mean(resid ** 3)
+    # E[(ε-Eε)³] = -s·σu³·√(2/π)·(4/π - 1) para a half-normal
+    su3 = -s * m3 / (np.sqrt(2 / np.pi) * (4 / np.pi - 1))
+    su2 = max(su3, 1e-6) ** (2 / 3) if su3 > 0 else 0.1 * m2
+    sv2 = max(m2 - (1 - 2 / np.pi) * su2, 0.05 * m2)
+    beta[0] += s * np.sqrt(2 * su2 / np.pi)
+
+    m = Z.shape[1]
+    if truncated:
+        middle = np.concatenate([np.zeros(m), [np.log(su2)]])
+    else:
+        middle = np.zeros(m)
+        middle[0] = np.log(su2)
+    return np.concatenate([beta, middle, [np.log(sv2)]])
+
+
+def _parameter_names(x_names, z_names, truncated):
+    names = [("frontier", n) for n in x_names]
+    if truncated:
+        names += [("mu", n) for n in z_names] + [("ln_sigma_u2", "const")]
+    else:
+        names += [("ln_sigma_u2", n) for n in z_names]
+    return names + [("ln_sigma_v2", "const")]
+
+
+def _hessian(objective, theta, args, step=1e-5):
+    # Diferenças centrais do gradiente analítico (objetivo por observação)
+    n = len(args[0])
+    k = len(theta)
+    H = np.empty((k, k))
+    for j in range(k):
+        h = step * max(1.0, abs(theta[j]))
+        up, down = theta.copy(), theta.copy()
+        up[j] += h
+        down[j] -= h
+        H[:, j] = (objective(up, *args)[1] - objective(down, *args)[1]) / (2 * h * n)
+    return 0.5 * (H + H.T)
+
+
+def _inverse(H):
+    try:
+        return np.linalg.inv(H)
+    except np.linalg.LinAlgError:
+        return np.linalg.pinv(H)
+
+
+def _positive_definite(M):
+    # Valores próprios truncados: a matriz inicial do BFGS tem de ser PD
+    w, V = np.linalg.eigh(0.5 * (M + M.T))
+    w = np.maximum(np.abs(w), 1e-8 * np.abs(w).max())
+    M = (V * w) @ V.T
+    return 0.5 * (M + M.T)
+
+
+def _subset(args, rows):
+    y, X, Z, s, truncated = args
+    return y[rows], X[rows], Z[rows], s, truncated
+
+
+def _maximize(objective, theta0, args, maxiter, hess_inv0=None):
+    # Objetivo médio por linha: as tolerâncias não dependem de n
+    n = len(args[0])
+
+    def mean_objective(theta, *a):
+        f, g = objective(theta, *a)
+        return f / n, g / n
+
+    # Passos exploratórios da pesquisa em linha podem dar exp() infinito
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        if hess_inv0 is None:
+            return minimize(mean_objective, theta0, args=args, jac=True, method="L-BFGS-B",
+                            options={"maxiter": maxiter, "maxfun": 2 * maxiter})
+        return minimize(mean_objective, theta0, args=args, jac=True, method="BFGS",
+                        options={"maxiter": maxiter, "hess_inv0": hess_inv0})
+
+
+def efficiency_scores(p: dict, s: int) -> dict:
+    """
+    JLMS point estimate ``E[u|ε]`` with ``exp(-E[u|ε])`` and the
+    Battese–Coelli estimate ``E[exp(-u)|ε]``, from `_components` output.
+    """
+    sigma_star = np.sqrt(p["su2"] * p["sv2"] / p["s2"])
+    mu_star = p["b"] * sigma_star
+    u_hat = mu_star + sigma_star * _mills(p["b"])
+    bc = np.exp(-mu_star + 0.5 * sigma_star ** 2 + log_ndtr(p["b"] - sigma_star) - log_ndtr(p["b"]))
+    return {"u_hat": u_hat, "jlms": np.exp(-u_hat), "bc": bc}
+
+
+def model_arrays(df: pd.DataFrame, spec: dict) -> dict:
+    """
+    Arrays for the model `spec` (the ``spec`` entry of a fit) over the rows
+    of `df` without missing values.
+
+    :return: ``{"args", "x_names", "z_names", "keep"}``, where ``args`` is
+        ``(y, X, Z, s, truncated)`` on the original scale and ``keep`` the
+        boolean row mask.
+    """
+    cols = [spec["dependent"], *spec["frontier"], *spec["determinants"]]
+    keep = df[cols].notna().all(axis=1).to_numpy()
+    data = df.loc[keep, cols]
+    X, x_names = design_matrix(data, spec["frontier"])
+    Z, z_names = design_matrix(data, spec["determinants"])
+    s = -1.0 if spec["cost"] else 1.0
+    y = data[spec["dependent"]].to_numpy(dtype=np.float64)
+    return {"args": (y, X, Z, s, spec["distribution"] == "truncated-normal"),
+            "x_names": x_names, "z_names": z_names, "keep": keep}
+
+
+def evaluate(theta: np.ndarray, args: tuple) -> dict:
+    """
+    Per-row log-likelihood and efficiency scores at `theta`, plus the
+    gradient of the summed log-likelihood (``grad``), for `model_arrays`
+    arguments.
+    """
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        p = _components(theta, *args)
+        out = efficiency_scores(p, args[3])
+        out["loglik"] = _loglik_obs(p, args[4])
+        out["grad"] = -_neg_loglik_and_grad_numpy(theta, *args)[1]
+    return out
+
+
+def fit_arrays(args: tuple, start: np.ndarray = None, start_cov: np.ndarray = None,
+               maxiter: int = 500, engine: str = "auto", covariance: bool = True) -> dict:
+    """
+    Maximize the likelihood for `model_arrays` arguments (see `fit_sfa`).
+
+    :param covariance: Also compute the covariance matrix (skipped by
+        replicate fits that only need the estimate).
+    :return: ``{"theta", "cov", "loglik", "converged", "iterations"}``, on
+        the original scale of the columns.
+    """
+    y, X, Z, s, truncated = args
+
+    # Colunas reescaladas pelo desvio-padrão: o otimizador vê um problema
+    # bem condicionado e os coeficientes voltam à escala original no fim
+    x_scale = np.where(X.std(axis=0) > 0, X.std(axis=0), 1.0)
+    z_scale = np.where(Z.std(axis=0) > 0, Z.std(axis=0), 1.0)
+    scale = np.concatenate([x_scale, z_scale, np.ones(2 if truncated else 1)])
+    args = (y, X / x_scale, Z / z_scale, s, truncated)
+    objective = _objective(engine)
+    rng = np.random.default_rng(0)
+
+    if start is not None:
+        theta0 = np.asarray(start, dtype=np.float64) * scale
+        hess_inv0 = None if start_cov is None else _positive_definite(
+            np.asarray(start_cov) * np.outer(scale, scale) * len(y))
+    elif len(y) > PILOT_ROWS:
+        # Ajuste piloto numa amostra; o seu Hessiano orienta o BFGS em todas as linhas
+        pilot = _subset(args, rng.choice(len(y), PILOT_ROWS, replace=False))
+        theta0 = _maximize(objective, _start_values(*pilot), pilot, maxiter).x
+        hess_inv0 = _positive_definite(_inverse(_hessian(objective, theta0, pilot)))
+    else:
+        theta0, hess_inv0 = _start_values(*args), None
+    res = _maximize(objective, theta0, args, maxiter, hess_inv0)
+
+    cov = None
+    if covariance:
+        rows = rng.choice(len(y), HESSIAN_ROWS, replace=False) if len(y) > HESSIAN_ROWS else slice(None)
+        cov = _inverse(_hessian(objective, res.x, _subset(args, rows))) / len(y)
+        cov = cov / np.outer(scale, scale)
+    return {
+        "theta": res.x / scale,
+        "cov": cov,
+        "loglik": -float(res.fun) * len(y),
+        "converged": bool(res.success),
+        "iterations": int(res.nit),
+    }
+
+
+def fit_sfa(df: pd.DataFrame, dependent: str = DEPENDENT, frontier: list = FRONTIER,
+            determinants: list = DETERMINANTS, distribution: str = "truncated-normal",
+            cost: bool = False, start: np.ndarray = None, start_cov: np.ndarray = None,
+            maxiter: int = 500, engine: str = "auto") -> dict:
+    """
+    Maximum-likelihood stochastic frontier with inefficiency determinants.
+
+    The model is ``y = Xβ + v + u`` for a cost frontier (``y = Xβ + v - u``
+    for a production frontier), ``v ~ N(0, σv²)`` and ``u >= 0``:
+
+    * ``"half-normal"``: ``u ~ N⁺(0, σu²_i)`` with ``ln σu²_i = Zγ``;
+    * ``"truncated-normal"``: ``u ~ N⁺(Zδ, σu²)`` (Battese & Coelli, 1995).
+
+    The log-likelihood and its analytic gradient are evaluated together in
+    one pass over all rows (a fused numba loop, or vectorized NumPy) and
+    maximized on standardized columns: L-BFGS-B for small samples; above
+    `PILOT_ROWS` a pilot fit on a random sample seeds BFGS on all rows with
+    its Hessian, so the full data are only traversed a few times. Standard
+    errors come from the numerical Hessian of the analytic gradient, on at
+    most `HESSIAN_ROWS` random rows.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Contracts; rows with missing values in the model columns are dropped.
+    dependent : str
+        Dependent variable (log price).
+    frontier : list
+        Frontier regressors (a constant is added).
+    determinants : list
+        Inefficiency determinants (a constant is added).
+    distribution : str
+        One of `DISTRIBUTIONS`.
+    cost : bool
+        Cost frontier, or production frontier (default; the form behind the
+        precomputed ``efficiency`` column).
+    start : np.ndarray, optional
+        Starting parameter vector (e.g. a previous fit's ``theta``).
+    start_cov : np.ndarray, optional
+        Covariance of `start` (a previous fit's ``cov``); seeds BFGS with
+        the matching curvature so a warm start needs only a few passes.
+    maxiter : int
+        Iteration limit for the optimizer.
+    engine : str
+        ``"numba"``, ``"numpy"`` or ``"auto"`` (numba when installed).
+
+    Returns
+    -------
+    dict
+        ``params`` (block, variable, coef, se, z, p_value), ``theta``,
+        ``cov``, ``loglik``, ``n``, ``converged``, ``iterations``,
+        ``sigma_u`` / ``sigma_v`` (sample means), ``rows`` (used row
+        positions) and ``scores`` (frame with ``u_hat``, ``jlms`` and ``bc``
+        per used row).
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution: {distribution}")
+    spec = {"dependent": dependent, "frontier": list(frontier), "determinants": list(determinants),
+            "distribution": distribution, "cost": cost}
+    arrays = model_arrays(df, spec)
+    y, _, _, s, truncated = arrays["args"]
+    x_names, z_names, keep = arrays["x_names"], arrays["z_names"], arrays["keep"]
+
+    fit = fit_arrays(arrays["args"], start, start_cov, maxiter, engine)
+    theta, cov = fit["theta"], fit["cov"]
+    se = np.sqrt(np.clip(np.diag(cov), 0, None))
+
+    names = _parameter_names(x_names, z_names, truncated)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = theta / se
+    params = pd.DataFrame(names, columns=["block", "variable"])
+    params["coef"] = theta
+    params["se"] = se
+    params["z"] = z
+    params["p_value"] = 2 * ndtr(-np.abs(z))
+
+    p = _components(theta, *arrays["args"])
+    scores = pd.DataFrame(efficiency_scores(p, s), index=df.index[keep])
+    return {
+        "params": params,
+        "theta": theta,
+        "cov": cov,
+        "loglik": fit["loglik"],
+        "n": len(y),
+        "converged": fit["converged"],
+        "iterations": fit["iterations"],
+        "sigma_u": float(np.sqrt(p["su2"]).mean()),
+        "sigma_v": float(np.sqrt(p["sv2"])),
+        "rows": np.flatnonzero(keep),
+        "scores": scores,
+        "spec": spec,
+    }
+
+
+@st.cache_resource(show_spinner="Estimating the stochastic frontier…")
+def _load_sfa_fit(csv_path: str, version: float, distribution: str) -> dict:
+    return fit_sfa(load_dataset(csv_path), distribution=distribution)
+
+
+def load_sfa_fit(csv_path=CONTRACTS_CSV, distribution: str = "truncated-normal") -> dict:
+    """Default-specification fit for `csv_path`, estimated once per snapshot."""
+    return _load_sfa_fit(str(csv_path), dataset_version(csv_path), distribution)
+
+
+if __name__ == "__main__":
+    df = load_dataset(CONTRACTS_CSV)
+    for dist in DISTRIBUTIONS:
+        fit = fit_sfa(df, distribution=dist)
+        print(f"\n== {dist}: logL {fit['loglik']:.2f}, n {fit['n']}, converged {fit['converged']}")
+        print(fit["params"].to_string(index=False, float_format="%.4f"))
+        print("Mean efficiency (BC):", round(float(fit["scores"]["bc"].mean()), 4))
@@ -0,0 +1,216 @@
+import argparse
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_store import CONTRACTS_CSV, load_dataset
+from sfa_estimator import DEPENDENT, FRONTIER, DETERMINANTS, fit_sfa, model_arrays, evaluate
+
+SFA_DIR = Path("models/sfa")
+
+DEFAULT_SPEC = {
+    "dependent": DEPENDENT,
+    "frontier": FRONTIER,
+    "determinants": DETERMINANTS,
+    "distribution": "truncated-normal",
+    "cost": False,
+}
+
+# Limites das verificações que obrigam a re-estimar a fronteira
+MAX_DRIFT_SE = 1.0      # passo de Newton previsto, em erros-padrão
+MAX_LOGLIK_Z = 3.0      # queda da log-verosimilhança média das linhas novas
+
+SCORE_COLUMNS = ["u_hat", "jlms", "bc", "loglik"]
+
+
+def spec_key(spec: dict) -> str:
+    """Short hash of a model specification; one state folder per key."""
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def row_hashes(df: pd.DataFrame, spec: dict) -> np.ndarray:
+    """Content hash of the model columns of each row (uint64)."""
+    cols = [spec["dependent"], *spec["frontier"], *spec["determinants"]]
+    return pd.util.hash_pandas_object(df[cols], index=False).to_numpy()
+
+
+def _read_state(folder: Path):
+    if not (folder / "state.json").exists() or not (folder / "scores.parquet").exists():
+        return None, None
+    state = json.loads((folder / "state.json").read_text())
+    return state, pd.read_parquet(folder / "scores.parquet")
+
+
+def _write_state(folder: Path, state: dict, scores: pd.DataFrame):
+    folder.mkdir(parents=True, exist_ok=True)
+    # Escrita atómica: um refresh interrompido deixa o estado anterior intacto
+    tmp = folder / "scores.parquet.tmp"
+    scores.to_parquet(tmp, index=False)
+    tmp.replace(folder / "scores.parquet")
+    tmp = folder / "state.json.tmp"
+    tmp.write_text(json.dumps(state, indent=2))
+    tmp.replace(folder / "state.json")
+
+
+def _score_frame(hashes: np.ndarray, ev: dict) -> pd.DataFrame:
+    frame = pd.DataFrame({"row_hash": hashes, **{c: ev[c] for c in SCORE_COLUMNS}})
+    return frame.drop_duplicates("row_hash")
+
+
+def drift_check(state: dict, grad: np.ndarray) -> float:
+    """
+    Largest parameter move, in standard errors, of one Newton step from the
+    cached estimate given the log-likelihood gradient `grad` there.
+    """
+    cov = np.asarray(state["cov"])
+    step = cov @ grad
+    se = np.sqrt(np.clip(np.diag(cov), 1e-300, None))
+    return float(np.max(np.abs(step) / se))
+
+
+def loglik_check(cached: pd.DataFrame, new_loglik: np.ndarray) -> float:
+    """
+    z-statistic of the mean log-likelihood of the new rows under the cached
+    parameters against the rows already scored (negative = worse fit).
+    """
+    if len(new_loglik) == 0 or len(cached) < 2:
+        return 0.0
+    sd = cached["loglik"].std()
+    return float((new_loglik.mean() - cached["loglik"].mean()) / (sd / np.sqrt(len(new_loglik))))
+
+
+def refresh_sfa(df: pd.DataFrame, spec: dict = None, folder: Path = None,
+                force: bool = False) -> dict:
+    """
+    Bring the frontier estimate and efficiency scores of `df` up to date.
+
+    Scores are cached per row content (hash of the model columns), so only
+    new or changed rows are scored, with the cached parameters. Two checks
+    decide whether that is still valid:
+
+    * drift: the gradient at the cached estimate, accumulated over every
+      row added since the last fit, predicts a one-step parameter move of
+      more than `MAX_DRIFT_SE` standard errors;
+    * likelihood: the new rows fit worse than the scored ones by more than
+      `MAX_LOGLIK_Z` standard errors.
+
+    If either fails (or there is no state yet, or `force`), the frontier is
+    re-estimated on all rows, warm-started from the cached parameters and
+    covariance, and every row is rescored. Rows that left the table are
+    dropped from the cache; their past gradient contribution is not
+    subtracted from the drift accumulator.
+
+    Returns
+    -------
+    dict
+        ``mode`` (``"incremental"`` or ``"refit"``), ``reason``, ``new_rows``,
+        ``removed_rows``, ``drift``, ``loglik_z``, ``theta``, ``folder`` and
+        ``scores`` (``u_hat``, ``jlms``, ``bc``, ``loglik`` indexed like the
+        rows of `df` used by the model).
+    """
+    spec = {**DEFAULT_SPEC, **(spec or {})}
+    folder = Path(folder or SFA_DIR / spec_key(spec))
+    arrays = model_arrays(df, spec)
+    args, keep = arrays["args"], arrays["keep"]
+    hashes = row_hashes(df, spec)[keep]
+
+    state, cached = _read_state(folder)
+    reason, drift, loglik_z = None, 0.0, 0.0
+    new_rows = len(hashes)
+    removed_rows = 0
+
+    if force:
+        reason = "forced"
+    elif state is None:
+        reason = "no previous estimate"
+    elif state["x_names"] != arrays["x_names"] or state["z_names"] != arrays["z_names"]:
+        reason = "design columns changed"
+    else:
+        is_new = ~np.isin(hashes, cached["row_hash"].to_numpy())
+        still_present = cached["row_hash"].isin(hashes).to_numpy()
+        new_rows, removed_rows = int(is_new.sum()), int((~still_present).sum())
+        theta = np.asarray(state["theta"])
+
+        new_args = tuple(a[is_new] if isinstance(a, np.ndarray) else a for a in args)
+        ev = evaluate(theta, new_args)
+        grad = np.asarray(state["grad"]) + ev["grad"]
+        drift = drift_check(state, grad)
+        loglik_z = loglik_check(cached[still_present], ev["loglik"])
+
+        if drift > MAX_DRIFT_SE:
+            reason = f"parameter drift {drift:.2f} SE"
+        elif loglik_z < -MAX_LOGLIK_Z:
+            reason = f"log-likelihood z {loglik_z:.2f}"
+        else:
+            scores = pd.concat([cached[still_present], _score_frame(hashes[is_new], ev)], ignore_index=True)
+            state.update(grad=grad.tolist(), n=int(len(hashes)),
+                         refreshed_at=time.strftime("%Y-%m-%d %H:%M:%S"))
+            _write_state(folder, state, scores)
+            mode = "incremental"
+
+    if reason is not None:
+        previous = {} if state is None or reason == "design columns changed" else \
+            {"start": np.asarray(state["theta"]), "start_cov": np.asarray(state["cov"])}
+        fit = fit_sfa(df, **spec, **previous)
+        ev = evaluate(fit["theta"], args)
+        scores = _score_frame(hashes, ev)
+        state = {
+            "spec": spec,
+            "theta": fit["theta"].tolist(),
+            "cov": fit["cov"].tolist(),
+            "x_names": arrays["x_names"],
+            "z_names": arrays["z_names"],
+            "grad": ev["grad"].tolist(),
+            "loglik": fit["loglik"],
+            "n": int(len(hashes)),
+            "fitted_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "refreshed_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "refit_reason": reason,
+        }
+        _write_state(folder, state, scores)
+        mode = "refit"
+
+    # Pontuações alinhadas com as linhas de `df`
+    positions = pd.Index(scores["row_hash"]).get_indexer(hashes)
+    aligned = scores.iloc[positions][SCORE_COLUMNS].set_axis(df.index[keep])
+    return {
+        "mode": mode,
+        "reason": reason,
+        "new_rows": new_rows,
+        "removed_rows": removed_rows,
+        "drift": drift,
+        "loglik_z": loglik_z,
+        "theta": np.asarray(state["theta"]),
+        "folder": folder,
+        "scores": aligned,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the SFA efficiency scores incrementally.")
+    parser.add_argument("--data", default=CONTRACTS_CSV)
+    parser.add_argument("--force", action="store_true", help="Re-estimate the frontier even if the checks pass")
+    parser.add_argument("--output", help="Write the contract table with the refreshed `efficiency` column here")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    df = load_dataset(args.data)
+    result = refresh_sfa(df, force=args.force)
+
+    print(f"Mode:      {result['mode']}" + (f" ({result['reason']})" if result["reason"] else ""))
+    print(f"New rows:  {result['new_rows']}  removed: {result['removed_rows']}")
+    print(f"Drift:     {result['drift']:.3f} SE   log-likelihood z: {result['loglik_z']:.2f}")
+    print(f"State:     {result['folder']}  ({time.perf_counter() - started:.1f} s)")
+
+    if args.output:
+        df["efficiency"] = result["scores"]["bc"].reindex(df.index)
+        df.to_csv(args.output, index=False)
+        print(f"Efficiency written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import joblib
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_store import SCORED_CSV, CONTRACTS_CSV, dataset_version, load_dataset
+from model_registry import REGISTRY_DIR, load_model
+from forest_compiler import compile_pipeline, encode
+
+CHUNK_ROWS = 500
+SUMMARY_GROUPS = ["loc", "CPV_agrupado", "act_type", "contract_year"]
+
+_worker_explainer = None
+
+
+def shap_paths(key: str) -> dict:
+    """Per-contract attributions and group summary, stored with the model version."""
+    folder = REGISTRY_DIR / key
+    return {"values": folder / "shap_values.parquet", "summary": folder / "shap_summary.parquet"}
+
+
+def _init_worker(model_path):
+    # Cada processo carrega o modelo e cria o explainer uma única vez
+    global _worker_explainer
+    import shap
+    _worker_explainer = shap.TreeExplainer(joblib.load(model_path).named_steps["rf"])
+
+
+def _explain_chunk(X):
+    sv = _worker_explainer.shap_values(X, check_additivity=False)
+    sv = sv[1] if isinstance(sv, list) else sv
+    return sv[:, :, 1] if sv.ndim == 3 else sv
+
+
+def compute_shap_values(model_path, X: np.ndarray, chunk_rows: int = CHUNK_ROWS,
+                        n_jobs: int = None) -> tuple:
+    """
+    TreeSHAP attributions (class 1) for every row of the encoded matrix `X`.
+
+    Chunks of `chunk_rows` are explained on a process pool; each worker
+    unpickles the model once. With a single chunk or ``n_jobs=1`` it runs
+    in-process.
+
+    :return: ``(values, base_value)`` with ``values`` shaped like `X`.
+    """
+    chunks = [X[a:a + chunk_rows] for a in range(0, len(X), chunk_rows)]
+    n_jobs = min(n_jobs or os.cpu_count(), len(chunks))
+
+    if n_jobs <= 1:
+        _init_worker(model_path)
+        parts = [_explain_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, mp_context=get_context("spawn"),
+                                 initializer=_init_worker, initargs=(str(model_path),)) as pool:
+            parts = list(pool.map(_explain_chunk, chunks))
+
+    import shap
+    explainer = _worker_explainer or shap.TreeExplainer(joblib.load(model_path).named_steps["rf"])
+    base_value = float(np.atleast_1d(explainer.expected_value)[-1])
+    return np.concatenate(parts), base_value
+
+
+def summarize_shap(values: pd.DataFrame, df: pd.DataFrame, features: list,
+                   groups: list = SUMMARY_GROUPS) -> pd.DataFrame:
+    """
+    Mean SHAP and mean |SHAP| per feature, for the whole portfolio
+    (``group == "All"``) and for each value of every column in `groups`.
+    """
+    frames = []
+    sv = values[features]
+    overall = pd.DataFrame({
+        "group": "All", "group_value": "All", "feature": features,
+        "mean_shap": sv.mean().to_numpy(), "mean_abs_shap": sv.abs().mean().to_numpy(),
+        "contracts": len(sv),
+    })
+    frames.append(overall)
+
+    for col in groups:
+        keys = df[col].astype(str).to_numpy()
+        grouped = sv.groupby(keys)
+        mean = grouped.mean().stack()
+        mean_abs = sv.abs().groupby(keys).mean().stack()
+        table = pd.DataFrame({"mean_shap": mean, "mean_abs_shap": mean_abs}).reset_index()
+        table.columns = ["group_value", "feature", "mean_shap", "mean_abs_shap"]
+        table["contracts"] = table["group_value"].map(grouped.size())
+        table.insert(0, "group", col)
+        frames.append(table)
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_shap_store(entry: dict, csv_path=SCORED_CSV, n_jobs: int = None) -> dict:
+    """
+    Explain every contract of `csv_path` with the registry model in `entry`
+    and write the attributions (one row per ``contract_id``, i.e. the row
+    position in the CSV) and the group summary as Parquet.
+    """
+    df = load_dataset(csv_path)
+    compiled = compile_pipeline(entry["pipeline"])
+    values, base_value = compute_shap_values(entry["path"], encode(compiled, df), n_jobs=n_jobs)
+
+    shap_df = pd.DataFrame(values, columns=compiled["columns"])
+    shap_df.insert(0, "contract_id", np.arange(len(df), dtype=np.int64))
+    shap_df["base_value"] = base_value
+
+    paths = shap_paths(entry["key"])
+    paths["values"].parent.mkdir(parents=True, exist_ok=True)
+    shap_df.to_parquet(paths["values"], index=False)
+    summary = summarize_shap(shap_df, df, compiled["columns"])
+    summary.to_parquet(paths["summary"], index=False)
+    return {"values": shap_df, "summary": summary}
+
+
+@st.cache_resource(show_spinner="Computing SHAP attributions…")
+def _load_shap_store(key: str, csv_path: str, version: float) -> dict:
+    paths = shap_paths(key)
+    if paths["values"].exists() and paths["values"].stat().st_mtime >= version:
+        return {"values": pd.read_parquet(paths["values"]), "summary": pd.read_parquet(paths["summary"])}
+    return build_shap_store(load_model(), csv_path)
+
+
+def load_shap_store(csv_path=SCORED_CSV) -> dict:
+    """Per-contract SHAP values and group summary for the shared model, built once."""
+    return _load_shap_store(load_model()["key"], str(csv_path), dataset_version(csv_path))
+
+
+def explain_contract(store: dict, contract_id: int) -> pd.DataFrame:
+    """
+    Attribution of each feature for one contract, largest |SHAP| first.
+
+    Raises `KeyError` for an id outside the store and `ValueError` when the
+    store's rows are not in ``contract_id`` order (a store written for
+    another table).
+    """
+    values = store["values"]
+    if not 0 <= contract_id < len(values):
+        raise KeyError(f"No SHAP values for contract_id {contract_id}")
+    stored_id = int(values["contract_id"].iat[contract_id])
+    if stored_id != contract_id:
+        raise ValueError(f"SHAP store row {contract_id} holds contract_id {stored_id}")
+    row = values.iloc[contract_id]
+    features = [c for c in values.columns if c not in ("contract_id", "base_value")]
+    table = pd.DataFrame({"feature": features, "shap": row[features].to_numpy(dtype=np.float64)})
+    return table.reindex(table["shap"].abs().sort_values(ascending=False).index).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    entry = load_model(CONTRACTS_CSV)
+    store = build_shap_store(entry)
+    print("SHAP values saved to", shap_paths(entry["key"])["values"], store["values"].shape)
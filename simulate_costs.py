@@ -1,11 +1,17 @@
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 import streamlit as st
+from data_store import load_dataset, dataset_version, SCORED_CSV
+from histogram_service import histogram_traces
+from threshold_sweep import load_threshold_sweep, at_threshold, youden_threshold
+from model_registry import load_model
+from shap_pipeline import load_shap_store, explain_contract
+from forest_compiler import score_contracts
+from bootstrap import DEFAULT_REPLICATES, DEFAULT_SEED, rf_savings_statistic, streamlit_bootstrap, format_ci
 
 def show_rf_cost_mitigation_dashboard():
     st.set_page_config(layout="wide")
-    
-    threshold = 0.065  # Risk threshold from Youden J metric
 
     pretty_variable_names = {
         'act_type': "Type of Act",
@@ -19,74 +25,97 @@ def show_rf_cost_mitigation_dashboard():
         'bidders': "Number of Bidders"
     }
 
-    @st.cache_data
     def load_data():
-        return pd.read_csv("Data/dados.csv")
+        return load_dataset(SCORED_CSV)
 
-    @st.cache_data
     def load_shap_values():
+        # Atribuições por contrato do modelo partilhado (calculadas uma vez, em Parquet)
         try:
-            df_shap = pd.read_csv("Data/shap_values.csv")
-            required_cols = [
-                "variable", "contribution", "variable_name", "variable_value", "sign", "label"
-            ]
-            if not all(col in df_shap.columns for col in required_cols):
-                missing = [col for col in required_cols if col not in df_shap.columns]
-                st.error(f"Invalid shap_values.csv file. Missing columns: {missing}")
-                return None
-            return df_shap
-        except FileNotFoundError:
-            st.error("File shap_values.csv not found.")
-            return None
+            return load_shap_store(SCORED_CSV)
         except Exception as e:
-            st.error(f"Error loading shap_values.csv: {e}")
+            st.error(f"Error loading SHAP values: {e}")
             return None
 
     df = load_data()
-    df_shap = load_shap_values()
+    shap_store = load_shap_values()
 
-    expected_cols = ["effective_total_price", "risk_prob", "price_sim_rf", "custo_aumentou"]
+    expected_cols = ["effective_total_price", "custo_aumentou"]
     if not all(col in df.columns for col in expected_cols):
         st.error(f"File 'Data/dados.csv' must contain: {expected_cols}")
         return
 
-    # Simulated cost with substitution of high-risk contracts
-    sim_cost_high = df.loc[df["risk_prob"] >= threshold, "price_sim_rf"].sum()
-    sim_cost_safe = df.loc[df["risk_prob"] < threshold, "effective_total_price"].sum()
-    simulated_cost = sim_cost_high + sim_cost_safe
+    # Risco de cada contrato pelo modelo do registo (o mesmo que o SHAP explica)
+    model = load_model()
+    df = df.assign(risk_prob=score_contracts(SCORED_CSV))
+
+    # Sweep over every distinct risk threshold (computed once, stored with the model version)
+    sweep = load_threshold_sweep(SCORED_CSV)
+    youden = youden_threshold(sweep)
+    threshold = st.slider(
+        "Risk Threshold",
+        min_value=0.0, max_value=1.0, value=float(model["threshold"]), step=0.005, format="%.3f",
+        help=(f"Contracts with predicted risk at or above this value are flagged. Default: the model's "
+              f"held-out Youden J threshold; Youden J optimum on this table: {youden:.3f}")
+    )
+    sweep_row = at_threshold(sweep, threshold)
+
+    # Simulated cost with substitution of high-risk contracts by the mean safe price
     real_cost = df["effective_total_price"].sum()
-    savings = real_cost - simulated_cost
+    simulated_cost = real_cost - sweep_row["savings"]
+    savings = sweep_row["savings"]
 
     # KPIs
     pct_increase = (df["custo_aumentou"] == 1).mean() * 100
-    pct_risk = (df["risk_prob"] >= threshold).mean() * 100
+    pct_risk = sweep_row["flagged"] / len(df) * 100
 
     col1, col2, col3 = st.columns(3)
     col1.metric("Real Increases", f"{pct_increase:.2f}%")
     col2.metric("Contracts at Risk", f"{pct_risk:.2f}%")
     col3.metric("Estimated Savings", f"€ {savings:,.0f}".replace(",", " "))
 
+    # Bootstrap CI: mean_safe_price re-estimated in every replicate
+    with st.expander("Bootstrap Settings"):
+        col_reps, col_seed = st.columns(2)
+        n_replicates = col_reps.number_input("Replicates", min_value=100, max_value=20000, value=DEFAULT_REPLICATES, step=100)
+        seed = col_seed.number_input("Seed", min_value=0, value=DEFAULT_SEED, step=1)
+    statistic, n = rf_savings_statistic(df["risk_prob"], df["effective_total_price"], threshold)
+    ci = streamlit_bootstrap(("rf", model["key"], threshold, dataset_version(SCORED_CSV)), statistic, n, savings,
+                             n_replicates=int(n_replicates), seed=int(seed))
+    col3.caption(format_ci(ci))
+
+    with st.expander("Threshold Sweep"):
+        fig_sweep = px.line(
+            sweep.melt(id_vars="threshold", value_vars=["tpr", "fpr", "youden_j"]),
+            x="threshold", y="value", color="variable",
+            labels={"threshold": "Risk Threshold", "value": "Rate", "variable": ""},
+            color_discrete_map={"tpr": "#0B2C54", "fpr": "#bcbcbc", "youden_j": "#1f77b4"}
+        )
+        fig_sweep.add_vline(x=threshold, line_dash="dash", line_color="#d62728")
+        fig_sweep.update_layout(plot_bgcolor="white", paper_bgcolor="white", font=dict(color="black"))
+        st.plotly_chart(fig_sweep, use_container_width=True)
+        st.caption(
+            f"TPR {sweep_row['tpr']:.1%} · FPR {sweep_row['fpr']:.1%} · "
+            f"Youden J {sweep_row['youden_j']:.3f} (max at {youden:.3f})"
+        )
+
     st.markdown("---")
 
     # Distribution
     st.markdown("### Distribution of Cost Increase Risk")
-    df["Outcome Label"] = df["custo_aumentou"].map({0: "No Increase", 1: "Increase"})
-    fig = px.histogram(
-    df,
-    x="risk_prob",
-    color="Outcome Label",
-    nbins=40,
-    barmode="overlay",
-    histnorm="percent",
-    color_discrete_map={
-        "No Increase": "#bcbcbc",  # cinzento claro
-        "Increase": "#0B2C54"      # azul escuro
-    },
-    labels={
-        "risk_prob": "Cost Increase Probability",
-        "Outcome Label": "Observed Outcome"
-    }
-)
+    # Contagens por resultado calculadas aqui: só as barras seguem para o browser
+    outcome = df["custo_aumentou"].map({0: "No Increase", 1: "Increase"})
+    fig = go.Figure(histogram_traces(
+        df["risk_prob"],
+        groups=outcome,
+        nbins=40,
+        histnorm="percent",
+        opacity=0.5,
+        colors={
+            "No Increase": "#bcbcbc",  # cinzento claro
+            "Increase": "#0B2C54"      # azul escuro
+        }
+    ))
+    fig.update_layout(barmode="overlay", bargap=0, xaxis_title="Cost Increase Probability", yaxis_title="percent")
     fig.update_layout(
         plot_bgcolor="white",
         paper_bgcolor="white",
@@ -114,6 +143,34 @@ def show_rf_cost_mitigation_dashboard():
         df_top20["efficiency"] = (df_top20["efficiency"] * 100).round(2).astype(str) + "%"
         st.dataframe(df_top20, use_container_width=True)
 
+        # Explicação de um contrato do top 20 (lookup por contract_id = linha do CSV)
+        if shap_store is not None and len(df_top20):
+            contract_id = st.selectbox(
+                "Explain contract:",
+                options=list(df_top20.index),
+                format_func=lambda i: f"#{i} – {df.at[i, 'Location']} – {df.at[i, 'CPV_agrupado']} – risk {df.at[i, 'risk_prob']:.1%}"
+            )
+            contrib = explain_contract(shap_store, contract_id)
+            contrib["variable_name"] = contrib["feature"].map(lambda f: pretty_variable_names.get(f, f))
+            contrib["value"] = [str(df.at[contract_id, f]) for f in contrib["feature"]]
+            fig_contract = px.bar(
+                contrib.iloc[::-1],
+                x="shap", y="variable_name", orientation="h",
+                color=contrib.iloc[::-1]["shap"] > 0,
+                color_discrete_map={True: "#d62728", False: "#0B2C54"},
+                hover_data={"value": True},
+                labels={"shap": "SHAP contribution to risk", "variable_name": ""},
+                height=350
+            )
+            fig_contract.update_layout(
+                showlegend=False,
+                plot_bgcolor="white",
+                paper_bgcolor="white",
+                font=dict(color="black"),
+                margin=dict(l=30, r=10, t=10, b=10)
+            )
+            st.plotly_chart(fig_contract, use_container_width=True)
+
     st.markdown("---")
 
     # Average Risk by Group
@@ -125,7 +182,7 @@ def show_rf_cost_mitigation_dashboard():
     )
 
     if var in df.columns:
-        group_risk = df.groupby(var)["risk_prob"].mean().reset_index()
+        group_risk = df.groupby(var, observed=True)["risk_prob"].mean().reset_index()
         group_risk["risk_prob"] = group_risk["risk_prob"] * 100
         var_pretty = pretty_variable_names.get(var, var)
 
@@ -166,12 +223,14 @@ Low technical efficiency (< 40 %) aligns with risk > 60 %.
     st.markdown("---")
 
     # SHAP Variable Importance
-    if df_shap is not None:
+    if shap_store is not None:
         st.markdown("### SHAP: Variable Importance")
 
+        summary = shap_store["summary"]
         shap_mean = (
-            df_shap.groupby("variable_name")["contribution"].mean()
-            .abs().sort_values(ascending=False).reset_index()
+            summary.loc[summary["group"] == "All", ["feature", "mean_abs_shap"]]
+            .rename(columns={"feature": "variable_name", "mean_abs_shap": "contribution"})
+            .sort_values("contribution", ascending=False).reset_index(drop=True)
         )
 
         c1, c2 = st.columns([3, 2])
@@ -222,7 +281,9 @@ largest reduction in risk.
     with col1:
         df_cost = pd.DataFrame({
             "Cost Type": ["Real", "Simulated", "Savings"],
-            "Value (€)": [real_cost, simulated_cost, savings]
+            "Value (€)": [real_cost, simulated_cost, savings],
+            "CI High": [0, 0, ci["high"] - savings],
+            "CI Low": [0, 0, savings - ci["low"]]
         })
 
         fig_cost = px.bar(
@@ -230,6 +291,8 @@ largest reduction in risk.
             x="Cost Type",
             y="Value (€)",
             text="Value (€)",
+            error_y="CI High",
+            error_y_minus="CI Low",
             color="Cost Type",
             color_discrete_map={
                 "Real": "#0B2C54",
@@ -260,7 +323,7 @@ largest reduction in risk.
     with col2:
         st.markdown("#### Key Insights")
         st.markdown(f"""
-- **Estimated savings** of approximately **€{int(savings):,}** if high-risk contracts are replaced with cost-efficient alternatives.  
+- **Estimated savings** of approximately **€{int(savings):,}** if high-risk contracts are replaced with cost-efficient alternatives ({format_ci(ci)}).  
 - Only **{pct_risk:.2f}% of contracts** are flagged as high risk, but they **disproportionately drive up total cost**.  
 - **Predictive benchmarks** such as P50 from SFA can serve as filters to **automatically flag inefficient allocations**.  
 - This approach supports **data-driven cost containment** and **pre-award risk screening** in procurement.
@@ -1,10 +1,15 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from model_registry import load_model
 
-def show_random_forest_dashboard(file_path="Data/randomforest_results.csv", threshold_rf=0.065):
+def show_random_forest_dashboard(file_path="Data/randomforest_results.csv", threshold_rf=None):
     st.markdown("## 🌲 Random Forest - Risk Mitigation Scenario")
 
+    # Por omissão, o limiar guardado com o modelo do registo (Youden J no teste)
+    if threshold_rf is None:
+        threshold_rf = load_model()["threshold"]
+
     try:
         df = pd.read_csv(file_path)
         df.columns = df.columns.str.strip()  # remover espaços
@@ -4,7 +4,13 @@ import pandas as pd
 from plot_registy import plot_registry
 import plotly.express as px
 from bencharming import *
-from sfa import show_efficiency_dashboard
+from sfa import show_efficiency_dashboard, show_frontier_estimation
+from data_store import load_dataset, dataset_version
+from date_index import build_close_date_index, window_bounds, window_frame, window_kpis
+from olap_cube import load_cube
+from bitmap_index import load_bitmap_index
+from figure_cache import cached_figure
+from model_registry import load_model
 
 pretty_variable_names = {
         'act_type': "Type of Act",
@@ -19,10 +25,6 @@ pretty_variable_names = {
         'bidders': "Number of Bidders"
     }
 
-def run_benchmark_and_store(df, benchmark='p75'):
-    df_bench = apply_benchmark_gap(df, benchmark)
-    st.session_state['bench_df'] = df_bench
-
 def _to_ts(value):
     """Aceita datetime.date, pd.Timestamp ou str e devolve pd.Timestamp."""
     return pd.to_datetime(value)
@@ -57,15 +59,16 @@ def new_dashboard_tab():
     kpi_columns = st.columns([2, 2, 2, 2], gap="medium")
 
     file_path = "Data/dados_completos.csv"
-    df = pd.DataFrame(load_data(file_path))
-
-    # Datas
-    df['contract_date'] = pd.to_datetime(df['contract_date'], errors='coerce')
-    df['contract_close_date'] = pd.to_datetime(df['contract_close_date'], errors='coerce')
+    # Tabela ordenada pela data de FECHO, partilhada entre sessões
+    index = build_close_date_index(file_path)
+    df = index['frame']
+    if not len(index['dates']):
+        st.info("No contract has a close date yet, so there is no period to filter.")
+        return
 
     # Inicializa session_state com base no FECHO do contrato
-    oldest_date = df['contract_close_date'].min()
-    newest_date = df['contract_close_date'].max()
+    oldest_date = pd.Timestamp(index['dates'][0])
+    newest_date = pd.Timestamp(index['dates'][-1])
     
     if 'initial_date' not in st.session_state:
         st.session_state['initial_date'] = oldest_date
@@ -97,19 +100,12 @@ def new_dashboard_tab():
     initial = pd.to_datetime(st.session_state['initial_date_input'])
     final = pd.to_datetime(st.session_state['final_date_input'])
 
-    # ✅ Filtro do DataFrame com base no FECHO do contrato
-    filtered_df = df[
-        (df['contract_close_date'] >= initial) &
-        (df['contract_close_date'] <= final)
-    ]
+    # ✅ Filtro com base no FECHO do contrato: pesquisa binária na tabela ordenada
+    lo, hi = window_bounds(index, initial, final)
+    filtered_df = window_frame(index, lo, hi)
+    kpis = window_kpis(index, lo, hi)
+    window_key = (dataset_version(file_path), lo, hi)
 
-    # Duração do contrato
-    df['Contract_Duration_Days'] = (df['contract_close_date'] - df['contract_date']).dt.days
-    df['Contract_Duration_Days'] = df['Contract_Duration_Days'].astype('Int64')
-
-    # Formato string para exibição
-    df['contract_close_date_str'] = df['contract_close_date'].dt.strftime('%d-%m-%Y')
-    df['contract_date_str'] = df['contract_date'].dt.strftime('%d-%m-%Y')
     with date_columns[2]:
         # Filter available variables
         available_pretty_vars = {
@@ -125,14 +121,17 @@ def new_dashboard_tab():
        
     
     with kpi_columns[0]:
-        total_contracts = len(filtered_df)
+        total_contracts = kpis['count']
         st.metric("# Closed Contracts", f"{total_contracts}")
 
+    def pct(value):
+        return "–" if pd.isna(value) else f"{value * 100:.1f}%"
+
     with kpi_columns[1]:
-        st.metric("Average Efficiency", "20.9%")
+        st.metric("Average Efficiency", pct(kpis['avg_efficiency']))
 
     with kpi_columns[2]:
-        st.metric("Achieved Contracts", "58.2%")
+        st.metric("Achieved Contracts", pct(kpis['execution_rate']))
         var = selected_variables  # apenas uma variável selecionada no st.selectbox
 
     st.markdown("---") 
@@ -152,196 +151,21 @@ def new_dashboard_tab():
             col1, col2 = st.columns([2, 1])
 
             with col1:
-               
-                plot_info['func'](filtered_df)  # <- aqui é o ponto importante
+                # Figura reutilizada enquanto a variável, os dados e a janela de datas não mudarem
+                fig = cached_figure(plot_info['build'].__name__, window_key,
+                                    plot_info['build'], filtered_df)
+                if fig is None:
+                    plot_info['func'](filtered_df)  # sem figura: o próprio gráfico mostra o aviso
+                else:
+                    st.plotly_chart(fig, use_container_width=plot_info.get('use_container_width', True),
+                                    key=f"plot_{selected_variables}_{i}")
+                    if 'footer' in plot_info:
+                        plot_info['footer'](filtered_df)
 
             with col2:
                 st.markdown("**Insight**")
                 st.markdown(plot_info['insight'])
 
-def show_benchmark_metrics():
-    # Explicação
-    st.markdown("""
-<small>
-**How to Interpret These Indicators:**  
-• <b>Average Overspending</b>: the average percentage by which contracts exceed the expected cost based on the selected benchmark.  
-• <b>Contracts Above Benchmark</b>: number of contracts performing below the benchmark (higher than expected costs).  
-• <b>Contracts Below Benchmark</b>: number of contracts performing above the benchmark (more efficient than expected).
-</small>
-""", unsafe_allow_html=True)
-
-    # Selecionar cenário
-    col_select, _, _, _ = st.columns(4)
-    with col_select:
-        benchmark_label = st.selectbox(
-            "Select Benchmark Scenario:",
-            options=["p50", "p75", "p90"],
-            format_func=lambda x: x.upper()
-        )
-
-    # Verifica se benchmark já foi calculado
-    file_path = "Data/dados_completos.csv"
-    raw_df = pd.DataFrame(load_data(file_path))
-
-    if (
-        'bench_df' not in st.session_state or
-        st.session_state.get('current_benchmark') != benchmark_label
-    ):
-        run_benchmark_and_store(raw_df, benchmark=benchmark_label)
-        st.session_state['current_benchmark'] = benchmark_label
-
-    # Carrega df já com gap, simulação, etc.
-    df = st.session_state['bench_df']
-
-    # KPIs
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric("Average Overspending (%)", f"{df['gap_pct'].mean():.1f}%")
-    with col2:
-        st.metric("Contracts Above Benchmark", int((df['gap_sign'] > 0).sum()))
-    with col3:
-        st.metric("Contracts Below Benchmark", int((df['gap_sign'] < 0).sum()))
-
-    st.write("Explore potential savings by simulating efficiency improvements across contracts.")
-
-    # Simulação de custos
-    if 'efficiency' not in df.columns or 'effective_total_price' not in df.columns:
-        st.warning("Missing required columns: 'efficiency' and 'effective_total_price'.")
-        return
-
-    quantile_map = {"p50": 0.5, "p75": 0.75, "p90": 0.9}
-    benchmark_value = df['efficiency'].quantile(quantile_map[benchmark_label])
-
-    df["price_sim"] = df.apply(
-        lambda row: row['effective_total_price'] * (row['efficiency'] / benchmark_value)
-        if row['efficiency'] < benchmark_value else row['effective_total_price'],
-        axis=1
-    )
-
-    real_cost = df['effective_total_price'].sum()
-    sim_cost = df['price_sim'].sum()
-    savings = real_cost - sim_cost
-
-    st.markdown("#### 💰 Summary & Estimated Savings")
-    col_left, col_right = st.columns(2)
-
-    with col_left:
-        summary = pd.DataFrame({
-            "Metric": [
-                "Scenario",
-                "Real Cost (€)",
-                "Simulated Cost (€)",
-                "Estimated Savings (€)"
-            ],
-            "Value": [
-                benchmark_label.upper(),
-                f"€ {real_cost:,.0f}".replace(",", " "),
-                f"€ {sim_cost:,.0f}".replace(",", " "),
-                f"€ {savings:,.0f}".replace(",", " ")
-            ]
-        })
-        st.dataframe(summary, use_container_width=True, hide_index=True)
-
-    with col_right:
-        waterfall = go.Figure(go.Waterfall(
-            orientation="v",
-            measure=["absolute", "relative", "total"],
-            x=["Real Cost", "Savings", "Simulated Cost"],
-            y=[real_cost, -savings, sim_cost],
-            connector={"line": {"color": "#AAB2BD"}},
-            decreasing={"marker": {"color": "#2C3E50"}},
-            increasing={"marker": {"color": "#E74C3C"}},
-            totals={"marker": {"color": "#2980B9"}}
-        ))
-        waterfall.update_layout(
-            title=f"Estimated Savings Applying {benchmark_label.upper()} Benchmark",
-            yaxis_title="€",
-            plot_bgcolor='white',
-            paper_bgcolor='white',
-            font=dict(color='black')
-        )
-        st.plotly_chart(waterfall, use_container_width=True)
-
-    # ---------------------------
-    # Gráfico com filtros laterais
-    # ---------------------------
-    st.markdown("Contracts Above / Below Benchmark by Variable")
-    left_col, right_col = st.columns([1, 3])
-
-    with left_col:
-        st.markdown("Filters")
-
-        # Filtro de localização
-        loc_options = df['loc'].dropna().unique().tolist()
-        selected_locs = st.multiselect("Select Location(s)", options=loc_options, default=loc_options)
-
-        # Filtro de ano de contrato
-        min_year, max_year = int(df['contract_year'].min()), int(df['contract_year'].max())
-        selected_years = st.slider(
-            "Select Contract Year Range",
-            min_value=min_year,
-            max_value=max_year,
-            value=(min_year, max_year),
-            step=1
-        )
-
-    # Aplica os filtros
-    df_filtered = df[df['loc'].isin(selected_locs) & df['contract_year'].between(*selected_years)].copy()
-    df_filtered['bench_status'] = np.where(df_filtered['gap'] > 0, "Above", "Below")
-
-    with right_col:
-        st.markdown("Contracts Above / Below Benchmark by Variable")
-
-        pretty_variable_names = {
-            'act_type': "Type of Act",
-            'base_price': "Base Price",
-            'execution_dummy': "Execution Rate",
-            'environmental': "Environmental Criteria",
-            'contract_year': "Contract Year",
-            'covid_pandemic': "Pandemic Period ",
-            'loc': "Location NUTSII",
-            'CPV_agrupado': "CPV Group",
-            'bidders': "Number of Bidders"
-        }
-
-        selected_var = st.selectbox(
-            "Choose a variable:",
-            options=list(pretty_variable_names.keys()),
-            format_func=lambda x: pretty_variable_names[x]
-        )
-
-        if selected_var == "base_price":
-            bin_edges = [0, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6, float('inf')]
-            bin_labels = ["<10K", "10K–50K", "50K–100K", "100K–500K", "500K–1M", "1M–5M", "5M+"]
-            df_filtered['price_bin'] = pd.cut(df_filtered['base_price'], bins=bin_edges, labels=bin_labels, include_lowest=True)
-            group_col = 'price_bin'
-            x_label = "Base Price Range"
-        else:
-            group_col = selected_var
-            x_label = pretty_variable_names[selected_var]
-
-        if selected_var == "execution_dummy":
-            df_filtered[selected_var] = df_filtered[selected_var].replace({0: "Not Met", 1: "Met"})
-
-        # Agrupar e contar
-        gap_counts = (
-            df_filtered.groupby([group_col, 'bench_status'])
-            .size()
-            .reset_index(name='contracts')
-        )
-
-        # Plot
-        gap_bar = px.bar(
-            gap_counts,
-            x=group_col, y='contracts',
-            color='bench_status',
-            barmode='group',
-            color_discrete_map={"Above": "#E74C3C", "Below": "#3498DB"},
-            labels={'contracts': 'Number of Contracts', group_col: x_label}
-        )
-        gap_bar.update_layout(plot_bgcolor="white", paper_bgcolor="white", font=dict(color="black"))
-        st.plotly_chart(gap_bar, use_container_width=True)
-
 def load_and_display_sfa():
   
 
@@ -349,7 +173,7 @@ def load_and_display_sfa():
     file_path = "Data/dados_completos.csv"
 
     try:
-        df = pd.read_csv(file_path)
+        df = load_dataset(file_path)
 
         # Verificações mínimas
         required_cols = {'efficiency', 'contract_year', 'loc'}
@@ -358,7 +182,8 @@ def load_and_display_sfa():
             return
 
         # Mostra o dashboard com os filtros e gráficos
-        show_efficiency_dashboard(df)
+        show_efficiency_dashboard(df, cube=load_cube(file_path), bitmaps=load_bitmap_index(file_path), csv_path=file_path)
+        show_frontier_estimation(file_path, df)
 
     except FileNotFoundError:
         st.error(f"File not found: {file_path}")
@@ -374,8 +199,8 @@ def show_randomforest_tab():
 
     df = load_randomforest_data()
 
-    # Slider para threshold de risco
-    threshold = st.slider("Select Risk Threshold", 0.1, 0.9, 0.5, 0.05)
+    # Slider para threshold de risco, a partir do limiar guardado com o modelo do registo
+    threshold = st.slider("Select Risk Threshold", 0.0, 1.0, float(load_model()["threshold"]), 0.005, format="%.3f")
 
     # Métricas agregadas
     risky_contracts = df[df['predicted_prob'] >= threshold]
@@ -399,7 +224,7 @@ def show_randomforest_tab():
     # Policy Implication
     st.markdown("### 🏛️ Policy Implications")
     st.info(f"""
-    Contracts with a predicted probability of cost increase above **{threshold:.2f}** should be monitored closely.
+    Contracts with a predicted probability of cost increase above **{threshold:.3f}** should be monitored closely.
     
     Recommended actions:
     - Perform **ex-ante audits** for contracts at risk;
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bech_latex import compute_efficiency_gap_by_variable
+
+
+def _contracts(n=3_000, seed=1):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "efficiency": rng.beta(4, 2, n),
+        "loc": rng.choice(["PT11", "PT15", "PT16", "PT17"], n),
+        "bidders": rng.integers(1, 8, n),
+        "contract_year": rng.choice([2019, 2020, 2021], n),
+    })
+    df.loc[rng.random(n) < 0.05, "efficiency"] = np.nan
+    df.loc[rng.random(n) < 0.05, "loc"] = None
+    return df
+
+
+def _groupby_gap(df, var, q):
+    # Implementação original: média por categoria menos o quantil, média sobre categorias
+    return (df.groupby(var)["efficiency"].mean() - df["efficiency"].quantile(q)).mean()
+
+
+def test_gaps_match_groupby_implementation():
+    df = _contracts()
+    variables = ["loc", "bidders"]
+    gaps = compute_efficiency_gap_by_variable(df, variables=variables).set_index("Variable")
+
+    for var in variables:
+        for q in (0.50, 0.75, 0.90):
+            # a tabela vem arredondada a 3 casas
+            assert gaps.loc[var, f"Gap at P{q * 100:g}"] == pytest.approx(_groupby_gap(df, var, q), abs=5e-4)
+
+
+def test_sliced_gaps_match_groupby_per_slice():
+    df = _contracts()
+    gaps = compute_efficiency_gap_by_variable(df, variables=["loc"], percentiles=[0.75],
+                                              slice_by=["contract_year"])
+
+    for year, part in df.groupby("contract_year"):
+        row = gaps[gaps["contract_year"] == year].iloc[0]
+        assert row["Gap at P75"] == pytest.approx(_groupby_gap(part, "loc", 0.75), abs=5e-4)
+
+
+def test_fractional_percentiles_keep_their_label():
+    gaps = compute_efficiency_gap_by_variable(_contracts(), variables=["loc"], percentiles=[0.975])
+    assert "Gap at P97.5" in gaps.columns
+
+
+def test_duplicate_percentiles_are_rejected():
+    with pytest.raises(ValueError):
+        compute_efficiency_gap_by_variable(_contracts(), variables=["loc"], percentiles=[0.5, 0.50])
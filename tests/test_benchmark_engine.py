@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark_engine import group_codes, peer_thresholds, row_thresholds, savings_curve
+
+
+def _contracts(n=2_000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "efficiency": rng.beta(4, 2, n).round(3),   # empates, como nos dados reais
+        "effective_total_price": rng.lognormal(10, 1, n),
+        "loc": rng.choice(["PT11", "PT15", "PT16", "PT17"], n),
+    })
+    df.loc[rng.random(n) < 0.05, "efficiency"] = np.nan
+    df.loc[rng.random(n) < 0.02, "loc"] = None
+    return df
+
+
+def _rowwise_sim_cost(df, thresholds):
+    # Implementação original (bencharming): apply linha a linha
+    def simulate(row, t):
+        if row["efficiency"] < t:
+            return row["effective_total_price"] * (row["efficiency"] / t)
+        return row["effective_total_price"]
+    return df.assign(t=thresholds).apply(lambda row: simulate(row, row["t"]), axis=1).sum()
+
+
+@pytest.mark.parametrize("percentile", [1, 10, 50, 75, 99])
+def test_global_curve_matches_rowwise_apply(percentile):
+    df = _contracts()
+    curve = savings_curve(df["efficiency"], df["effective_total_price"], percentiles=[percentile])
+    t = df["efficiency"].quantile(percentile / 100)
+
+    assert curve["threshold"].iloc[0] == pytest.approx(t)
+    assert curve["real_cost"].iloc[0] == pytest.approx(df["effective_total_price"].sum())
+    assert curve["sim_cost"].iloc[0] == pytest.approx(_rowwise_sim_cost(df, t))
+
+
+@pytest.mark.parametrize("percentile", [25, 50, 90])
+def test_peer_curve_matches_rowwise_apply(percentile):
+    df = _contracts()
+    codes, _ = group_codes(df, ["loc"])
+    curve = savings_curve(df["efficiency"], df["effective_total_price"], percentiles=[percentile],
+                          groups=codes)
+    # Sem grupo (loc em falta) o limiar é NaN e o preço mantém-se
+    t = df.groupby("loc")["efficiency"].transform(lambda e: e.quantile(percentile / 100))
+
+    assert "threshold" not in curve
+    assert curve["sim_cost"].iloc[0] == pytest.approx(_rowwise_sim_cost(df, t))
+
+
+def test_peer_thresholds_match_groupby_quantile():
+    df = _contracts()
+    percentiles = [5, 50, 75, 99]
+    table = peer_thresholds(df, ["loc"], percentiles=percentiles)["table"].set_index("loc")
+    grouped = df.groupby("loc")["efficiency"]
+
+    pd.testing.assert_series_equal(table["n"], grouped.count(), check_names=False, check_dtype=False)
+    for p in percentiles:
+        expected = grouped.quantile(p / 100)
+        pd.testing.assert_series_equal(table[f"p{p}"], expected, check_names=False)
+
+
+def test_group_without_efficiencies_is_a_nan_row():
+    df = pd.DataFrame({"loc": ["A", "A", "B", "B"], "efficiency": [0.1, 0.2, np.nan, np.nan]})
+    peers = peer_thresholds(df, ["loc"], percentiles=[50])
+    table = peers["table"].set_index("loc")
+
+    assert table.loc["A", "p50"] == pytest.approx(0.15)
+    assert table.loc["B", "n"] == 0
+    assert np.isnan(table.loc["B", "p50"])
+    np.testing.assert_array_equal(np.isnan(row_thresholds(peers, "p50")), [False, False, True, True])
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from benchmark_engine import savings_curve
+from bootstrap import benchmark_savings_statistic, bootstrap_ci, iter_bootstrap, rf_savings_statistic
+
+
+def _sample(n=500, seed=2):
+    rng = np.random.default_rng(seed)
+    eff = rng.beta(4, 2, n).round(2)
+    eff[rng.random(n) < 0.05] = np.nan
+    return eff, rng.lognormal(10, 1, n), rng.random(n)
+
+
+def _resample(n, k, seed=3):
+    return np.random.default_rng(seed).integers(0, n, size=(k, n))
+
+
+def test_benchmark_statistic_matches_savings_curve_on_resamples():
+    eff, price, _ = _sample()
+    statistic, n = benchmark_savings_statistic(eff, price, 0.75)
+    valid = ~np.isnan(eff)
+    eff_sorted = eff[valid][np.argsort(eff[valid], kind="stable")]
+    price_sorted = price[valid][np.argsort(eff[valid], kind="stable")]
+
+    idx = np.vstack([np.arange(n), _resample(n, 5)])
+    expected = [savings_curve(eff_sorted[i], price_sorted[i], percentiles=[75])["savings"].iloc[0]
+                for i in idx]
+    np.testing.assert_allclose(statistic(idx), expected, rtol=1e-9)
+
+
+def test_rf_statistic_matches_explicit_resample():
+    _, price, risk = _sample()
+    statistic, n = rf_savings_statistic(risk, price, 0.3)
+
+    idx = _resample(n, 5)
+    expected = []
+    for i in idx:
+        p, risky = price[i], risk[i] >= 0.3
+        expected.append(p[risky].sum() - risky.sum() * p[~risky].mean())
+    np.testing.assert_allclose(statistic(idx), expected, rtol=1e-9)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64])
+def test_replicates_do_not_depend_on_chunk_size(chunk_size):
+    eff, price, _ = _sample()
+    statistic, n = benchmark_savings_statistic(eff, price, 0.5)
+
+    def replicates(chunk):
+        return np.concatenate([v for _, v in iter_bootstrap(statistic, n, 100, seed=11, chunk_size=chunk)])
+
+    np.testing.assert_array_equal(replicates(chunk_size), replicates(100))
+    ci = bootstrap_ci(statistic, n, estimate=0.0, n_replicates=100, seed=11, chunk_size=chunk_size)
+    assert ci["replicates"] == 100 and ci["low"] <= ci["high"]
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import forest_compiler
+from forest_compiler import SMALL_BATCH, compile_pipeline, predict_frame
+from model_registry import FEATURES, build_pipeline
+
+ENGINES = ["numpy"] + (["numba"] if forest_compiler.numba is not None else [])
+
+
+def _contracts(n, seed, missing=0.0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "loc": rng.choice(["PT11", "PT15", "PT16", "PT17"], n).astype(object),
+        "bidders": rng.integers(1, 8, n).astype(np.float64),
+        "contract_year": rng.choice([2019, 2020, 2021, 2022], n),
+        "ln_base_price": rng.normal(10, 1.5, n),
+        "act_type": rng.choice(["A", "B", "C"], n).astype(object),
+        "environmental": rng.integers(0, 2, n),
+        "execution_dummy": rng.integers(0, 2, n),
+        "covid_pandemic": rng.integers(0, 2, n),
+        "CPV_agrupado": rng.choice(["45", "33", "79", "90", "72"], n).astype(object),
+    })
+    target = (0.3 * (df["loc"] == "PT11") + 0.1 * df["bidders"] + rng.normal(0, 0.4, n) > 0.6).astype(int)
+    df = df.astype({c: np.float64 for c in ("contract_year", "environmental", "execution_dummy",
+                                            "covid_pandemic")})
+    for col in FEATURES:
+        df.loc[rng.random(n) < missing, col] = np.nan
+    return df, target
+
+
+def _fit(missing_in_training):
+    X, y = _contracts(2_000, seed=0, missing=0.05 if missing_in_training else 0.0)
+    pipeline = build_pipeline(FEATURES, {"n_estimators": 15, "max_depth": 8, "random_state": 0})
+    return pipeline.fit(X, y)
+
+
+def _scoring_rows():
+    # 10% de NaN por coluna e categorias que o encoder nunca viu
+    X, _ = _contracts(1_000, seed=1, missing=0.1)
+    X.loc[:4, "loc"] = "PT99"
+    X.loc[5:9, "CPV_agrupado"] = "01"
+    return X
+
+
+@pytest.mark.parametrize("missing_in_training", [False, True])
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("rows", [SMALL_BATCH, None], ids=["small-batch", "large-batch"])
+def test_compiled_forest_matches_predict_proba(missing_in_training, engine, rows):
+    pipeline = _fit(missing_in_training)
+    X = _scoring_rows().head(rows) if rows else _scoring_rows()
+
+    expected = pipeline.predict_proba(X)[:, 1]
+    np.testing.assert_allclose(predict_frame(compile_pipeline(pipeline), X, engine=engine), expected,
+                               atol=1e-12)
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.api as sm
+
+from grouped_ols import OLS_COLUMNS, grouped_ols
+
+
+def _frame(n=3_000, seed=6):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "loc": rng.choice(["PT11", "PT15", "PT16", "PT17"], n),
+        "year": rng.choice([2020, 2021], n),
+        "ln_base": rng.normal(10, 2, n),
+    })
+    df["ln_effective"] = 0.2 + 0.97 * df["ln_base"] + rng.normal(0, 0.3, n)
+    df.loc[rng.random(n) < 0.03, "ln_effective"] = np.nan
+    df.loc[rng.random(n) < 0.03, "loc"] = None
+    return df
+
+
+@pytest.mark.parametrize("by", ["loc", ["loc", "year"]])
+def test_matches_statsmodels_per_group(by):
+    df = _frame()
+    table = grouped_ols(df, "ln_base", "ln_effective", by)
+    assert list(table.columns) == OLS_COLUMNS
+
+    keys = [by] if isinstance(by, str) else by
+    groups = df.dropna(subset=[*keys, "ln_base", "ln_effective"]).groupby(keys)
+    assert len(table) == groups.ngroups
+    for key, group in groups:
+        fit = sm.OLS(group["ln_effective"], sm.add_constant(group["ln_base"])).fit()
+        row = table.loc[key[0] if isinstance(by, str) else key]
+        assert row["n"] == len(group)
+        np.testing.assert_allclose([row["intercept"], row["slope"]], fit.params, rtol=1e-9)
+        np.testing.assert_allclose([row["se_intercept"], row["se_slope"]], fit.bse, rtol=1e-7)
+        assert row["r2"] == pytest.approx(fit.rsquared, rel=1e-9)
+        assert row["t_slope"] == pytest.approx(fit.tvalues.iloc[1], rel=1e-7)
+        assert row["p_value"] == pytest.approx(fit.pvalues.iloc[1], rel=1e-6, abs=1e-300)
+
+
+def test_degenerate_groups_are_nan():
+    df = pd.DataFrame({"g": ["a", "a", "b", "b", "b"], "x": [1.0, 2.0, 3.0, 3.0, 3.0],
+                       "y": [1.0, 3.0, 1.0, 2.0, 3.0]})
+    table = grouped_ols(df, "x", "y", "g")
+    # Dois pontos: declive exato, sem erros-padrão; x constante: sem declive
+    assert table.loc["a", "slope"] == pytest.approx(2.0)
+    assert np.isnan(table.loc["a", "se_slope"])
+    assert np.isnan(table.loc["b", "slope"])
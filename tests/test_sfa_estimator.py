@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sfa_estimator import (DISTRIBUTIONS, _neg_loglik_and_grad_numba, _neg_loglik_and_grad_numpy,
+                           _start_values, model_arrays)
+
+ENGINES = [_neg_loglik_and_grad_numpy] + ([_neg_loglik_and_grad_numba] if _neg_loglik_and_grad_numba else [])
+
+
+def _arrays(distribution, cost, n=400, seed=4):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "x1": rng.normal(size=n),
+        "x2": rng.normal(size=n),
+        "z1": rng.normal(size=n),
+        "group": rng.choice(["a", "b", "c"], n),
+    })
+    u = np.abs(rng.normal(0.3 + 0.2 * df["z1"], 0.4))
+    df["y"] = 1 + 0.5 * df["x1"] - 0.3 * df["x2"] + rng.normal(0, 0.2, n) + (u if cost else -u)
+    spec = {"dependent": "y", "frontier": ["x1", "x2", "group"], "determinants": ["z1"],
+            "distribution": distribution, "cost": cost}
+    return model_arrays(df, spec)["args"]
+
+
+def _numeric_gradient(objective, theta, args, step=1e-6):
+    grad = np.empty_like(theta)
+    for j in range(len(theta)):
+        h = step * max(1.0, abs(theta[j]))
+        up, down = theta.copy(), theta.copy()
+        up[j] += h
+        down[j] -= h
+        grad[j] = (objective(up, *args)[0] - objective(down, *args)[0]) / (2 * h)
+    return grad
+
+
+@pytest.mark.parametrize("objective", ENGINES, ids=lambda f: f.__name__.rsplit("_", 1)[-1])
+@pytest.mark.parametrize("cost", [False, True], ids=["production", "cost"])
+@pytest.mark.parametrize("distribution", DISTRIBUTIONS)
+def test_analytic_gradient_matches_central_differences(distribution, cost, objective):
+    args = _arrays(distribution, cost)
+    rng = np.random.default_rng(5)
+    start = _start_values(*args)
+    # Pontos de partida e pontos afastados do ótimo
+    for theta in (start, start + rng.normal(0, 0.3, len(start))):
+        _, grad = objective(theta, *args)
+        np.testing.assert_allclose(grad, _numeric_gradient(objective, theta, args), rtol=1e-5, atol=1e-4)
+
+
+@pytest.mark.skipif(_neg_loglik_and_grad_numba is None, reason="numba is not installed")
+@pytest.mark.parametrize("distribution", DISTRIBUTIONS)
+def test_numba_and_numpy_likelihoods_agree(distribution):
+    args = _arrays(distribution, cost=False)
+    theta = _start_values(*args) + 0.1
+    f_np, g_np = _neg_loglik_and_grad_numpy(theta, *args)
+    f_nb, g_nb = _neg_loglik_and_grad_numba(theta, *args)
+    assert f_nb == pytest.approx(f_np, rel=1e-10)
+    np.testing.assert_allclose(g_nb, g_np, rtol=1e-8, atol=1e-10)
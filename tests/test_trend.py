@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+import statsmodels.api as sm
+
+from trend import LOWESS_TOLERANCE, binned_lowess, interpolate
+
+
+def _max_error(x, y, frac):
+    exact = sm.nonparametric.lowess(y, x, frac=frac)
+    trend = binned_lowess(x, y, frac=frac)
+    return np.max(np.abs(interpolate(trend, exact[:, 0]) - exact[:, 1])) / np.ptp(y)
+
+
+@pytest.mark.parametrize("frac", [0.3, 2 / 3])
+def test_continuous_x_within_tolerance(frac):
+    rng = np.random.default_rng(0)
+    x = rng.uniform(0, 10, 8_000)
+    y = np.sin(x) + rng.standard_t(3, len(x)) * 0.3   # caudas pesadas: os pesos robustos contam
+    assert _max_error(x, y, frac) < LOWESS_TOLERANCE
+
+
+def test_few_distinct_x_within_tolerance():
+    # Anos de contrato: um ponto por valor distinto, sem agrupamento
+    rng = np.random.default_rng(1)
+    x = rng.integers(2012, 2024, 5_000).astype(np.float64)
+    y = 0.05 * (x - 2012) + rng.normal(0, 0.5, len(x))
+    trend = binned_lowess(x, y, frac=0.3)
+    np.testing.assert_array_equal(trend["x"], np.unique(x))
+    assert _max_error(x, y, 0.3) < LOWESS_TOLERANCE
+
+
+def test_missing_pairs_are_dropped():
+    x = np.array([1.0, 2.0, np.nan, 4.0, 5.0, 6.0])
+    y = np.array([1.0, 2.0, 3.0, np.inf, 5.0, 6.0])
+    trend = binned_lowess(x, y, frac=1.0)
+    np.testing.assert_array_equal(trend["x"], [1.0, 2.0, 5.0, 6.0])
+    np.testing.assert_allclose(trend["fitted"], trend["x"])
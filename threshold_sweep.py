@@ -0,0 +1,135 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_store import SCORED_CSV, dataset_version, load_dataset
+
+
+def threshold_sweep(risk_prob, y_true, price) -> pd.DataFrame:
+    """
+    Classification and cost-mitigation metrics for every distinct threshold.
+
+    A contract is flagged when ``risk_prob >= threshold``; flagged contracts
+    are re-priced at the mean price of the unflagged ones (the rule in
+    `rf.run_rf_mitigation`). Scores are sorted once in descending order and
+    cumulative sums of outcomes and prices give every threshold at once.
+
+    Parameters
+    ----------
+    risk_prob : array-like
+        Predicted probability of a cost increase.
+    y_true : array-like
+        Observed outcome (1 = cost increased).
+    price : array-like
+        Effective total price.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per distinct threshold, ascending: ``threshold``,
+        ``flagged``, ``tp``, ``fp``, ``tpr``, ``fpr``, ``youden_j``,
+        ``mean_safe_price``, ``sim_cost`` and ``savings``.
+    """
+    risk = np.asarray(risk_prob, dtype=np.float64)
+    y = np.asarray(y_true, dtype=np.float64)
+    cost = np.nan_to_num(np.asarray(price, dtype=np.float64))
+    valid = ~np.isnan(risk) & ~np.isnan(y)
+    risk, y, cost = risk[valid], y[valid], cost[valid]
+
+    order = np.argsort(-risk, kind="stable")
+    risk, y, cost = risk[order], y[order], cost[order]
+
+    # Último índice de cada valor distinto: tudo até aí fica sinalizado
+    last = np.flatnonzero(np.r_[risk[1:] != risk[:-1], True])
+    flagged = last + 1
+    tp = np.cumsum(y)[last]
+    fp = flagged - tp
+    flagged_cost = np.cumsum(cost)[last]
+
+    n = len(risk)
+    positives, negatives = y.sum(), n - y.sum()
+    total_cost = cost.sum()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tpr = tp / positives
+        fpr = fp / negatives
+        mean_safe_price = np.where(flagged < n, (total_cost - flagged_cost) / (n - flagged), np.nan)
+    sim_cost = total_cost - flagged_cost + flagged * mean_safe_price
+
+    sweep = pd.DataFrame({
+        "threshold": risk[last],
+        "flagged": flagged,
+        "tp": tp.astype(np.int64),
+        "fp": fp.astype(np.int64),
+        "tpr": tpr,
+        "fpr": fpr,
+        "youden_j": tpr - fpr,
+        "mean_safe_price": mean_safe_price,
+        "sim_cost": sim_cost,
+        "savings": total_cost - sim_cost,
+    })
+    return sweep.iloc[::-1].reset_index(drop=True)
+
+
+def at_threshold(sweep: pd.DataFrame, threshold: float) -> pd.Series:
+    """
+    Sweep row that flags the same contracts as `threshold`: the smallest
+    distinct score ``>= threshold``. Above every score nothing is flagged.
+    """
+    pos = np.searchsorted(sweep["threshold"].to_numpy(), threshold, side="left")
+    if pos < len(sweep):
+        return sweep.iloc[pos]
+
+    top = sweep.iloc[-1]
+    row = pd.Series(0.0, index=sweep.columns)
+    row["threshold"] = threshold
+    row["sim_cost"] = top["sim_cost"] + top["savings"]      # real cost
+    row["mean_safe_price"] = np.nan
+    return row
+
+
+def youden_threshold(sweep: pd.DataFrame) -> float:
+    """Threshold with the highest Youden J (the highest one on ties)."""
+    j = sweep["youden_j"].to_numpy()
+    return float(sweep["threshold"].iloc[len(j) - 1 - np.nanargmax(j[::-1])])
+
+
+def sweep_path(model_path) -> Path:
+    """The sweep is stored next to the model it was computed for."""
+    return Path(model_path).with_suffix(".sweep.parquet")
+
+
+def save_threshold_sweep(sweep: pd.DataFrame, model_path) -> Path:
+    path = sweep_path(model_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    sweep.to_parquet(path, index=False)
+    return path
+
+
+@st.cache_resource(show_spinner=False)
+def _load_threshold_sweep(csv_path: str, key: str, version: float) -> pd.DataFrame:
+    # Importados aqui: o registo de modelos importa este módulo
+    from model_registry import REGISTRY_DIR
+    from forest_compiler import score_contracts
+
+    # Guardado na pasta do modelo, com o nome da tabela (ex.: dados.sweep.parquet)
+    scored = REGISTRY_DIR / key / Path(csv_path).name
+    path = sweep_path(scored)
+    if path.exists() and path.stat().st_mtime >= version:
+        return pd.read_parquet(path)
+
+    df = load_dataset(csv_path)
+    sweep = threshold_sweep(score_contracts(csv_path), df["custo_aumentou"], df["effective_total_price"])
+    save_threshold_sweep(sweep, scored)
+    return sweep
+
+
+def load_threshold_sweep(csv_path=SCORED_CSV) -> pd.DataFrame:
+    """
+    Sweep of the scored table under the shared registry model (see
+    `forest_compiler.score_contracts`), stored with that model version and
+    recomputed when the snapshot is newer.
+    """
+    from model_registry import load_model
+    return _load_threshold_sweep(str(csv_path), load_model()["key"], dataset_version(csv_path))
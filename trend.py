@@ -0,0 +1,169 @@
+import numpy as np
+import streamlit as st
+
+LOWESS_BINS = 400       # posições distintas de x acima das quais os pontos são agrupados
+LOWESS_ITERATIONS = 3   # iterações robustas, como em statsmodels
+LOWESS_TOLERANCE = 1e-3  # desvio máximo face ao LOWESS exato, em fração da amplitude de y
+
+
+def _bins(x: np.ndarray, bins: int):
+    """Bin position and bin number of every point: the distinct values of `x` if there are few."""
+    values, inverse = np.unique(x, return_inverse=True)
+    if len(values) <= bins:
+        return values, inverse
+    edges = np.linspace(x.min(), x.max(), bins + 1)
+    which = np.clip(np.searchsorted(edges, x, side="right") - 1, 0, bins - 1)
+    counts = np.bincount(which, minlength=bins)
+    used = counts > 0
+    centres = np.bincount(which, x, minlength=bins)[used] / counts[used]
+    return centres, np.cumsum(used)[which] - 1
+
+
+def _local_fits(xb: np.ndarray, counts: np.ndarray, w: np.ndarray, wy: np.ndarray, k: int) -> np.ndarray:
+    """
+    Locally weighted linear fit at every bin position, from per-bin sums.
+
+    The neighbourhood of each position holds its `k` nearest points (bin
+    counts, so every point of a bin is equally near); points get tricube
+    weights in the distance over the neighbourhood radius, times their
+    robustness weights (summed per bin in `w`, and `wy` with ``y``).
+    """
+    dist = np.abs(xb[:, None] - xb[None, :])
+    order = np.argsort(dist, axis=1, kind="stable")
+    reached = np.cumsum(counts[order], axis=1)
+    nearest = np.minimum((reached < k).sum(axis=1), len(xb) - 1)
+    radius = np.take_along_axis(dist, order, axis=1)[np.arange(len(xb)), nearest]
+
+    scaled = dist / np.where(radius > 0, radius, 1.0)[:, None]
+    tricube = np.where(scaled < 1, (1 - np.clip(scaled, 0, 1) ** 3) ** 3, 0.0)
+    tricube[radius == 0] = (dist[radius == 0] == 0)     # vizinhança num único x
+
+    sw = tricube @ w
+    sx = tricube @ (w * xb)
+    sy = tricube @ wy
+    mean_x = sx / np.where(sw > 0, sw, 1.0)
+    mean_y = sy / np.where(sw > 0, sw, 1.0)
+    sxx = tricube @ (w * xb ** 2) - sw * mean_x ** 2
+    sxy = tricube @ (xb * wy) - sw * mean_x * mean_y
+    # Sem dispersão em x na vizinhança: a reta local reduz-se à média ponderada
+    flat = sxx <= 1e-12 * sw * (np.ptp(xb) or 1.0) ** 2
+    slope = np.where(flat, 0.0, sxy / np.where(flat, 1.0, sxx))
+    return mean_y + slope * (xb - mean_x)
+
+
+def binned_lowess(x, y, frac: float = 2 / 3, it: int = LOWESS_ITERATIONS, bins: int = LOWESS_BINS) -> dict:
+    """
+    LOWESS smoother computed on bins instead of on every point.
+
+    Points are grouped by their distinct ``x`` values, or into `bins`
+    equal-width bins (at the mean ``x`` of their points) when there are
+    more. Local linear fits are computed at the bin positions from per-bin
+    sums of the robustness weights, and the robustness weights are updated
+    per point from the residuals, as in Cleveland's algorithm. Each
+    iteration costs ``O(n + B²)`` instead of ``O(n · frac · n)``.
+
+    With at most `bins` distinct ``x`` values (e.g. contract years) the
+    result matches ``statsmodels.nonparametric.lowess`` up to how ties at
+    the edge of a neighbourhood are split; with continuous ``x`` it stays
+    within `LOWESS_TOLERANCE` of the range of ``y`` of the exact smoother
+    for `bins` = `LOWESS_BINS` (``python trend.py`` checks both).
+
+    Parameters
+    ----------
+    x, y : array-like
+        Data; pairs with a missing value are dropped.
+    frac : float
+        Share of the points in each neighbourhood.
+    it : int
+        Robustifying iterations.
+    bins : int
+        Largest number of bin positions.
+
+    Returns
+    -------
+    dict
+        ``x`` (bin positions, sorted) and ``fitted`` (smoothed values
+        there); see `interpolate` for values at other points.
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    ok = np.isfinite(x) & np.isfinite(y)
+    x, y = x[ok], y[ok]
+    if len(x) == 0:
+        return {"x": np.array([]), "fitted": np.array([])}
+
+    xb, which = _bins(x, bins)
+    counts = np.bincount(which, minlength=len(xb)).astype(np.float64)
+    k = max(int(frac * len(x) + 1e-10), 2)
+    robust = np.ones(len(x))
+
+    for step in range(it + 1):
+        w = np.bincount(which, robust, minlength=len(xb))
+        wy = np.bincount(which, robust * y, minlength=len(xb))
+        fitted = _local_fits(xb, counts, w, wy, k)
+        if step == it:
+            break
+        # Pesos bisquare dos resíduos, com a escala 6 x mediana |resíduo|
+        residual = np.abs(y - fitted[which])
+        scale = 6.0 * np.median(residual)
+        if scale < 1e-7 * np.mean(residual) or scale == 0:
+            break
+        robust = np.where(residual < scale, (1 - (residual / scale) ** 2) ** 2, 0.0)
+
+    return {"x": xb, "fitted": fitted}
+
+
+def interpolate(trend: dict, x) -> np.ndarray:
+    """Trend values at `x`, linearly interpolated between bin positions."""
+    return np.interp(np.asarray(x, dtype=np.float64), trend["x"], trend["fitted"])
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def lowess_trend(x: np.ndarray, y: np.ndarray, frac: float = 2 / 3, it: int = LOWESS_ITERATIONS,
+                 bins: int = LOWESS_BINS) -> dict:
+    """
+    `binned_lowess`, computed once per distinct data: a date window that
+    was already drawn reuses its trendline.
+    """
+    return binned_lowess(x, y, frac=frac, it=it, bins=bins)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def polynomial_trend(x: np.ndarray, y: np.ndarray, deg: int = 2, points: int = 100) -> dict:
+    """
+    Least-squares polynomial of degree `deg` through ``(x, y)``, evaluated
+    at `points` evenly spaced values over the range of `x`; computed once
+    per distinct data.
+
+    :return: ``coefs`` (highest degree first, as `np.polyfit`), ``x`` and
+        ``fitted``.
+    """
+    coefs = np.polyfit(x, y, deg=deg)
+    grid = np.linspace(np.min(x), np.max(x), points)
+    return {"coefs": coefs, "x": grid, "fitted": np.polyval(coefs, grid)}
+
+
+if __name__ == "__main__":
+    import time
+    import statsmodels.api as sm
+    from data_store import CONTRACTS_CSV, load_dataset
+
+    df = load_dataset(CONTRACTS_CSV).dropna(subset=["contract_year", "ln_effective_total_price"])
+    rng = np.random.default_rng(0)
+    cases = {
+        "contract years": (df["contract_year"].to_numpy(dtype=np.float64),
+                           df["ln_effective_total_price"].to_numpy()),
+        "ln base price": (df["ln_base_price"].to_numpy(), df["ln_effective_total_price"].to_numpy()),
+        "synthetic 20k": (xs := rng.uniform(0, 10, 20_000), np.sin(xs) + rng.standard_t(3, 20_000) * 0.3),
+    }
+    for label, (x, y) in cases.items():
+        ok = np.isfinite(x) & np.isfinite(y)
+        x, y = x[ok], y[ok]
+        started = time.perf_counter()
+        exact = sm.nonparametric.lowess(y, x, frac=0.3)
+        t_exact = time.perf_counter() - started
+        started = time.perf_counter()
+        trend = binned_lowess(x, y, frac=0.3)
+        t_binned = time.perf_counter() - started
+        error = np.max(np.abs(interpolate(trend, exact[:, 0]) - exact[:, 1])) / np.ptp(y)
+        print(f"{label:>15}: n={len(x):6d}, {len(trend['x']):4d} bins, max error {error:.2e} of the y range "
+              f"(exact {t_exact:.2f} s, binned {t_binned:.3f} s)")
@@ -1,15 +1,19 @@
 import pandas as pd 
 import streamlit as st
+from data_store import load_dataset
 #Import the data
 def load_data(file_path):
     """
     Load data from a CSV file and return a DataFrame.
+
+    The CSV is served from the shared Arrow snapshot (see `data_store`),
+    so repeated calls do not re-parse the file.
     
     :param file_path: Path to the CSV file.
     :return: DataFrame containing the data.
     """
     try:
-        df = pd.read_csv(file_path)
+        df = load_dataset(file_path)
         return df
     except Exception as e:
         print(f"Error loading data: {e}")
@@ -1,33 +1,37 @@
-import joblib
 import pandas as pd
 import numpy as np
 import streamlit as st
 import plotly.express as px
+from data_store import load_dataset, dataset_version, SCORED_CSV
+from model_registry import load_model
+from forest_compiler import load_compiled_model, predict_frame, score_contracts
+from whatif_surface import load_surface, lookup
+from counterfactual import PRESET_INTERVENTIONS, score_portfolio
 
 def what_if_dashboard():
-    # --------------  CONFIG  -----------------
-    THRESHOLD = 0.065                # Youden-J threshold
-    MODEL_PATH = "rf_model.pkl"      # RF classifier (pickle)
-    PREP_PATH  = "preprocess.pkl"    # ColumnTransformer / Pipeline
-
     # ----------  LOAD CSV ---------------------
     try:
-        df = pd.read_csv("Data/dados.csv")
+        df = load_dataset(SCORED_CSV)
     except FileNotFoundError:
         st.error("Ficheiro 'dados.csv' não encontrado.")
         return
 
-    SAFE_COST = df[(df["risk_prob"] < THRESHOLD) & (df["efficiency"] >= 0.6)]["effective_total_price"].mean()
-    # -----------------------------------------
+    # ----------  LOAD MODEL (registry) -------
+    model = load_model()             # pipeline partilhado: encoder + RF
+    forest = load_compiled_model()   # mesma floresta em arrays planos
+    surface = load_surface()         # grelha completa pré-calculada para este modelo
 
-    # ----------  LOAD MODEL & PIPELINE -------
-    @st.cache_resource
-    def load_artifacts():
-        model = joblib.load(MODEL_PATH)
-        pre   = joblib.load(PREP_PATH)
-        return model, pre
+    # Limiar de risco (Youden J por omissão), ajustável na barra lateral
+    youden = model["threshold"]
+    THRESHOLD = st.sidebar.slider(
+        "Risk Threshold", 0.0, 1.0, float(youden), step=0.005, format="%.3f",
+        help=f"Youden J optimum: {youden:.3f}"
+    )
 
-    model_rf, preproc = load_artifacts()
+    # Custo de referência: contratos seguros segundo o mesmo modelo
+    risk = score_contracts(SCORED_CSV)
+    SAFE_COST = df[(risk < THRESHOLD) & (df["efficiency"] >= 0.6)]["effective_total_price"].mean()
+    # -----------------------------------------
 
     # ----------  UI – SIDEBAR -----------------
     st.sidebar.header("What-if inputs")
@@ -66,8 +70,11 @@ def what_if_dashboard():
     df_input = pd.DataFrame(input_list)
 
     # ----------  PREDIÇÃO --------------------
-    X = preproc.transform(df_input)
-    probs = model_rf.predict_proba(X)[:, 1]
+    # Consulta à grelha; só os pontos fora dela são avaliados pelo modelo
+    probs = lookup(surface, df_input["loc"], cpv, act_type, bidders, year)
+    missing = np.isnan(probs)
+    if missing.any():
+        probs[missing] = predict_frame(forest, df_input[missing])
 
     # ----------  RESULTADOS ------------------
     df_input["Predicted Risk"] = probs
@@ -96,5 +103,61 @@ def what_if_dashboard():
     )
     st.plotly_chart(fig, use_container_width=True)
 
+    # ----------  SENSIBILIDADE ---------------
+    st.markdown("### Sensitivity: Risk by Bidders and Year")
+    loc_idx = [k for k, v in enumerate(surface["loc"].tolist()) if v in locations]
+    cpv_idx = surface["CPV_agrupado"].tolist().index(cpv) if cpv in surface["CPV_agrupado"] else None
+    act_idx = surface["act_type"].tolist().index(act_type) if act_type in surface["act_type"] else None
+    if loc_idx and cpv_idx is not None and act_idx is not None:
+        heat = surface["risk"][loc_idx, cpv_idx, act_idx].mean(axis=0)     # (bidders, year)
+        fig_heat = px.imshow(
+            heat,
+            x=surface["contract_year"], y=surface["bidders"],
+            origin="lower", aspect="auto",
+            color_continuous_scale="Reds",
+            labels={"x": "Contract Year", "y": "Number of Bidders", "color": "Predicted Risk"}
+        )
+        fig_heat.add_scatter(x=[year], y=[bidders], mode="markers",
+                             marker=dict(symbol="x", size=12, color="#1f77b4"), showlegend=False)
+        fig_heat.update_layout(title=f"Predicted Risk – {cpv}, {act_type} (mean over selected locations)")
+        st.plotly_chart(fig_heat, use_container_width=True)
+
+    # ----------  CONTRAFACTUAIS --------------
+    st.markdown("### Portfolio Counterfactuals")
+    st.caption("Apply a policy change to every contract in the portfolio and rescore it with the risk model.")
+
+    interventions = dict(PRESET_INTERVENTIONS)
+    for act in act_type_options:
+        interventions[f"All contracts as {act}"] = {"act_type": act}
+
+    group_names = {"loc": "Location NUTSII", "CPV_agrupado": "CPV Group", "act_type": "Type of Act", "contract_year": "Contract Year"}
+    col_iv, col_by = st.columns([3, 1])
+    selected = col_iv.multiselect("Interventions", list(interventions), default=["+2 bidders"])
+    group_by = col_by.selectbox("Group by", list(group_names), format_func=group_names.get)
+
+    @st.cache_data(show_spinner="Rescoring the portfolio…")
+    def run_counterfactuals(model_key, version, names, by, threshold):
+        return score_portfolio(forest, load_dataset(SCORED_CSV), {n: interventions[n] for n in names}, [by], threshold)
+
+    if selected:
+        cf = run_counterfactuals(model["key"], dataset_version(SCORED_CSV), tuple(selected), group_by, THRESHOLD)
+
+        totals = cf.groupby("scenario", sort=False)[["delta_flagged", "delta_cost"]].sum().reset_index()
+        st.dataframe(
+            totals.rename(columns={"scenario": "Intervention", "delta_flagged": "Δ Flagged Contracts",
+                                   "delta_cost": "Δ Simulated Cost (€)"}),
+            use_container_width=True, hide_index=True
+        )
+
+        metric = st.radio("Show", ["delta_flagged", "delta_cost"], horizontal=True,
+                          format_func={"delta_flagged": "Δ Flagged Contracts", "delta_cost": "Δ Simulated Cost (€)"}.get)
+        fig_cf = px.bar(
+            cf, x=group_by, y=metric, color="scenario", barmode="group",
+            labels={group_by: group_names[group_by], "scenario": "Intervention",
+                    "delta_flagged": "Δ Flagged Contracts", "delta_cost": "Δ Simulated Cost (€)"}
+        )
+        fig_cf.update_layout(plot_bgcolor="white", paper_bgcolor="white", font=dict(color="black"))
+        st.plotly_chart(fig_cf, use_container_width=True)
+
     # ----------  INFO FINAL -------------------
     st.info("Use the sidebar to explore how different inputs affect the risk of cost increases and the expected cost.")
\ No newline at end of file
@@ -0,0 +1,144 @@
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import streamlit as st
+
+from data_store import CONTRACTS_CSV
+from model_registry import REGISTRY_DIR, load_model
+from forest_compiler import compile_pipeline, predict_proba
+
+# Eixos da grelha (mesmos limites dos sliders do what-if)
+BIDDERS = np.arange(1, 81)
+YEARS = np.arange(2011, 2025)
+
+# Valores fixos dos restantes inputs do what-if
+FIXED_INPUTS = {
+    "ln_base_price": np.log(50_000),
+    "environmental": 1,
+    "execution_dummy": 0,
+}
+
+BATCH_ROWS = 50_000
+
+
+def surface_path(key: str):
+    """The surface is stored with the model version it was scored with."""
+    return REGISTRY_DIR / key / "whatif_surface.npz"
+
+
+def build_surface(compiled: dict, batch_rows: int = BATCH_ROWS) -> dict:
+    """
+    Score the full what-if grid: every known location x CPV group x act type
+    x bidders 1–80 x year 2011–2024.
+
+    Rows are built directly in encoded form (category codes) and scored in
+    batches of `batch_rows`.
+
+    Returns
+    -------
+    dict
+        ``risk``: float64 array shaped ``(loc, CPV_agrupado, act_type,
+        bidders, contract_year)``, plus the axis values under the same names.
+        Kept at the precision of `predict_proba`, so a lookup is compared
+        with the threshold exactly like a live prediction.
+    """
+    axes = {
+        "loc": list(compiled["categories"]["loc"]),
+        "CPV_agrupado": list(compiled["categories"]["CPV_agrupado"]),
+        "act_type": list(compiled["categories"]["act_type"]),
+        "bidders": BIDDERS,
+        "contract_year": YEARS,
+    }
+    shape = tuple(len(v) for v in axes.values())
+    grid = np.indices(shape).reshape(len(shape), -1)      # códigos por eixo
+
+    columns = {}
+    for dim, (name, values) in enumerate(axes.items()):
+        if name in compiled["categories"]:
+            columns[name] = grid[dim].astype(np.float32)            # código ordinal
+        else:
+            columns[name] = np.asarray(values, dtype=np.float32)[grid[dim]]
+    columns["covid_pandemic"] = (columns["contract_year"] >= 2020).astype(np.float32)
+    for name, value in FIXED_INPUTS.items():
+        columns[name] = np.full(grid.shape[1], value, dtype=np.float32)
+
+    X = np.column_stack([columns[c] for c in compiled["columns"]])
+    risk = np.concatenate([
+        predict_proba(compiled, X[start:start + batch_rows])
+        for start in range(0, len(X), batch_rows)
+    ])
+
+    surface = {name: np.asarray(values) for name, values in axes.items()}
+    surface["risk"] = risk.reshape(shape)
+    return surface
+
+
+def save_surface(surface: dict, key: str):
+    path = surface_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Escrita atómica: a página pode estar a ler a grelha anterior
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix="whatif_surface.", suffix=".tmp",
+                                     delete=False) as tmp:
+        np.savez_compressed(tmp, **surface)
+    Path(tmp.name).replace(path)
+    return path
+
+
+def surface_is_current(key: str) -> bool:
+    """Whether model `key` has a stored surface in the current (float64) format."""
+    path = surface_path(key)
+    if not path.exists():
+        return False
+    with np.load(path) as data:
+        return data["risk"].dtype == np.float64     # grelhas antigas eram float32
+
+
+def register_surface(key: str, pipeline):
+    """
+    Score and store the surface of a registry model. Called by
+    `model_registry` when the model is registered, so the what-if page
+    only reads it.
+    """
+    return save_surface(build_surface(compile_pipeline(pipeline)), key)
+
+
+def _read_surface(path) -> dict:
+    with np.load(path) as data:
+        return {k: data[k] for k in data.files}
+
+
+@st.cache_resource(show_spinner=False)
+def _load_surface(key: str) -> dict:
+    return _read_surface(surface_path(key))
+
+
+def load_surface(csv_path=CONTRACTS_CSV) -> dict:
+    """Surface of the current registry model, as stored when the model was registered."""
+    return _load_surface(load_model(csv_path)["key"])
+
+
+def axis_index(surface: dict, name: str, values) -> np.ndarray:
+    """Positions of `values` on axis `name` (-1 when outside the grid)."""
+    positions = {v: k for k, v in enumerate(surface[name].tolist())}
+    return np.array([positions.get(v, -1) for v in np.asarray(values).tolist()], dtype=np.int64)
+
+
+def lookup(surface: dict, loc, cpv, act_type, bidders, year) -> np.ndarray:
+    """
+    Risk for each location in `loc` at one (CPV, act type, bidders, year)
+    point; NaN where a value lies outside the grid.
+    """
+    i = axis_index(surface, "loc", loc)
+    j, k, b, y = (axis_index(surface, name, [v])[0] for name, v in
+                  (("CPV_agrupado", cpv), ("act_type", act_type), ("bidders", bidders), ("contract_year", year)))
+    if min(j, k, b, y) < 0:
+        return np.full(len(i), np.nan)
+    risk = surface["risk"][np.maximum(i, 0), j, k, b, y]
+    return np.where(i >= 0, risk, np.nan)
+
+
+if __name__ == "__main__":
+    # Volta a calcular a grelha do modelo atual (o registo já a guarda ao treinar)
+    entry = load_model()
+    print("What-if surface saved to", register_surface(entry["key"], entry["pipeline"]))